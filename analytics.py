@@ -0,0 +1,398 @@
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+# In-memory columnar copy of the tables behind /mission_stats. Each table is
+# a pandas DataFrame of a few numpy columns: int32 ids, categorical
+# status/type/category, datetime64 launch dates. Statistics never go back to
+# the database: a junction row's ids are turned into row positions in the
+# entity tables (a binary search over the sorted key column), and group-bys
+# are np.bincount over those positions, so all ten are recomputed in tens of
+# milliseconds even with tens of thousands of missions.
+#
+# refresh() keeps the copy current. Tables whose change counter (see
+# versions.py) has not moved are left alone. The others fetch only the
+# rows past the highest key already loaded, with a row count check that
+# falls back to a full reload whenever rows were deleted or renumbered.
+# Tables without a surrogate key, and everything every full_reload seconds,
+# are reloaded whole.
+
+# table -> (key column or None, columns, categorical columns); keyed tables
+# are kept sorted by their key
+TABLES = {
+    "missions": ("mission_id",
+                 ["mission_id", "mission_name", "mission_type", "status", "launch_date", "duration"],
+                 ["mission_type", "status"]),
+    "astronauts": ("astronaut_id", ["astronaut_id", "full_name"], []),
+    "agencies": ("agency_id", ["agency_id", "name"], []),
+    "spacecraft": ("spacecraft_id", ["spacecraft_id", "name"], []),
+    "launchsites": ("launchsite_id", ["launchsite_id", "name"], []),
+    "payloads": ("payload_id", ["payload_id"], []),
+    "events": ("event_id", ["event_id", "category"], ["category"]),
+    # primary key (mission_id, astronaut_id): no single column to seek on
+    "missioncrew": (None, ["mission_id", "astronaut_id"], []),
+    "mission_agencies": ("id", ["id", "mission_id", "agency_id"], []),
+    "mission_spacecraft": ("id", ["id", "mission_id", "spacecraft_id"], []),
+    "mission_payloads": ("id", ["id", "mission_id", "payload_id"], []),
+    "mission_events": ("id", ["id", "mission_id", "event_id"], []),
+    "mission_launchsites": ("id", ["id", "mission_id", "launchsite_id"], []),
+    # career summaries (careers.py) are rewritten in place: reloaded whole
+    "astronaut_careers": (None, ["astronaut_id", "total_duration"], []),
+}
+
+# tables without a change counter of their own -> the tables whose writes
+# recompute their rows in the same transaction
+DERIVED = {"astronaut_careers": ("missions", "missioncrew")}
+
+ID_COLUMNS = {"id", "mission_id", "astronaut_id", "agency_id", "spacecraft_id",
+              "launchsite_id", "payload_id", "event_id"}
+
+SUCCESS_EVENTS = ("Docking", "Landing", "Launch")
+
+
+def _frame(rows, columns, categorical):
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    for column in columns:
+        if column in ID_COLUMNS:
+            # a NULL reference becomes 0, which no AUTO_INCREMENT key matches
+            frame[column] = frame[column].fillna(0).astype("int32")
+    for column in categorical:
+        frame[column] = frame[column].astype("category")
+    if "launch_date" in frame:
+        frame["launch_date"] = pd.to_datetime(frame["launch_date"])
+    for column in ("duration", "total_duration"):
+        if column in frame:
+            frame[column] = frame[column].astype("float64")
+    return frame
+
+
+def _positions(keys, ids):
+    # row of each id in the sorted `keys` column, or -1 where there is none
+    # (the rows an inner JOIN drops)
+    ids = np.asarray(ids)
+    if not len(keys):
+        return np.full(len(ids), -1)
+    top = int(keys[-1])
+    if top <= 4 * len(keys) + 1024:
+        # AUTO_INCREMENT keys are nearly contiguous: a dense id -> row array
+        index = np.full(top + 2, -1)
+        index[keys] = np.arange(len(keys))
+        return index[np.clip(ids, 0, top + 1)]
+    pos = np.searchsorted(keys, ids)
+    pos[pos == len(keys)] = 0
+    return np.where((keys[pos] == ids) & (ids != 0), pos, -1)
+
+
+def _per_mission(mission_ids, weights=None):
+    # (distinct non-NULL mission ids, sum of weights or row count per id),
+    # for joining one junction table to another through mission_id
+    keep = mission_ids != 0
+    ids, inverse = np.unique(mission_ids[keep], return_inverse=True)
+    w = None if weights is None else weights[keep]
+    return ids, np.bincount(inverse, weights=w, minlength=len(ids))
+
+
+def _through_mission(ids, sums, mission_ids):
+    # each row's mission's entry in sums, 0 for missions not in `ids`
+    pos = _positions(ids, mission_ids)
+    return np.where(pos >= 0, sums[pos], 0)
+
+
+def _rate(hits, total):
+    # ROUND(hits / total * 100, 2) the way MySQL evaluates it on DECIMALs:
+    # the division keeps 4 decimals (div_precision_increment), rounding
+    # halves away from zero, which makes the outer ROUND a no-op
+    if total == 0 or hits is None:
+        return None
+    return Decimal((2 * hits * 10000 + total) // (2 * total)).scaleb(-2)
+
+
+def _rates(hits, known, total):
+    # SUM() over nothing but NULLs is NULL, hence `known`
+    return [_rate(int(h) if k else None, int(t)) for h, k, t in zip(hits, known, total)]
+
+
+def _version(table_versions, table):
+    # the counter a frame is loaded at; None when unknown
+    if not table_versions:
+        return None
+    if table in DERIVED:
+        sources = [table_versions.get(source) for source in DERIVED[table]]
+        return None if None in sources else tuple(sources)
+    return table_versions.get(table)
+
+
+def _descending(values, limit=None):
+    # ORDER BY value DESC with ties in key order and NaN (NULL) last
+    order = np.argsort(-np.nan_to_num(np.asarray(values, dtype=np.float64), nan=-np.inf), kind="stable")
+    return order if limit is None else order[:limit]
+
+
+class AnalyticsEngine:
+
+    def __init__(self, full_reload=3600):
+        self.full_reload = full_reload
+        self.frames = {}
+        self._versions = {}      # table -> change counter the frame reflects
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self.last_refresh_ms = None
+        self.last_compute_ms = None
+        self.refreshes = {"full": 0, "incremental": 0, "unchanged": 0}
+
+    # loading
+
+    def _load(self, cur, table, where="", params=()):
+        key, columns, categorical = TABLES[table]
+        order = f" ORDER BY {key}" if key else ""
+        cur.execute(f"SELECT {', '.join(columns)} FROM {table}{where}{order}", params)
+        return _frame(cur.fetchall(), columns, categorical)
+
+    def _full(self, cur, table):
+        self.frames[table] = self._load(cur, table)
+        self.refreshes["full"] += 1
+
+    def _incremental(self, cur, table):
+        key, columns, categorical = TABLES[table]
+        frame = self.frames[table]
+        last = int(frame[key].iloc[-1]) if len(frame) else 0
+        new = self._load(cur, table, f" WHERE {key} > %s", (last,))
+        cur.execute(f"SELECT COUNT(*) FROM {table}")
+        if len(frame) + len(new) != cur.fetchone()[0]:
+            # rows were deleted, renumbered, or the table was emptied
+            self._full(cur, table)
+            return
+        if len(new):
+            merged = pd.concat([frame, new], ignore_index=True)
+            for column in categorical:
+                merged[column] = merged[column].astype("object").astype("category")
+            self.frames[table] = merged
+        self.refreshes["incremental"] += 1
+
+    def refresh(self, conn, table_versions=None):
+        # `table_versions` is versions.current(): {table: (version, changed_at)}
+        # or None when the counters are unavailable (then every table reloads)
+        started = time.perf_counter()
+        with self._lock:
+            whole = self._loaded_at is None or time.monotonic() - self._loaded_at > self.full_reload
+            cur = conn.cursor()
+            try:
+                for table, (key, _, _) in TABLES.items():
+                    version = _version(table_versions, table)
+                    if whole or table not in self.frames or version is None:
+                        self._full(cur, table)
+                    elif version == self._versions.get(table):
+                        self.refreshes["unchanged"] += 1
+                    elif key is None:
+                        self._full(cur, table)
+                    else:
+                        self._incremental(cur, table)
+                    self._versions[table] = version
+            finally:
+                cur.close()
+            if whole:
+                self._loaded_at = time.monotonic()
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    # statistics
+
+    def mission_stats(self, year=2023):
+        # the same ten results, with the same row shapes, as the SQL in
+        # app.MISSION_STATS_QUERIES; groups the SQL does not ORDER BY come
+        # out in key order, which is what MySQL returns for them
+        started = time.perf_counter()
+        with self._lock:
+            f = dict(self.frames)
+
+        def keys(table):
+            return f[table][TABLES[table][0]].to_numpy()
+
+        def col(table, column):
+            return f[table][column].to_numpy()
+
+        def names(table, column, positions):
+            return col(table, column)[positions].tolist()
+
+        # per mission row: status known / completed, duration, launch month and year
+        missions = f["missions"]
+        status = missions["status"].cat
+        codes = status.codes.to_numpy()
+        known = codes >= 0
+        completed = codes == (status.categories.get_loc("Completed") if "Completed" in status.categories else -2)
+        duration = missions["duration"].to_numpy()
+        launch = missions["launch_date"].dt
+        month = launch.month.fillna(0).to_numpy().astype(np.int64)
+        launch_year = launch.year.fillna(0).to_numpy().astype(np.int64)
+        mission_keys = keys("missions")
+
+        n_missions = max(len(mission_keys), 1)
+        n_astronauts = len(f["astronauts"])
+        n_spacecraft = len(f["spacecraft"])
+        n_agencies = len(f["agencies"])
+
+        # missioncrew JOIN astronauts JOIN missions
+        crew_m = _positions(mission_keys, col("missioncrew", "mission_id"))
+        crew_a = _positions(keys("astronauts"), col("missioncrew", "astronaut_id"))
+        joined = (crew_m >= 0) & (crew_a >= 0)
+        crew_m, crew_a = crew_m[joined], crew_a[joined]
+
+        # mission_spacecraft JOIN spacecraft, and of those the rows whose mission exists
+        ms_s = _positions(keys("spacecraft"), col("mission_spacecraft", "spacecraft_id"))
+        ms_mission_ids = col("mission_spacecraft", "mission_id")[ms_s >= 0]
+        ms_s = ms_s[ms_s >= 0]
+        ms_m = _positions(mission_keys, ms_mission_ids)
+        msm_s, msm_m = ms_s[ms_m >= 0], ms_m[ms_m >= 0]
+
+        # mission_agencies JOIN agencies
+        ma_a = _positions(keys("agencies"), col("mission_agencies", "agency_id"))
+        ma_mission_ids = col("mission_agencies", "mission_id")[ma_a >= 0]
+        ma_a = ma_a[ma_a >= 0]
+
+        # 1. Average Astronaut Participation: ROUND(AVG(count)), AVG kept to 4 decimals
+        crew_ids = col("missioncrew", "mission_id")
+        groups = len(np.unique(crew_ids))
+        if groups:
+            avg4 = (2 * len(crew_ids) * 10000 + groups) // (2 * groups)
+            avg_astronauts = Decimal((avg4 + 5000) // 10000)
+        else:
+            avg_astronauts = None
+
+        # 2. Spacecraft Success Rate
+        total = np.bincount(msm_s, minlength=n_spacecraft)
+        present = np.flatnonzero(total)
+        spacecraft_stats = [
+            {"name": name, "success_rate": rate}
+            for name, rate in zip(names("spacecraft", "name", present), _rates(
+                np.bincount(msm_s, weights=completed[msm_m], minlength=n_spacecraft)[present],
+                np.bincount(msm_s, weights=known[msm_m], minlength=n_spacecraft)[present],
+                total[present]))
+        ]
+
+        # 3. Monthly Mission Count per Agency (month 0 is a NULL launch_date)
+        m = _positions(mission_keys, ma_mission_ids)
+        a, m = ma_a[m >= 0], m[m >= 0]
+        counts = np.bincount(a * 13 + month[m], minlength=n_agencies * 13)
+        present = np.flatnonzero(counts)
+        agency_mission_monthly = [
+            {"agency": name, "month": mo or None, "mission_count": count}
+            for name, mo, count in zip(names("agencies", "name", present // 13),
+                                       (present % 13).tolist(), counts[present].tolist())
+        ]
+
+        # 4. Astronaut Mission Success, per (astronaut, mission)
+        pairs, inverse, total = np.unique(crew_a.astype(np.int64) * n_missions + crew_m,
+                                          return_inverse=True, return_counts=True)
+        hits = np.bincount(inverse, weights=completed[crew_m], minlength=len(pairs)).astype(np.int64)
+        seen = np.bincount(inverse, weights=known[crew_m], minlength=len(pairs))
+        successful = np.where(seen > 0, hits.astype(object), None)
+        pair_a, pair_m = np.divmod(pairs, n_missions)
+        astronaut_performance = [
+            {"full_name": full_name, "mission_name": mission_name,
+             "total_missions": count, "successful": done}
+            for full_name, mission_name, count, done in zip(
+                names("astronauts", "full_name", pair_a), names("missions", "mission_name", pair_m),
+                total.tolist(), successful.tolist())
+        ]
+
+        # 5. Launch Site Popularity
+        sites = _positions(keys("launchsites"), col("mission_launchsites", "launchsite_id"))
+        counts = np.bincount(sites[sites >= 0], minlength=len(f["launchsites"]))
+        present = np.flatnonzero(counts)
+        present = present[_descending(counts[present])]
+        launchsite_usage = [
+            {"name": name, "launch_count": count}
+            for name, count in zip(names("launchsites", "name", present), counts[present].tolist())
+        ]
+
+        # 6. Payloads per Agency: payload links of each mission, summed over its agency links
+        p = _positions(keys("payloads"), col("mission_payloads", "payload_id"))
+        ids, per_mission = _per_mission(col("mission_payloads", "mission_id")[p >= 0])
+        counts = np.bincount(ma_a, weights=_through_mission(ids, per_mission, ma_mission_ids),
+                             minlength=n_agencies).astype(np.int64)
+        present = np.flatnonzero(counts)
+        payloads_by_agency = [
+            {"agency": name, "payloads_launched": count}
+            for name, count in zip(names("agencies", "name", present), counts[present].tolist())
+        ]
+
+        # 7. Mission Event Success by Spacecraft: event outcomes of each
+        # mission, summed over its spacecraft links
+        category = f["events"]["category"]
+        e = _positions(keys("events"), col("mission_events", "event_id"))
+        event_mission_ids = col("mission_events", "mission_id")[e >= 0]
+        e = e[e >= 0]
+        ids, total = _per_mission(event_mission_ids)
+        _, hits = _per_mission(event_mission_ids, category.isin(SUCCESS_EVENTS).to_numpy()[e].astype(np.float64))
+        _, seen = _per_mission(event_mission_ids, category.notna().to_numpy()[e].astype(np.float64))
+
+        def by_spacecraft(sums):
+            return np.bincount(ms_s, weights=_through_mission(ids, sums, ms_mission_ids), minlength=n_spacecraft)
+
+        total = by_spacecraft(total)
+        present = np.flatnonzero(total)
+        event_success_by_spacecraft = [
+            {"name": name, "event_success_rate": rate}
+            for name, rate in zip(names("spacecraft", "name", present), _rates(
+                by_spacecraft(hits)[present], by_spacecraft(seen)[present], total[present]))
+        ]
+
+        # 8. Most Active Astronauts by Duration, from the maintained career
+        # summary like the SQL (astronaut_careers JOIN astronauts)
+        c = _positions(keys("astronauts"), col("astronaut_careers", "astronaut_id"))
+        totals = col("astronaut_careers", "total_duration")[c >= 0]
+        c = c[c >= 0]
+        order = _descending(totals, 10)
+        active_astronauts_by_duration = [
+            {"full_name": name, "total_duration": None if np.isnan(total) else int(total)}
+            for name, total in zip(names("astronauts", "full_name", c[order]), totals[order].tolist())
+        ]
+
+        # 9. Payload-Mission Efficiency by Spacecraft: each payload link of a
+        # mission counts once per spacecraft link
+        ids, per_mission = _per_mission(col("mission_payloads", "mission_id"))
+        links = _through_mission(ids, per_mission, mission_keys[msm_m])
+        total = np.bincount(msm_s, weights=links, minlength=n_spacecraft)
+        present = np.flatnonzero(total)
+        efficiency_by_payload_spacecraft = [
+            {"name": name, "success_rate": rate}
+            for name, rate in zip(names("spacecraft", "name", present), _rates(
+                np.bincount(msm_s, weights=links * completed[msm_m], minlength=n_spacecraft)[present],
+                total[present], total[present]))
+        ]
+
+        # 10. Top Astronauts in Year
+        counts = np.bincount(crew_a[launch_year[crew_m] == year], minlength=n_astronauts)
+        present = np.flatnonzero(counts)
+        present = present[_descending(counts[present], 5)]
+        top_astronauts_year = [
+            {"full_name": name, "mission_count": count}
+            for name, count in zip(names("astronauts", "full_name", present), counts[present].tolist())
+        ]
+
+        self.last_compute_ms = round((time.perf_counter() - started) * 1000, 3)
+        return dict(
+            avg_astronauts=avg_astronauts,
+            spacecraft_stats=spacecraft_stats,
+            agency_mission_monthly=agency_mission_monthly,
+            astronaut_performance=astronaut_performance,
+            launchsite_usage=launchsite_usage,
+            payloads_by_agency=payloads_by_agency,
+            event_success_by_spacecraft=event_success_by_spacecraft,
+            active_astronauts_by_duration=active_astronauts_by_duration,
+            efficiency_by_payload_spacecraft=efficiency_by_payload_spacecraft,
+            top_astronauts_year=top_astronauts_year
+        )
+
+    def stats(self):
+        with self._lock:
+            frames = dict(self.frames)
+        return {
+            "rows": {table: len(frame) for table, frame in frames.items()},
+            "memory_bytes": int(sum(frame.memory_usage(deep=True).sum() for frame in frames.values())),
+            "last_refresh_ms": self.last_refresh_ms,
+            "last_compute_ms": self.last_compute_ms,
+            "refreshes": dict(self.refreshes),
+        }
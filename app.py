@@ -1,8 +1,32 @@
-from flask import Flask, abort, redirect, render_template, request, url_for, session
+from flask import Flask, Response, abort, jsonify, redirect, render_template, request, url_for, session
+import click
+import functools
 import mysql.connector
-from werkzeug.security import generate_password_hash, check_password_hash
 from dotenv import load_dotenv
+import json
 import os
+import re
+import sys
+
+import analytics
+import assets
+import bookmarks
+import careers
+import charts
+import db
+import exporter
+import fragments
+import instrumentation
+import importer
+import jsonapi
+import migrations
+import passwords
+import query_plans
+import rollups
+import versions
+from cache import LRUCache
+from pagination import paginate
+from snapshot import Snapshot
 
 # load environment variables from a .env file
 load_dotenv()
@@ -11,30 +35,127 @@ app = Flask(__name__)
 # use FLASK_SECRET_KEY if set, otherwise fallback to a secure random key for development
 app.secret_key = os.getenv("FLASK_SECRET_KEY") or os.urandom(24)
 
-def connect_db():
+db.init_app(app)
+instrumentation.init_app(app)
+versions.init_app(app)
+fragments.init_app(app)
+assets.init_app(app)
+
+def connect_db(primary=False):
+    # per-request connection from the pool (a read replica for GET requests
+    # when configured); returned automatically on teardown. primary=True for
+    # loaders that fill the process-wide caches below.
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASS"),
-            database=os.getenv("DB_NAME")
-        )
-        print(">>> Database connection successful!")
-        return connection
+        return db.get_db(primary)
     except mysql.connector.Error as err:
         print(f">>> Error connecting to database: {err}")
         return None
 
+def login_required(view):
+    # goes above @versions.conditional, so an anonymous request is sent to
+    # /login before a matching ETag could answer it with 304
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect('/login')
+        return view(*args, **kwargs)
+    return wrapper
+
+# profile pages (entity row + its missions), keyed by (kind, id) and
+# invalidated by the admin assign_* routes that change them
+entity_cache = LRUCache(
+    maxsize=int(os.getenv("ENTITY_CACHE_SIZE") or 1024),
+    ttl=float(os.getenv("ENTITY_CACHE_TTL") or 300)
+)
+
+# per-user bookmarked mission ids for the dashboard and the mission list
+bookmark_cache = bookmarks.BookmarkCache(
+    maxsize=int(os.getenv("BOOKMARK_CACHE_SIZE") or 10000),
+    ttl=float(os.getenv("BOOKMARK_CACHE_TTL") or 60)
+)
+
+def profile_lookup(kind, entity_id, state=False):
+    # (data version, cached context or None). The version is read before
+    # any loading: it keys the page's cached fragments, and an entry loaded
+    # under other counters (a write made through another worker, which
+    # only invalidated its own cache) counts as a miss, so the page never
+    # goes out under an ETag newer than its data. Shared with asgi.py,
+    # which reads the primary's counters (state) and loads a miss itself,
+    # over aiomysql, and hands it to store_profile().
+    version = versions.data_version(*PROFILE_TABLES[kind], primary=True, state=state)
+    context = entity_cache.get((kind, entity_id),
+                               valid=lambda cached: cached['data_version'] == version)
+    return version, context
+
+def store_profile(kind, entity_id, context, version):
+    context['data_version'] = version
+    entity_cache.set((kind, entity_id), context)
+
+def cached_profile(kind, entity_id, loader):
+    version, context = profile_lookup(kind, entity_id)
+    if context is None:
+        context = loader(entity_id)
+        if context is None:
+            abort(404)
+        store_profile(kind, entity_id, context, version)
+    return context
+
+# tables each page reads; their change counters make up its ETag
+MISSION_DETAIL_TABLES = (
+    "missions", "agencies", "mission_agencies", "spacecraft", "mission_spacecraft",
+    "payloads", "mission_payloads", "events", "mission_events",
+    "launchsites", "mission_launchsites"
+)
+STATS_TABLES = MISSION_DETAIL_TABLES + ("astronauts", "missioncrew")
+PROFILE_TABLES = {
+    'astronaut': ("astronauts", "missioncrew", "missions", "mission_spacecraft", "spacecraft"),
+    'agency': ("agencies", "mission_agencies", "missions"),
+    'spacecraft': ("spacecraft", "mission_spacecraft", "missions"),
+    'payload': ("payloads", "mission_payloads", "missions"),
+    'event': ("events", "mission_events", "missions"),
+    'launchsite': ("launchsites", "mission_launchsites", "missions"),
+}
+
+@app.errorhandler(404)
+def not_found(err):
+    if request.path.startswith("/api/"):
+        return jsonapi.error_response(404, "not found")
+    return render_template("404.html"), 404
+
+@app.errorhandler(jsonapi.ApiError)
+def api_error(err):
+    return jsonapi.error_response(err.status, err.message)
+
 @app.route("/")
 def home():
     return render_template("home.html")
 
+# liveness: the worker is up and serving; deliberately does not touch MySQL,
+# so a database outage does not get every container restarted
+@app.route("/healthz")
+def healthz():
+    return jsonify(status="ok")
+
+# readiness: route traffic here only while this worker can reach the database
+@app.route("/readyz")
+def readyz():
+    problem = db.check_db(timeout=float(os.getenv("READY_DB_TIMEOUT") or 2))
+    if problem:
+        return jsonify(status="unavailable", db=problem), 503
+    return jsonify(status="ready", db="ok")
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         username = request.form.get("username")
         password = request.form.get("password")
-        
+
+        # refuse before any hashing once a username or client keeps failing
+        wait = passwords.throttled(username, request.remote_addr)
+        if wait:
+            print("❌ Login throttled for:", username, request.remote_addr)
+            return "🔒 Too many failed attempts. Try again later.", 429, {"Retry-After": str(wait)}
+
         conn = connect_db()
         cursor = conn.cursor(dictionary=True)
         cursor.execute("SELECT * FROM Users WHERE username = %s", (username,))
@@ -42,8 +163,17 @@ def login():
         conn.close()
 
         if user :
-            if check_password_hash(user['password_hash'], password):
+            try:
+                valid = passwords.check(user['password_hash'], password)
+            except passwords.HashBusy as err:
+                print(">>> Password hashing saturated:", err)
+                return "🔒 Server busy, please try again.", 503, {"Retry-After": "2"}
+
+            if valid:
                 print("✅ Login successful for:", user['username'])
+                passwords.login_succeeded(username)
+                if passwords.needs_rehash(user['password_hash']):
+                    rehash_password(user['user_id'], password)
                 session['user_id'] = user['user_id']
                 session['username'] = user['username']
                 session['role'] = user['role']
@@ -55,13 +185,31 @@ def login():
 
             else:
                 print("❌ Password incorrect for:", user['username'])
+                passwords.login_failed(username, request.remote_addr)
                 return "🔒 Incorrect password."
         else:
             print("❌ No user found with that username.")
+            passwords.login_failed(username, request.remote_addr)
             return "🔒 User not found."
 
     return render_template("login.html")
 
+def rehash_password(user_id, password):
+    # the stored hash uses older parameters than PASSWORD_HASH_METHOD;
+    # upgrade it now that the plain password is at hand. Best effort:
+    # the login itself already succeeded.
+    try:
+        new_hash = passwords.generate(password)
+    except passwords.HashBusy:
+        return
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE Users SET password_hash = %s WHERE user_id = %s", (new_hash, user_id))
+    conn.commit()
+    cursor.close()
+    conn.close()
+    print(">>> Rehashed password for user", user_id)
+
 @app.route("/logout")
 def logout():
     session.clear()
@@ -74,7 +222,11 @@ def register():
         password = request.form["password"]
         role = "user"
 
-        hashed_pw = generate_password_hash(password)
+        try:
+            hashed_pw = passwords.generate(password)
+        except passwords.HashBusy as err:
+            print(">>> Password hashing saturated:", err)
+            return "❌ Server busy, please try again.", 503, {"Retry-After": "2"}
 
         conn = connect_db()
         cursor = conn.cursor()
@@ -96,35 +248,43 @@ def register():
     
     return render_template("register.html")
 
+def bookmark_page_tables():
+    # pages showing the signed-in user's bookmarks: the ETag follows that
+    # user's own counter, the one their cached set is validated against
+    if 'user_id' in session:
+        return ("missions", bookmarks.counter(session['user_id']))
+    return ("missions",)
+
 @app.route('/dashboard')
+@login_required
+@versions.conditional(bookmark_page_tables)
 def dashboard():
     conn = connect_db()
-    cur = conn.cursor(dictionary=True)
-
-    # Quick stats
-    cur.execute("SELECT COUNT(*) AS total_bookmarks FROM bookmarks WHERE user_id=%s", (session['user_id'],))
-    total_bookmarks = cur.fetchone()['total_bookmarks']
-
-    # Bookmarked missions
-    cur.execute("""
-      SELECT m.mission_id, m.mission_name, m.status
-      FROM bookmarks b
-      JOIN missions m ON b.mission_id = m.mission_id
-      WHERE b.user_id = %s
-      ORDER BY m.launch_date DESC
-    """, (session['user_id'],))
-    bookmarks = cur.fetchall()
-
-    cur.close(); conn.close()
+    marks = bookmark_cache.get(conn, session['user_id'])
+
+    # Bookmarked missions: primary-key lookups, skipped entirely when empty
+    bookmarked = []
+    if marks:
+        ids = list(marks)
+        cur = conn.cursor(dictionary=True)
+        cur.execute(f"""
+          SELECT mission_id, mission_name, status
+          FROM missions
+          WHERE mission_id IN ({','.join(['%s'] * len(ids))})
+          ORDER BY launch_date DESC
+        """, tuple(ids))
+        bookmarked = cur.fetchall()
+        cur.close()
+    conn.close()
 
     stats = {
-      'total_bookmarks': total_bookmarks,
+      'total_bookmarks': len(marks),
     }
 
     return render_template(
       'dashboard.html',
       stats=stats,
-      bookmarks=bookmarks
+      bookmarks=bookmarked
     )
 
 
@@ -143,117 +303,344 @@ def admin_users():
 
     conn = connect_db()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT user_id, username, role FROM Users ORDER BY user_id")
-    users = cursor.fetchall()
+    page = paginate(cursor, "SELECT user_id, username, role FROM Users", [], [],
+                    "user_id", "user_id")
     conn.close()
 
-    return render_template("admin_users.html", users=users)
+    return render_template("admin_users.html", users=page.items, page=page)
 
-@app.route('/missions')
-def view_missions():
+@app.route("/admin/db_pool")
+def admin_db_pool():
+    if session.get("role") != "admin":
+        return abort(403)
+    return jsonify(db.pool_stats())
+
+@app.route("/admin/metrics")
+def admin_metrics():
+    # admins in the browser, or a scraper sending "Authorization: Bearer $METRICS_TOKEN"
+    token = os.getenv("METRICS_TOKEN")
+    authorized = session.get("role") == "admin" or (
+        token and request.headers.get("Authorization") == f"Bearer {token}"
+    )
+    if not authorized:
+        return abort(403)
+
+    pool = db.pool_stats()
+    cache = entity_cache.stats()
+    marks = bookmark_cache.stats()
+    rendered = fragments.fragment_cache.stats()
+    engine = stats_engine.stats()
+    gauges = [
+        ("missiondex_db_pool_in_use", "Pooled connections checked out.", pool["in_use"]),
+        ("missiondex_db_pool_idle", "Pooled connections idle.", pool["idle"]),
+        ("missiondex_db_replicas_healthy", "Read replicas currently in rotation.",
+         sum(replica["healthy"] for replica in pool.get("replicas", []))),
+        ("missiondex_password_hash_in_flight", "Password hashes running or queued.", passwords.hasher.in_flight()),
+        ("missiondex_password_hash_queue_depth", "Password hashes waiting for a thread.", passwords.hasher.queue_depth()),
+        ("missiondex_chart_renders_in_flight", "Charts rendering or queued in the process pool.", charts.renderer.in_flight()),
+        ("missiondex_analytics_memory_bytes", "Memory held by the in-memory stats tables.", engine["memory_bytes"]),
+        ("missiondex_analytics_refresh_ms", "Duration of the last stats table refresh.", engine["last_refresh_ms"] or 0),
+        ("missiondex_analytics_compute_ms", "Duration of the last in-memory stats computation.", engine["last_compute_ms"] or 0),
+    ]
+    counters = [
+        ("missiondex_db_pool_checkout_timeouts_total", "Checkouts that gave up waiting.", pool["timeouts"]),
+        ("missiondex_entity_cache_hits_total", "Profile cache hits.", cache["hits"]),
+        ("missiondex_entity_cache_misses_total", "Profile cache misses.", cache["misses"]),
+        ("missiondex_bookmark_cache_hits_total", "Bookmark set cache hits.", marks["hits"]),
+        ("missiondex_bookmark_cache_misses_total", "Bookmark set cache misses.", marks["misses"]),
+        ("missiondex_fragment_cache_hits_total", "Template fragments served from cache.", rendered["hits"]),
+        ("missiondex_fragment_cache_misses_total", "Template fragments rendered.", rendered["misses"]),
+    ]
+    return instrumentation.render_metrics(gauges, counters), 200, {
+        "Content-Type": "text/plain; version=0.0.4; charset=utf-8"
+    }
+
+@app.route("/admin/analytics")
+def admin_analytics():
+    if session.get("role") != "admin":
+        return abort(403)
+    return jsonify(stats_engine.stats())
+
+@app.route("/admin/entity_cache")
+def admin_entity_cache():
+    if session.get("role") != "admin":
+        return abort(403)
+    return jsonify(entity_cache.stats())
+
+@app.route("/admin/fragment_cache")
+def admin_fragment_cache():
+    if session.get("role") != "admin":
+        return abort(403)
+    return jsonify(fragments.fragment_cache.stats())
+
+@app.route("/admin/import", methods=["GET", "POST"])
+def admin_import():
+    if session.get("role") != "admin":
+        return redirect("/login")
+
+    report = None
+    if request.method == "POST":
+        kind = request.form.get("kind")
+        upload = request.files.get("file")
+        if kind not in importer.KINDS:
+            error = f"kind must be one of {', '.join(importer.KINDS)}"
+        elif not upload or not upload.filename:
+            error = "choose a CSV or JSON Lines file to import"
+        else:
+            error = None
+        if error:
+            return render_template("admin_import.html", kinds=importer.KINDS, error=error), 400
+
+        conn = connect_db()
+        try:
+            report = importer.import_stream(
+                conn,
+                kind,
+                importer.text_stream(upload.stream),
+                importer.detect_format(upload.filename)
+            )
+        finally:
+            conn.close()
+        stats_snapshot.invalidate()
+        entity_cache.clear()
+        if report.stopped:
+            return render_template("admin_import.html", kinds=importer.KINDS, report=report,
+                                   error=report.stopped), 400
+
+    return render_template("admin_import.html", kinds=importer.KINDS, report=report)
+
+@app.cli.command("import-data")
+@click.argument("kind", type=click.Choice(importer.KINDS))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+              help="defaults to the file extension")
+@click.option("--chunk-size", default=500, show_default=True,
+              help="rows per INSERT batch and transaction")
+def import_data_command(kind, path, fmt, chunk_size):
+    """Bulk import a CSV or JSONL file, e.g. `flask import-data missions missions.csv`."""
+    conn = connect_db()
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        report = importer.import_stream(
+            conn, kind, stream, fmt or importer.detect_format(path), chunk_size
+        )
+    conn.close()
+    print(report.summary())
+    for line, message in report.errors:
+        print(f"  line {line}: {message}")
+    if report.stopped:
+        raise click.ClickException(report.stopped)
+
+@app.cli.command("export-missions")
+@click.argument("path", type=click.Path(dir_okay=False, allow_dash=True))
+@click.option("--format", "fmt", type=click.Choice(list(exporter.FORMATS)),
+              help="defaults to the file extension")
+@click.option("--gzip", is_flag=True, help="gzip the output (implied by a .gz path)")
+def export_missions_command(path, fmt, gzip):
+    """Export every mission with its related names, e.g. `flask export-missions missions.csv.gz`."""
+    name = path[:-3] if path.endswith(".gz") else path
+    gzip = gzip or name != path
+    fmt = fmt or os.path.splitext(name)[1].lstrip(".").lower()
+    if fmt not in exporter.FORMATS:
+        raise click.BadParameter("pick --format or use a .csv, .jsonl or .parquet path", param_hint="PATH")
+    try:
+        chunks = exporter.export_missions(db.read_pool(), fmt, gzip)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+    with click.open_file(path, "wb") as out:
+        for chunk in chunks:
+            out.write(chunk)
+    print(f">>> Exported missions to {path}", file=sys.stderr)
+
+@app.cli.command("rollups-rebuild")
+def rollups_rebuild_command():
+    """Recompute the monthly statistics rollups from the mission tables."""
+    conn = connect_db()
+    counts = rollups.rebuild(conn)
+    conn.close()
+    for table, rows in counts.items():
+        print(f">>> {table}: {rows} row(s)")
+
+@app.cli.command("assets-build")
+def assets_build_command():
+    """Fingerprint, convert and precompress static/ into static/dist/ (run on deploy)."""
+    summary = assets.build(app.static_folder)
+    print(f">>> {summary['files']} asset(s), {summary['images']} image(s) with variants, "
+          f"{summary['precompressed']} precompressed")
+
+@app.cli.command("careers-rebuild")
+def careers_rebuild_command():
+    """Recompute the astronaut career summaries from the crew and mission tables."""
+    conn = connect_db()
+    rows = careers.rebuild(conn)
+    conn.close()
+    print(f">>> astronaut_careers: {rows} row(s)")
+
+@app.cli.command("db-migrate")
+@click.option("--to", "target", type=int, help="stop at this version (default: latest)")
+def db_migrate_command(target):
+    """Apply pending schema migrations from database/migrations."""
+    conn = connect_db()
+    try:
+        done = migrations.upgrade(conn, target)
+    except migrations.MigrationError as err:
+        raise click.ClickException(str(err))
+    finally:
+        conn.close()
+    print(f">>> {len(done)} migration(s) applied")
+
+@app.cli.command("db-rollback")
+@click.option("--to", "target", type=int, required=True, help="revert everything newer than this version")
+def db_rollback_command(target):
+    """Revert applied schema migrations newer than --to."""
+    conn = connect_db()
+    try:
+        done = migrations.downgrade(conn, target)
+    except migrations.MigrationError as err:
+        raise click.ClickException(str(err))
+    finally:
+        conn.close()
+    print(f">>> {len(done)} migration(s) reverted")
+
+@app.cli.command("db-status")
+def db_status_command():
+    """List schema migrations and whether they are applied."""
+    conn = connect_db()
+    for migration, applied in migrations.status(conn):
+        print(f"{'[x]' if applied else '[ ]'} {migration}")
+    conn.close()
+
+@app.cli.command("db-explain")
+@click.option("--max-rows", type=int, default=query_plans.DEFAULT_MAX_ROWS, show_default=True,
+              help="fail on full table scans estimated above this many rows")
+@click.option("--verbose", is_flag=True, help="print every plan, not just failures")
+def db_explain_command(max_rows, verbose):
+    """EXPLAIN every query the read routes issue and fail on large full scans."""
+    plans = query_plans.collect_plans(sys.modules[__name__])
+    if verbose:
+        for route, sql, rows in plans:
+            print(f"{route}: {sql}")
+            for row in rows if sql else []:
+                print(f"    {row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')}")
+    problems = query_plans.full_scans(plans, max_rows)
+    for route, problem, sql in problems:
+        print(f"✗ {route}: {problem}")
+        if sql:
+            print(f"    {sql}")
+    print(f">>> {len(plans)} queries checked, {len(problems)} problem(s)")
+    if problems:
+        sys.exit(1)
+
+def mission_filters():
+    # ?type= / ?status= / ?destination= as WHERE conditions, shared with the API
     mission_type = request.args.get('type')
     status = request.args.get('status')
     destination = request.args.get('destination')
 
-    query = "SELECT mission_id, mission_name, mission_type, destination, launch_date, status FROM missions WHERE 1=1"
+    where = []
     params = []
 
     if mission_type:
-        query += " AND mission_type = %s"
+        where.append("mission_type = %s")
         params.append(mission_type)
     if status:
-        query += " AND status = %s"
+        where.append("status = %s")
         params.append(status)
     if destination:
-        query += " AND destination = %s"
+        where.append("destination = %s")
         params.append(destination)
+    return where, params
 
-    query += " ORDER BY launch_date DESC"
+@app.route('/missions')
+@versions.conditional(bookmark_page_tables)
+def view_missions():
+    query = "SELECT mission_id, mission_name, mission_type, destination, launch_date, status FROM missions"
+    where, params = mission_filters()
+    # read before the query: keys the cached mission cards
+    version = versions.data_version("missions")
 
     conn = connect_db()
     cur = conn.cursor(dictionary=True)
-    cur.execute(query, tuple(params))
-    missions = cur.fetchall()
+    page = paginate(cur, query, where, params, "launch_date", "mission_id", desc=True)
     cur.close()
+    marks = bookmark_cache.get(conn, session['user_id']) if 'user_id' in session else None
     conn.close()
-    return render_template('missions.html', missions=missions)
+    return render_template('missions.html', missions=page.items, page=page, bookmarked=marks,
+                           data_version=version)
+
+def _json_list(value):
+    return json.loads(value) if value else []
+
+# Everything mission_detail needs in a single round trip: the mission row
+# plus one JSON array per related entity, built server-side by correlated
+# subqueries over the junction tables.
+MISSION_DETAIL_QUERY = """
+    SELECT m.*,
+      (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                'agency_id', a.agency_id, 'name', a.name, 'country', a.country))
+         FROM mission_agencies ma
+         JOIN agencies a ON ma.agency_id = a.agency_id
+        WHERE ma.mission_id = m.mission_id) AS agencies_json,
+      (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                'spacecraft_id', s.spacecraft_id, 'name', s.name, 'type', s.type))
+         FROM mission_spacecraft ms
+         JOIN spacecraft s ON ms.spacecraft_id = s.spacecraft_id
+        WHERE ms.mission_id = m.mission_id) AS crafts_json,
+      (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                'payload_id', p.payload_id, 'name', p.name, 'type', p.type,
+                'weight_kg', CAST(p.weight_kg AS CHAR)))
+         FROM mission_payloads mp
+         JOIN payloads p ON mp.payload_id = p.payload_id
+        WHERE mp.mission_id = m.mission_id) AS payloads_json,
+      (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                'event_id', e.event_id, 'name', e.name, 'category', e.category,
+                'date', e.date))
+         FROM mission_events me
+         JOIN events e ON me.event_id = e.event_id
+        WHERE me.mission_id = m.mission_id) AS events_json,
+      (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                'launchsite_id', ls.launchsite_id, 'name', ls.name, 'country', ls.country))
+         FROM mission_launchsites ml
+         JOIN launchsites ls ON ml.launchsite_id = ls.launchsite_id
+        WHERE ml.mission_id = m.mission_id) AS launchsites_json
+    FROM missions m
+    WHERE m.mission_id = %s
+"""
+
+def load_mission_detail(cur, mission_id):
+    cur.execute(MISSION_DETAIL_QUERY, (mission_id,))
+    return mission_detail_context(cur.fetchone())
+
+def mission_detail_context(mission):
+    # unpacks a MISSION_DETAIL_QUERY row into the mission_detail.html context
+    if not mission:
+        return dict(mission=None, agencies=[], crafts=[], payloads=[],
+                    events=[], launchsites=[])
+
+    events = _json_list(mission.pop('events_json'))
+    # JSON_ARRAYAGG does not keep ORDER BY; dates are ISO strings, NULLs last
+    events.sort(key=lambda e: e['date'] or '', reverse=True)
+
+    return dict(
+        mission=mission,
+        agencies=_json_list(mission.pop('agencies_json')),
+        crafts=_json_list(mission.pop('crafts_json')),
+        payloads=_json_list(mission.pop('payloads_json')),
+        events=events,
+        launchsites=_json_list(mission.pop('launchsites_json'))
+    )
 
 # Enhance Mission Detail Route
 @app.route('/missions/<int:mission_id>')
+@login_required
+@versions.conditional(*MISSION_DETAIL_TABLES)
 def mission_detail(mission_id):
-    if 'user_id' not in session:
-        return redirect('/login')
-
-    # 1. Open DB connection
     conn = connect_db()
     cur  = conn.cursor(dictionary=True)
-
-    # 2. Fetch base mission record
-    cur.execute(
-        "SELECT * FROM missions WHERE mission_id = %s",
-        (mission_id,)
-    )
-    mission = cur.fetchone()
-
-    # 3. Fetch participating agencies
-    cur.execute("""
-        SELECT a.agency_id, a.name, a.country
-        FROM mission_agencies ma
-        JOIN agencies a ON ma.agency_id = a.agency_id
-        WHERE ma.mission_id = %s
-    """, (mission_id,))
-    agencies = cur.fetchall()
-
-    # 4. Fetch spacecraft used
-    cur.execute("""
-        SELECT s.spacecraft_id, s.name, s.type
-        FROM mission_spacecraft ms
-        JOIN spacecraft s ON ms.spacecraft_id = s.spacecraft_id
-        WHERE ms.mission_id = %s
-    """, (mission_id,))
-    crafts = cur.fetchall()
-
-    # 5. Fetch payloads on this mission
-    cur.execute("""
-        SELECT p.payload_id, p.name, p.type, p.weight_kg
-        FROM mission_payloads mp
-        JOIN payloads p ON mp.payload_id = p.payload_id
-        WHERE mp.mission_id = %s
-    """, (mission_id,))
-    payloads = cur.fetchall()
-
-    # Events
-    cur.execute("""
-      SELECT e.event_id, e.name, e.category, e.date
-      FROM mission_events me
-      JOIN events e ON me.event_id=e.event_id
-      WHERE me.mission_id=%s
-      ORDER BY e.date DESC
-    """, (mission_id,))
-    events = cur.fetchall()
-
-    # launch sites
-    cur.execute("""
-      SELECT ls.launchsite_id, ls.name, ls.country
-      FROM mission_launchsites ml
-      JOIN launchsites ls ON ml.launchsite_id=ls.launchsite_id
-      WHERE ml.mission_id=%s
-    """, (mission_id,))
-    launchsites = cur.fetchall()
-
-    # 6. Clean up and render
+    context = load_mission_detail(cur, mission_id)
     cur.close()
     conn.close()
 
-    return render_template(
-        'mission_detail.html',
-        mission=mission,
-        agencies=agencies,
-        crafts=crafts,
-        payloads=payloads,
-        events=events,
-        launchsites=launchsites
-    )
+    return render_template('mission_detail.html', **context)
 
 
 @app.route('/admin/add_mission', methods=['GET', 'POST'])
@@ -277,7 +664,12 @@ def add_mission():
             INSERT INTO missions (mission_name, mission_type, destination, launch_date, duration, status, description)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
         """, (mission_name, mission_type, destination, launch_date, duration, status, description))
+        mission_id = cur.lastrowid
+        rollups.missions_changed(cur, [mission_id])
+        careers.missions_changed(cur, [mission_id])
+        versions.bump(cur, "missions")
         conn.commit()
+        stats_snapshot.invalidate()
 
         return redirect('/missions')  # After successful insert
 
@@ -290,57 +682,62 @@ def bookmark_mission(mission_id):
     if 'user_id' not in session:
         return redirect('/login')
 
-    user_id = session['user_id']
     conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM bookmarks WHERE user_id=%s AND mission_id=%s", (user_id, mission_id))
-    if not cur.fetchone():
-        cur.execute("INSERT INTO bookmarks (user_id, mission_id) VALUES (%s, %s)", (user_id, mission_id))
-        conn.commit()
-    cur.close()
+    bookmark_cache.add(conn, session['user_id'], mission_id)
     conn.close()
-    return redirect('/missions')
+    return redirect(back_to('/missions'))
+
+@app.route('/unbookmark/<int:mission_id>', methods=['POST'])
+def unbookmark_mission(mission_id):
+    if 'user_id' not in session:
+        return redirect('/login')
 
-@app.route('/mission_stats')
-def mission_stats():
     conn = connect_db()
-    cur = conn.cursor(dictionary=True)
+    bookmark_cache.remove(conn, session['user_id'], mission_id)
+    conn.close()
+    return redirect(back_to('/missions'))
+
+def back_to(default):
+    # the forms post a local "next" path (e.g. /missions?after=...) to return to
+    target = request.form.get('next') or ''
+    if not target.startswith('/') or target.startswith(('//', '/\\')):
+        return default
+    return target
 
+STATS_YEAR = 2023  # for "Top Astronauts in Year"; /mission_stats/range takes any range
+
+# (context name, fetch, sql, params) for the ten aggregates on /mission_stats,
+# run in turn by load_mission_stats when STATS_ENGINE=sql.
+MISSION_STATS_QUERIES = [
     # 1. Average Astronaut Participation
-    cur.execute("""
+    ("avg_astronauts", "value", """
         SELECT ROUND(AVG(count)) AS avg_astronauts
         FROM (
             SELECT COUNT(*) AS count
             FROM missioncrew
             GROUP BY mission_id
         ) AS counts
-    """)
-    avg_astronauts = cur.fetchone()['avg_astronauts']
-
+    """, ()),
     # 2. Spacecraft Success Rate
-    cur.execute("""
+    ("spacecraft_stats", "all", """
         SELECT s.name,
                ROUND(SUM(m.status='Completed') / COUNT(*) * 100, 2) AS success_rate
         FROM mission_spacecraft ms
         JOIN spacecraft s ON ms.spacecraft_id = s.spacecraft_id
         JOIN missions m ON ms.mission_id = m.mission_id
         GROUP BY s.spacecraft_id
-    """)
-    spacecraft_stats = cur.fetchall()
-
+    """, ()),
     # 3. Monthly Mission Count per Agency
-    cur.execute("""
+    ("agency_mission_monthly", "all", """
         SELECT a.name AS agency, MONTH(m.launch_date) AS month,
                COUNT(*) AS mission_count
         FROM mission_agencies ma
         JOIN agencies a ON ma.agency_id = a.agency_id
         JOIN missions m ON ma.mission_id = m.mission_id
         GROUP BY a.agency_id, MONTH(m.launch_date)
-    """)
-    agency_mission_monthly = cur.fetchall()
-
+    """, ()),
     # 4. Astronaut Mission Success
-    cur.execute("""
+    ("astronaut_performance", "all", """
         SELECT ac.full_name, m.mission_name,
                COUNT(*) AS total_missions,
                SUM(m.status='Completed') AS successful
@@ -348,32 +745,26 @@ def mission_stats():
         JOIN astronauts ac ON mc.astronaut_id = ac.astronaut_id
         JOIN missions m ON mc.mission_id = m.mission_id
         GROUP BY ac.astronaut_id, m.mission_id
-    """)
-    astronaut_performance = cur.fetchall()
-
+    """, ()),
     # 5. Launch Site Popularity
-    cur.execute("""
+    ("launchsite_usage", "all", """
         SELECT l.name, COUNT(*) AS launch_count
         FROM mission_launchsites ml
         JOIN launchsites l ON ml.launchsite_id = l.launchsite_id
         GROUP BY l.launchsite_id
         ORDER BY launch_count DESC
-    """)
-    launchsite_usage = cur.fetchall()
-
+    """, ()),
     # 6. Payloads per Agency
-    cur.execute("""
+    ("payloads_by_agency", "all", """
         SELECT a.name AS agency, COUNT(p.payload_id) AS payloads_launched
         FROM mission_payloads mp
         JOIN payloads p ON mp.payload_id = p.payload_id
         JOIN mission_agencies ma ON mp.mission_id = ma.mission_id
         JOIN agencies a ON ma.agency_id = a.agency_id
         GROUP BY a.agency_id
-    """)
-    payloads_by_agency = cur.fetchall()
-
+    """, ()),
     # 7. Mission Event Success by Spacecraft
-    cur.execute("""
+    ("event_success_by_spacecraft", "all", """
         SELECT s.name,
                ROUND(SUM(e.category IN ('Docking','Landing','Launch')) / COUNT(*) * 100, 2) AS event_success_rate
         FROM mission_events me
@@ -381,24 +772,17 @@ def mission_stats():
         JOIN mission_spacecraft ms ON me.mission_id = ms.mission_id
         JOIN spacecraft s ON ms.spacecraft_id = s.spacecraft_id
         GROUP BY s.spacecraft_id
-    """)
-    event_success_by_spacecraft = cur.fetchall()
-
-    # 8. Most Active Astronauts by Duration
-    cur.execute("""
-        SELECT a.full_name,
-               SUM(m.duration) AS total_duration
-        FROM missioncrew mc
-        JOIN astronauts a ON mc.astronaut_id = a.astronaut_id
-        JOIN missions m ON mc.mission_id = m.mission_id
-        GROUP BY a.astronaut_id
-        ORDER BY total_duration DESC
+    """, ()),
+    # 8. Most Active Astronauts by Duration (maintained career summary)
+    ("active_astronauts_by_duration", "all", """
+        SELECT a.full_name, c.total_duration
+        FROM astronaut_careers c
+        JOIN astronauts a ON c.astronaut_id = a.astronaut_id
+        ORDER BY c.total_duration DESC
         LIMIT 10
-    """)
-    active_astronauts_by_duration = cur.fetchall()
-
+    """, ()),
     # 9. Payload-Mission Efficiency by Spacecraft
-    cur.execute("""
+    ("efficiency_by_payload_spacecraft", "all", """
         SELECT s.name,
                ROUND(AVG(CASE WHEN m.status='Completed' THEN 1 ELSE 0 END) * 100, 2) AS success_rate
         FROM missions m
@@ -406,12 +790,9 @@ def mission_stats():
         JOIN spacecraft s ON ms.spacecraft_id = s.spacecraft_id
         JOIN mission_payloads mp ON m.mission_id = mp.mission_id
         GROUP BY s.spacecraft_id
-    """)
-    efficiency_by_payload_spacecraft = cur.fetchall()
-
-    # 10. Top Astronauts in Year
-    year = 2023  # or make it dynamic with query param
-    cur.execute("""
+    """, ()),
+    # 10. Top Astronauts in Year (STATS_YEAR)
+    ("top_astronauts_year", "all", """
         SELECT a.full_name, COUNT(*) AS mission_count
         FROM missioncrew mc
         JOIN astronauts a ON mc.astronaut_id = a.astronaut_id
@@ -420,69 +801,187 @@ def mission_stats():
         GROUP BY a.astronaut_id
         ORDER BY mission_count DESC
         LIMIT 5
-    """, (year,))
-    top_astronauts_year = cur.fetchall()
+    """, (STATS_YEAR,)),
+]
+
+def shape_rows(rows, fetch):
+    # "all" -> every row, "one" -> first row or None, "value" -> its first column
+    if fetch == "all":
+        return rows
+    row = rows[0] if rows else None
+    if fetch == "value":
+        return next(iter(row.values())) if row else None
+    return row
+
+# STATS_ENGINE=columnar (default) keeps the tables behind the stats in memory
+# (analytics.py) and recomputes from there, fetching only rows added since
+# the last refresh; STATS_ENGINE=sql runs the queries above every time.
+STATS_ENGINE = os.getenv("STATS_ENGINE") or "columnar"
+stats_engine = analytics.AnalyticsEngine(
+    full_reload=float(os.getenv("ANALYTICS_FULL_RELOAD") or 3600)
+)
+
+def load_mission_stats():
+    conn = connect_db(primary=True)
+    if STATS_ENGINE == "columnar":
+        stats_engine.refresh(conn, versions.current(primary=True))
+        conn.close()
+        return stats_engine.mission_stats(STATS_YEAR)
+    cur = conn.cursor(dictionary=True)
+    stats = {}
+    for name, fetch, sql, params in MISSION_STATS_QUERIES:
+        cur.execute(sql, params)
+        stats[name] = shape_rows(cur.fetchall(), fetch)
+    cur.close(); conn.close()
+    return stats
+
+# the ten aggregates above only change when an admin adds a mission or
+# links something to one, so they are computed once and served from memory
+# until the tables' counters move (a write through any worker)
+stats_snapshot = Snapshot(
+    load_mission_stats,
+    max_age=float(os.getenv("STATS_SNAPSHOT_MAX_AGE") or 300),
+    key=lambda: versions.data_version(*STATS_TABLES, primary=True)
+)
+
+def mission_stats_context():
+    # the mission_stats.html context, shared with asgi.py; the generation
+    # keys the page's cached fragments
+    stats, generation = stats_snapshot.stamped()
+    return dict(stats, year=STATS_YEAR, stats_generation=generation)
 
+@app.route('/mission_stats')
+@versions.conditional(*STATS_TABLES)
+def mission_stats():
+    return render_template('mission_stats.html', **mission_stats_context())
+
+@app.route('/mission_stats/range')
+@versions.conditional(*rollups.SOURCE_TABLES)
+def mission_stats_range():
+    # ?from=YYYY[-MM]&to=YYYY[-MM], both optional; answered from the monthly rollups
+    start = request.args.get('from', '')
+    end = request.args.get('to', '')
+    try:
+        first, last = rollups.parse_range(start, end)
+    except ValueError as err:
+        return render_template('mission_stats_range.html', error=str(err), start=start, end=end), 400
+
+    conn = connect_db()
+    stats = rollups.range_stats(conn, first, last)
+    conn.close()
+    return render_template('mission_stats_range.html', start=start, end=end, **stats)
+
+# chart -> tables it reads; the cached image is keyed by their change counters
+CHART_TABLES = {
+    "spacecraft-success": ("missions", "mission_spacecraft", "spacecraft"),
+    "launchsites": ("mission_launchsites", "launchsites"),
+    "agency-monthly": ("missions", "mission_agencies", "agencies"),
+}
+STATS_QUERY = {name: (fetch, sql, params) for name, fetch, sql, params in MISSION_STATS_QUERIES}
+
+def chart_tables(name, fmt):
+    return CHART_TABLES.get(name, ())
+
+def load_chart_data(name):
+    # straight from the database, not stats_snapshot: another worker's
+    # snapshot may be older than the counters the image is filed under
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+    if name == "agency-monthly":
+        rows = rollups.agency_monthly(cur, *rollups.parse_range(None, None))  # all time
+        data = [(row["agency"], row["month"].strftime("%Y-%m"), row["mission_count"]) for row in rows]
+    elif name == "spacecraft-success":
+        _, sql, params = STATS_QUERY["spacecraft_stats"]
+        cur.execute(sql, params)
+        data = [(row["name"], float(row["success_rate"] or 0)) for row in cur.fetchall()]
+    else:
+        _, sql, params = STATS_QUERY["launchsite_usage"]
+        cur.execute(sql, params)
+        data = [(row["name"], row["launch_count"]) for row in cur.fetchall()]
     cur.close(); conn.close()
-    return render_template('mission_stats.html',
-        avg_astronauts=avg_astronauts,
-        spacecraft_stats=spacecraft_stats,
-        agency_mission_monthly=agency_mission_monthly,
-        astronaut_performance=astronaut_performance,
-        launchsite_usage=launchsite_usage,
-        payloads_by_agency=payloads_by_agency,
-        event_success_by_spacecraft=event_success_by_spacecraft,
-        active_astronauts_by_duration=active_astronauts_by_duration,
-        efficiency_by_payload_spacecraft=efficiency_by_payload_spacecraft,
-        top_astronauts_year=top_astronauts_year
-    )
+    return data
+
+@app.route('/charts/<name>.<fmt>')
+@versions.conditional(chart_tables)
+def chart(name, fmt):
+    if name not in CHART_TABLES or fmt not in charts.FORMATS:
+        abort(404)
+
+    state = versions.current()
+    if state is not None:
+        version = ",".join(f"{table}={state.get(table, (0, None))[0]}" for table in CHART_TABLES[name])
+        image = charts.renderer.cached(name, fmt, version)
+    else:
+        image = None
+    if image is None:
+        data = load_chart_data(name)
+        if state is None:
+            # no change counters (migration 0004 missing): key on the data itself
+            version = repr(data)
+            image = charts.renderer.cached(name, fmt, version)
+        if image is None:
+            try:
+                image = charts.renderer.render(name, fmt, version, data)
+            except charts.ChartBusy as err:
+                print(f">>> chart {name}.{fmt} not rendered: {err}")
+                return "Charts are busy, try again shortly", 503, {"Retry-After": "2"}
+    return Response(image, mimetype=charts.FORMATS[fmt])
+
+# astronauts with their career summary; astronauts without missions have no
+# astronaut_careers row
+ASTRONAUT_LIST_QUERY = """
+    SELECT a.*,
+           COALESCE(c.missions, 0) AS missions,
+           COALESCE(c.completed, 0) AS completed,
+           c.total_duration, c.spacecraft,
+           c.last_mission_id, lm.mission_name AS last_mission_name,
+           lm.launch_date AS last_launch_date
+    FROM astronauts a
+    LEFT JOIN astronaut_careers c ON c.astronaut_id = a.astronaut_id
+    LEFT JOIN missions lm ON lm.mission_id = c.last_mission_id
+"""
 
 @app.route('/astronauts')
+@login_required
+@versions.conditional(*PROFILE_TABLES["astronaut"])
 def view_astronauts():
-    if 'user_id' not in session:
-        return redirect('/login')
-
     conn = connect_db()
     cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM astronauts")
-    astronauts = cur.fetchall()
+    page = paginate(cur, ASTRONAUT_LIST_QUERY, [], [], "a.full_name", "a.astronaut_id")
     cur.close()
     conn.close()
-    return render_template('astronauts.html', astronauts=astronauts)
-
-@app.route('/astronaut/<int:astronaut_id>')
-def astronaut_profile(astronaut_id):
-    if 'user_id' not in session:
-        return redirect('/login')
-
-    conn = connect_db()
-    cur  = conn.cursor(dictionary=True)
+    return render_template('astronauts.html', astronauts=page.items, page=page)
 
+# (context name, fetch, sql) for the astronaut profile, each taking the
+# astronaut id; asgi.py issues the three concurrently
+ASTRONAUT_PROFILE_QUERIES = [
     # 1. Core astronaut data
-    cur.execute("""
+    ("astronaut", "one", """
       SELECT *
       FROM astronauts
       WHERE astronaut_id = %s
-    """, (astronaut_id,))
-    astronaut = cur.fetchone()
-
-    # 2. Summary stats: total missions, successful missions, success rate
-    cur.execute("""
+    """),
+    # 2. Summary stats from the maintained career summary (careers.py)
+    ("stats", "one", """
       SELECT
-        COUNT(*)                  AS total_missions,
-        SUM(m.status = 'Completed') AS successful_missions,
-        IF(COUNT(*) > 0,
-           ROUND(SUM(m.status = 'Completed')/COUNT(*)*100,2),
+        COALESCE(c.missions, 0)   AS total_missions,
+        COALESCE(c.completed, 0)  AS successful_missions,
+        IF(c.missions > 0,
+           ROUND(c.completed/c.missions*100,2),
            0
-        )                          AS success_rate
-      FROM missioncrew mc
-      JOIN missions m ON mc.mission_id = m.mission_id
-      WHERE mc.astronaut_id = %s
-    """, (astronaut_id,))
-    stats = cur.fetchone()
-
+        )                          AS success_rate,
+        c.total_duration,
+        c.spacecraft,
+        c.last_mission_id,
+        lm.mission_name            AS last_mission_name,
+        lm.launch_date             AS last_launch_date
+      FROM astronauts a
+      LEFT JOIN astronaut_careers c ON c.astronaut_id = a.astronaut_id
+      LEFT JOIN missions lm ON lm.mission_id = c.last_mission_id
+      WHERE a.astronaut_id = %s
+    """),
     # 3. Detailed mission history
-    cur.execute("""
+    ("missions", "all", """
       SELECT
         m.mission_id,
         m.mission_name,
@@ -502,18 +1001,29 @@ def astronaut_profile(astronaut_id):
       WHERE mc.astronaut_id = %s
       GROUP BY m.mission_id
       ORDER BY m.launch_date DESC
-    """, (astronaut_id,))
-    missions = cur.fetchall()
+    """),
+]
 
+def load_astronaut_profile(astronaut_id):
+    conn = connect_db(primary=True)
+    cur  = conn.cursor(dictionary=True)
+    context = {}
+    for name, fetch, sql in ASTRONAUT_PROFILE_QUERIES:
+        cur.execute(sql, (astronaut_id,))
+        context[name] = shape_rows(cur.fetchall(), fetch)
     cur.close()
     conn.close()
 
-    return render_template(
-      'astronaut_profile.html',
-      astronaut=astronaut,
-      stats=stats,
-      missions=missions
-    )
+    if context['astronaut'] is None:
+        return None
+    return context
+
+@app.route('/astronaut/<int:astronaut_id>')
+@login_required
+@versions.conditional(*PROFILE_TABLES["astronaut"])
+def astronaut_profile(astronaut_id):
+    context = cached_profile('astronaut', astronaut_id, load_astronaut_profile)
+    return render_template('astronaut_profile.html', **context)
 
 @app.route('/admin/add_astronaut', methods=['GET', 'POST'])
 def add_astronaut():
@@ -535,12 +1045,138 @@ def add_astronaut():
             INSERT INTO astronauts (full_name, rank, nationality, specialty, total_flight_hr, active_status)
             VALUES (%s, %s, %s, %s, %s, %s)
         """, data)
+        versions.bump(cur, "astronauts")
         conn.commit()
         cur.close()
         conn.close()
         return redirect('/astronauts')
     return render_template('add_astronaut.html')
 
+# kind -> (junction table, entity id column); crew links also carry a role
+ASSIGNMENTS = {
+    'astronaut': ('missioncrew', 'astronaut_id'),
+    'agency': ('mission_agencies', 'agency_id'),
+    'spacecraft': ('mission_spacecraft', 'spacecraft_id'),
+    'payload': ('mission_payloads', 'payload_id'),
+    'event': ('mission_events', 'event_id'),
+    'launchsite': ('mission_launchsites', 'launchsite_id'),
+}
+MAX_BATCH_LINKS = 5000
+
+def links_changed(cur, kind, links):
+    stats_snapshot.invalidate()
+    keys = {(kind, link[1]) for link in links}
+    if kind == 'spacecraft':
+        # crew profiles list the spacecraft of each mission they flew
+        mission_ids = sorted({link[0] for link in links})
+        cur.execute(
+            "SELECT DISTINCT astronaut_id FROM missioncrew WHERE mission_id IN (%s)"
+            % ",".join(["%s"] * len(mission_ids)),
+            tuple(mission_ids)
+        )
+        keys.update(('astronaut', row[0]) for row in cur.fetchall())
+    entity_cache.invalidate(*keys)
+
+def assign_links(conn, kind, links):
+    # Links missions to entities in one idempotent statement. Relies on the
+    # unique key over (mission_id, entity id) of every junction table
+    # (migration 0001): pairs that already exist are
+    # ignored instead of racing a SELECT-then-INSERT.
+    table, ref_col = ASSIGNMENTS[kind]
+    # one entry per (mission, entity) pair; the first role given wins
+    unique = {}
+    for link in links:
+        unique.setdefault((link[0], link[1]), link)
+    links = list(unique.values())
+    if not links:
+        return dict(requested=0, created=0, already_present=0, invalid=0)
+
+    columns = ['mission_id', ref_col] + (['role'] if kind == 'astronaut' else [])
+    row = "(" + ",".join(["%s"] * len(columns)) + ")"
+    params = [value for link in links for value in link[:len(columns)]]
+
+    cur = conn.cursor()
+    cur.execute(
+        f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES "
+        + ",".join([row] * len(links)),
+        tuple(params)
+    )
+    created = cur.rowcount
+
+    present = len(links)
+    if created < len(links):
+        # IGNORE also skips pairs whose mission or entity does not exist;
+        # count what is actually linked now to tell the two apart
+        pairs = {(link[0], link[1]) for link in links}
+        cur.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE (mission_id, {ref_col}) IN ("
+            + ",".join(["(%s,%s)"] * len(pairs)) + ")",
+            tuple(value for pair in pairs for value in pair)
+        )
+        present = cur.fetchone()[0]
+    if created:
+        pairs = [(link[0], link[1]) for link in links]
+        rollups.links_changed(cur, kind, pairs)
+        careers.links_changed(cur, kind, pairs)
+        versions.bump(cur, table)
+    conn.commit()
+
+    if created:
+        links_changed(cur, kind, links)
+    cur.close()
+    return dict(
+        requested=len(links),
+        created=created,
+        already_present=present - created,
+        invalid=len(links) - present
+    )
+
+def batch_link(kind, link):
+    # a JSON link as a tuple for assign_links(), or None when malformed:
+    # integer ids (not booleans), and for crew an optional string role
+    size = 3 if kind == 'astronaut' else 2
+    if not isinstance(link, list) or len(link) not in (2, size):
+        return None
+    ids = link[:2]
+    if any(type(value) is not int for value in ids):
+        return None
+    if kind != 'astronaut':
+        return tuple(ids)
+    role = link[2] if len(link) == 3 else None
+    if role is not None and not isinstance(role, str):
+        return None
+    return (ids[0], ids[1], role)
+
+@app.route('/admin/assign_batch', methods=['POST'])
+def assign_batch():
+    # JSON body: {"kind": "agency", "links": [[mission_id, agency_id], ...]}
+    # crew links ("kind": "astronaut") may add a role: [mission_id, astronaut_id, role]
+    if session.get('role') != 'admin':
+        return jsonify(error="admins only"), 403
+
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind')
+    if kind not in ASSIGNMENTS:
+        return jsonify(error=f"kind must be one of {', '.join(ASSIGNMENTS)}"), 400
+    raw_links = data.get('links')
+    if not isinstance(raw_links, list) or not raw_links:
+        return jsonify(error="links must be a non-empty list"), 400
+    if len(raw_links) > MAX_BATCH_LINKS:
+        return jsonify(error=f"at most {MAX_BATCH_LINKS} links per request"), 400
+
+    links = []
+    shape = "[mission_id, astronaut_id, role?]" if kind == 'astronaut' else f"[mission_id, {kind}_id]"
+    for raw_link in raw_links:
+        link = batch_link(kind, raw_link)
+        if link is None:
+            return jsonify(error=f"invalid link {raw_link!r}: expected {shape} with integer ids"), 400
+        links.append(link)
+
+    conn = connect_db()
+    result = assign_links(conn, kind, links)
+    conn.close()
+    return jsonify(kind=kind, **result)
+
 @app.route('/admin/assign_crew', methods=['GET','POST'])
 def assign_crew():
     conn = connect_db()
@@ -551,17 +1187,8 @@ def assign_crew():
         astronaut_id = request.form['astronaut_id']
         role         = request.form['role']
 
-        # prevent duplicate assignments
-        cur.execute("""
-          SELECT 1 FROM missioncrew
-           WHERE mission_id=%s AND astronaut_id=%s
-        """, (mission_id, astronaut_id))
-        if not cur.fetchone():
-            cur.execute("""
-              INSERT INTO missioncrew (mission_id,astronaut_id,role)
-              VALUES (%s,%s,%s)
-            """, (mission_id, astronaut_id, role))
-            conn.commit()
+        # duplicate assignments are ignored by the primary key
+        assign_links(conn, 'astronaut', [(int(mission_id), int(astronaut_id), role)])
 
         cur.close(); conn.close()
         return redirect(f'/missions/{mission_id}')
@@ -582,20 +1209,17 @@ def assign_crew():
 
 # View all agencies
 @app.route('/agencies')
+@versions.conditional("agencies")
 def view_agencies():
     conn = connect_db()
     cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM agencies ORDER BY name")
-    agencies = cur.fetchall()
+    page = paginate(cur, "SELECT * FROM agencies", [], [], "name", "agency_id")
     cur.close(); conn.close()
-    return render_template('agencies.html', agencies=agencies)
+    return render_template('agencies.html', agencies=page.items, page=page)
 
 # Agency profile + its missions
-@app.route('/agency/<int:agency_id>')
-def agency_profile(agency_id):
-    if 'user_id' not in session:
-        return redirect('/login')
-    conn = connect_db()
+def load_agency_profile(agency_id):
+    conn = connect_db(primary=True)
     cur = conn.cursor(dictionary=True)
     cur.execute("SELECT * FROM agencies WHERE agency_id=%s", (agency_id,))
     agency = cur.fetchone()
@@ -608,26 +1232,30 @@ def agency_profile(agency_id):
     """, (agency_id,))
     missions = cur.fetchall()
     cur.close(); conn.close()
-    return render_template('agency_profile.html',
-                           agency=agency,
-                           missions=missions)
+    if agency is None:
+        return None
+    return dict(agency=agency, missions=missions)
+
+@app.route('/agency/<int:agency_id>')
+@login_required
+@versions.conditional(*PROFILE_TABLES["agency"])
+def agency_profile(agency_id):
+    context = cached_profile('agency', agency_id, load_agency_profile)
+    return render_template('agency_profile.html', **context)
 
 # View all spacecraft
 @app.route('/spacecraft')
+@versions.conditional("spacecraft")
 def view_spacecraft():
     conn = connect_db()
     cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM spacecraft ORDER BY name")
-    crafts = cur.fetchall()
+    page = paginate(cur, "SELECT * FROM spacecraft", [], [], "name", "spacecraft_id")
     cur.close(); conn.close()
-    return render_template('spacecraft.html', crafts=crafts)
+    return render_template('spacecraft.html', crafts=page.items, page=page)
 
 # Spacecraft profile + its missions
-@app.route('/spacecraft/<int:spacecraft_id>')
-def spacecraft_profile(spacecraft_id):
-    if 'user_id' not in session:
-        return redirect('/login')
-    conn = connect_db()
+def load_spacecraft_profile(spacecraft_id):
+    conn = connect_db(primary=True)
     cur = conn.cursor(dictionary=True)
     cur.execute("SELECT * FROM spacecraft WHERE spacecraft_id=%s",
                 (spacecraft_id,))
@@ -641,9 +1269,16 @@ def spacecraft_profile(spacecraft_id):
     """, (spacecraft_id,))
     missions = cur.fetchall()
     cur.close(); conn.close()
-    return render_template('spacecraft_profile.html',
-                           craft=craft,
-                           missions=missions)
+    if craft is None:
+        return None
+    return dict(craft=craft, missions=missions)
+
+@app.route('/spacecraft/<int:spacecraft_id>')
+@login_required
+@versions.conditional(*PROFILE_TABLES["spacecraft"])
+def spacecraft_profile(spacecraft_id):
+    context = cached_profile('spacecraft', spacecraft_id, load_spacecraft_profile)
+    return render_template('spacecraft_profile.html', **context)
 
 # Add Agency (admin only)
 @app.route('/admin/add_agency', methods=['GET', 'POST'])
@@ -665,6 +1300,7 @@ def add_agency():
               (name, country, founded_year, headquarters, type)
             VALUES (%s, %s, %s, %s, %s)
         """, data)
+        versions.bump(cur, "agencies")
         conn.commit()
         cur.close(); conn.close()
         return redirect('/agencies')
@@ -691,6 +1327,7 @@ def add_spacecraft():
               (name, type, manufacturer, first_flight, capacity)
             VALUES (%s, %s, %s, %s, %s)
         """, data)
+        versions.bump(cur, "spacecraft")
         conn.commit()
         cur.close(); conn.close()
         return redirect('/spacecraft')
@@ -708,17 +1345,7 @@ def assign_agency():
     if request.method == 'POST':
         mission_id = request.form['mission_id']
         agency_id  = request.form['agency_id']
-        # prevent duplicates
-        cur.execute("""
-            SELECT 1 FROM mission_agencies
-             WHERE mission_id=%s AND agency_id=%s
-        """, (mission_id, agency_id))
-        if not cur.fetchone():
-            cur.execute("""
-                INSERT INTO mission_agencies (mission_id, agency_id)
-                 VALUES (%s, %s)
-            """, (mission_id, agency_id))
-            conn.commit()
+        assign_links(conn, 'agency', [(int(mission_id), int(agency_id))])
         return redirect('/admin')
 
     # GET: fetch lists for dropdowns
@@ -747,17 +1374,7 @@ def assign_spacecraft():
     if request.method == 'POST':
         mission_id     = request.form['mission_id']
         spacecraft_id  = request.form['spacecraft_id']
-        # prevent duplicates
-        cur.execute("""
-            SELECT 1 FROM mission_spacecraft
-             WHERE mission_id=%s AND spacecraft_id=%s
-        """, (mission_id, spacecraft_id))
-        if not cur.fetchone():
-            cur.execute("""
-                INSERT INTO mission_spacecraft (mission_id, spacecraft_id)
-                 VALUES (%s, %s)
-            """, (mission_id, spacecraft_id))
-            conn.commit()
+        assign_links(conn, 'spacecraft', [(int(mission_id), int(spacecraft_id))])
         return redirect('/admin')
 
     # GET: fetch lists for dropdowns
@@ -775,18 +1392,17 @@ def assign_spacecraft():
 
 # View all payloads
 @app.route('/payloads')
+@versions.conditional("payloads")
 def view_payloads():
     conn = connect_db()
     cur  = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM payloads ORDER BY name")
-    payloads = cur.fetchall()
+    page = paginate(cur, "SELECT * FROM payloads", [], [], "name", "payload_id")
     cur.close(); conn.close()
-    return render_template('payloads.html', payloads=payloads)
+    return render_template('payloads.html', payloads=page.items, page=page)
 
 # Payload profile + linked missions
-@app.route('/payload/<int:payload_id>')
-def payload_profile(payload_id):
-    conn = connect_db()
+def load_payload_profile(payload_id):
+    conn = connect_db(primary=True)
     cur  = conn.cursor(dictionary=True)
     cur.execute("SELECT * FROM payloads WHERE payload_id=%s", (payload_id,))
     payload = cur.fetchone()
@@ -799,11 +1415,15 @@ def payload_profile(payload_id):
     """, (payload_id,))
     missions = cur.fetchall()
     cur.close(); conn.close()
-    return render_template(
-      'payload_profile.html',
-      payload=payload,
-      missions=missions
-    )
+    if payload is None:
+        return None
+    return dict(payload=payload, missions=missions)
+
+@app.route('/payload/<int:payload_id>')
+@versions.conditional(*PROFILE_TABLES["payload"])
+def payload_profile(payload_id):
+    context = cached_profile('payload', payload_id, load_payload_profile)
+    return render_template('payload_profile.html', **context)
 
 # Admin: Add new payload
 @app.route('/admin/add_payload', methods=['GET','POST'])
@@ -824,6 +1444,7 @@ def add_payload():
           INSERT INTO payloads (name,type,weight_kg,manufacturer,description)
           VALUES (%s,%s,%s,%s,%s)
         """, data)
+        versions.bump(cur, "payloads")
         conn.commit()
         cur.close(); conn.close()
         return redirect('/payloads')
@@ -840,17 +1461,7 @@ def assign_payload():
     if request.method == 'POST':
         mission_id = request.form['mission_id']
         payload_id = request.form['payload_id']
-        # prevent duplicate
-        cur.execute("""
-          SELECT 1 FROM mission_payloads
-           WHERE mission_id=%s AND payload_id=%s
-        """, (mission_id, payload_id))
-        if not cur.fetchone():
-            cur.execute("""
-              INSERT INTO mission_payloads (mission_id,payload_id)
-              VALUES (%s,%s)
-            """, (mission_id, payload_id))
-            conn.commit()
+        assign_links(conn, 'payload', [(int(mission_id), int(payload_id))])
         cur.close(); conn.close()
         return redirect('/admin')
 
@@ -869,18 +1480,17 @@ def assign_payload():
 
 # 2.1 View all events
 @app.route('/events')
+@versions.conditional("events")
 def view_events():
     conn = connect_db()
     cur  = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM events ORDER BY date DESC")
-    events = cur.fetchall()
+    page = paginate(cur, "SELECT * FROM events", [], [], "date", "event_id", desc=True)
     cur.close(); conn.close()
-    return render_template('events.html', events=events)
+    return render_template('events.html', events=page.items, page=page)
 
 # 2.2 Event profile + linked missions
-@app.route('/event/<int:event_id>')
-def event_profile(event_id):
-    conn = connect_db()
+def load_event_profile(event_id):
+    conn = connect_db(primary=True)
     cur  = conn.cursor(dictionary=True)
     cur.execute("SELECT * FROM events WHERE event_id=%s", (event_id,))
     event = cur.fetchone()
@@ -893,11 +1503,15 @@ def event_profile(event_id):
     """, (event_id,))
     missions = cur.fetchall()
     cur.close(); conn.close()
-    return render_template(
-      'event_profile.html',
-      event=event,
-      missions=missions
-    )
+    if event is None:
+        return None
+    return dict(event=event, missions=missions)
+
+@app.route('/event/<int:event_id>')
+@versions.conditional(*PROFILE_TABLES["event"])
+def event_profile(event_id):
+    context = cached_profile('event', event_id, load_event_profile)
+    return render_template('event_profile.html', **context)
 
 # 2.3 Admin: Add new event
 @app.route('/admin/add_event', methods=['GET','POST'])
@@ -919,6 +1533,7 @@ def add_event():
             (name, category, date, location, description)
           VALUES (%s,%s,%s,%s,%s)
         """, data)
+        versions.bump(cur, "events")
         conn.commit()
         cur.close(); conn.close()
         return redirect('/events')
@@ -934,16 +1549,7 @@ def assign_event():
     if request.method == 'POST':
         mission_id = request.form['mission_id']
         event_id   = request.form['event_id']
-        cur.execute("""
-          SELECT 1 FROM mission_events
-           WHERE mission_id=%s AND event_id=%s
-        """, (mission_id, event_id))
-        if not cur.fetchone():
-            cur.execute("""
-              INSERT INTO mission_events (mission_id,event_id)
-              VALUES (%s,%s)
-            """, (mission_id, event_id))
-            conn.commit()
+        assign_links(conn, 'event', [(int(mission_id), int(event_id))])
         cur.close(); conn.close()
         return redirect('/admin')
     cur.execute("SELECT mission_id,mission_name FROM missions ORDER BY mission_name")
@@ -959,20 +1565,17 @@ def assign_event():
 
 # 2.1 View all launch sites
 @app.route('/launchsites')
+@versions.conditional("launchsites")
 def view_launchsites():
     conn = connect_db()
     cur  = conn.cursor(dictionary=True)
-    cur.execute("SELECT * FROM launchsites ORDER BY name")
-    sites = cur.fetchall()
+    page = paginate(cur, "SELECT * FROM launchsites", [], [], "name", "launchsite_id")
     cur.close(); conn.close()
-    return render_template('launchsites.html', sites=sites)
+    return render_template('launchsites.html', sites=page.items, page=page)
 
 # 2.2 Launch site profile + linked missions
-@app.route('/launchsite/<int:launchsite_id>')
-def launchsite_profile(launchsite_id):
-    if 'user_id' not in session:
-        return redirect('/login')
-    conn = connect_db()
+def load_launchsite_profile(launchsite_id):
+    conn = connect_db(primary=True)
     cur  = conn.cursor(dictionary=True)
     cur.execute("SELECT * FROM launchsites WHERE launchsite_id=%s",
                 (launchsite_id,))
@@ -986,11 +1589,16 @@ def launchsite_profile(launchsite_id):
     """, (launchsite_id,))
     missions = cur.fetchall()
     cur.close(); conn.close()
-    return render_template(
-      'launchsite_profile.html',
-      site=site,
-      missions=missions
-    )
+    if site is None:
+        return None
+    return dict(site=site, missions=missions)
+
+@app.route('/launchsite/<int:launchsite_id>')
+@login_required
+@versions.conditional(*PROFILE_TABLES["launchsite"])
+def launchsite_profile(launchsite_id):
+    context = cached_profile('launchsite', launchsite_id, load_launchsite_profile)
+    return render_template('launchsite_profile.html', **context)
 
 # 2.3 Add Launch Site (admin only)
 @app.route('/admin/add_launchsite', methods=['GET','POST'])
@@ -1014,6 +1622,7 @@ def add_launchsite():
             (name,country,latitude,longitude,established_year,status,description)
           VALUES (%s,%s,%s,%s,%s,%s,%s)
         """, data)
+        versions.bump(cur, "launchsites")
         conn.commit()
         cur.close(); conn.close()
         return redirect('/launchsites')
@@ -1030,17 +1639,7 @@ def assign_launchsite():
     if request.method == 'POST':
         mission_id    = request.form['mission_id']
         launchsite_id = request.form['launchsite_id']
-        # prevent duplicates
-        cur.execute("""
-          SELECT 1 FROM mission_launchsites
-           WHERE mission_id=%s AND launchsite_id=%s
-        """, (mission_id, launchsite_id))
-        if not cur.fetchone():
-            cur.execute("""
-              INSERT INTO mission_launchsites (mission_id,launchsite_id)
-              VALUES (%s,%s)
-            """, (mission_id, launchsite_id))
-            conn.commit()
+        assign_links(conn, 'launchsite', [(int(mission_id), int(launchsite_id))])
         cur.close(); conn.close()
         return redirect(f'/admin/assign_launchsite')
 
@@ -1058,5 +1657,224 @@ def assign_launchsite():
     )
 
 
+# kind -> (table, id column, title column, indexed columns, profile url)
+SEARCHABLE = {
+    'mission': ('missions', 'mission_id', 'mission_name', 'mission_name, description', '/missions/{}'),
+    'event': ('events', 'event_id', 'name', 'name, description', '/event/{}'),
+    'payload': ('payloads', 'payload_id', 'name', 'name, description', '/payload/{}'),
+    'launchsite': ('launchsites', 'launchsite_id', 'name', 'name, description', '/launchsite/{}'),
+}
+SEARCH_LIMIT = 50
+
+def boolean_query(text):
+    # every word must match, each as a prefix: "apol moon" -> "+apol* +moon*".
+    # Only word characters survive, so user input cannot inject operators.
+    words = re.findall(r"\w+", text)[:8]
+    return " ".join(f"+{word}*" for word in words)
+
+@app.route('/search')
+def search():
+    q = request.args.get('q', '').strip()
+    kind_filter = request.args.get('type', '')
+    kinds = [kind_filter] if kind_filter in SEARCHABLE else list(SEARCHABLE)
+    terms = boolean_query(q)
+
+    results = []
+    if terms:
+        # one ranked subquery per FULLTEXT index, merged by relevance
+        parts, params = [], []
+        for kind in kinds:
+            table, id_col, title_col, columns, _ = SEARCHABLE[kind]
+            parts.append(f"""
+              (SELECT '{kind}' AS kind, {id_col} AS id, {title_col} AS title,
+                      LEFT(description, 200) AS snippet,
+                      MATCH({columns}) AGAINST (%s IN BOOLEAN MODE) AS score
+                 FROM {table}
+                WHERE MATCH({columns}) AGAINST (%s IN BOOLEAN MODE)
+                ORDER BY score DESC
+                LIMIT %s)""")
+            params += [terms, terms, SEARCH_LIMIT]
+
+        conn = connect_db()
+        cur = conn.cursor(dictionary=True)
+        cur.execute(" UNION ALL ".join(parts) + " ORDER BY score DESC LIMIT %s",
+                    tuple(params) + (SEARCH_LIMIT,))
+        results = cur.fetchall()
+        cur.close(); conn.close()
+        for r in results:
+            r['url'] = SEARCHABLE[r['kind']][4].format(r['id'])
+
+    return render_template('search.html', q=q, kinds=list(SEARCHABLE),
+                           kind_filter=kind_filter, results=results)
+
+# JSON API (/api/v1): the same loaders, caches and keyset pagination as the HTML pages, encoded
+# with orjson instead of rendered. ?fields=a,b trims each object; on list
+# endpoints it also trims the SELECT.
+
+@app.before_request
+def api_auth():
+    # a logged-in browser session, or scripts sending "Authorization: Bearer $API_TOKEN"
+    if not request.path.startswith("/api/"):
+        return None
+    token = os.getenv("API_TOKEN")
+    if 'user_id' in session or (token and request.headers.get("Authorization") == f"Bearer {token}"):
+        return None
+    return jsonapi.error_response(401, "log in or send Authorization: Bearer <API_TOKEN>")
+
+MISSION_COLUMNS = ["mission_id", "mission_name", "mission_type", "destination",
+                   "launch_date", "duration", "status", "description", "created_at"]
+# what /missions shows; the default when no ?fields= is given
+MISSION_LIST_COLUMNS = ["mission_id", "mission_name", "mission_type", "destination",
+                        "launch_date", "status"]
+MISSION_RELATED = ["agencies", "spacecraft", "payloads", "events", "launchsites"]
+
+# URL name -> (table, columns, sort col, id col, descending,
+#              cache kind, profile loader, context key, extra profile fields)
+API_ENTITIES = {
+    "astronauts": ("astronauts",
+                   ["astronaut_id", "full_name", "rank", "nationality", "total_flight_hr",
+                    "speciality", "active_status", "created_at"],
+                   "full_name", "astronaut_id", False,
+                   "astronaut", load_astronaut_profile, "astronaut", ["stats", "missions"]),
+    "agencies": ("agencies",
+                 ["agency_id", "name", "country", "founded_year", "headquarters", "type"],
+                 "name", "agency_id", False,
+                 "agency", load_agency_profile, "agency", ["missions"]),
+    "spacecraft": ("spacecraft",
+                   ["spacecraft_id", "name", "type", "manufacturer", "first_flight", "capacity"],
+                   "name", "spacecraft_id", False,
+                   "spacecraft", load_spacecraft_profile, "craft", ["missions"]),
+    "payloads": ("payloads",
+                 ["payload_id", "name", "type", "weight_kg", "manufacturer", "description",
+                  "created_at"],
+                 "name", "payload_id", False,
+                 "payload", load_payload_profile, "payload", ["missions"]),
+    "events": ("events",
+               ["event_id", "name", "category", "date", "location", "description", "created_at"],
+               "date", "event_id", True,
+               "event", load_event_profile, "event", ["missions"]),
+    "launchsites": ("launchsites",
+                    ["launchsite_id", "name", "country", "latitude", "longitude",
+                     "established_year", "status", "description", "created_at"],
+                    "name", "launchsite_id", False,
+                    "launchsite", load_launchsite_profile, "site", ["missions"]),
+}
+
+def api_tables(kind, entity_id=None):
+    # tables behind /api/v1/<kind> and /api/v1/<kind>/<id>, for their ETags
+    if kind not in API_ENTITIES:
+        return ()
+    if entity_id is None:
+        return API_ENTITIES[kind][:1]
+    return PROFILE_TABLES[API_ENTITIES[kind][5]]
+
+def api_list(table, columns, default, sort_col, id_col, desc, where=(), params=()):
+    fields = jsonapi.requested_fields(columns) or default
+    # the cursor needs the sort and id columns even when they are not requested
+    selected = list(dict.fromkeys(fields + [sort_col, id_col]))
+    query = f"SELECT {', '.join(f'`{c}`' for c in selected)} FROM {table}"
+
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+    page = paginate(cur, query, where, params, sort_col, id_col, desc=desc)
+    cur.close()
+    conn.close()
+    rows = [jsonapi.pick(row, fields) for row in page.items]
+    return jsonapi.json_response(jsonapi.page_payload(page, rows))
+
+@app.route('/api/v1/missions')
+@versions.conditional("missions")
+def api_missions():
+    where, params = mission_filters()
+    return api_list("missions", MISSION_COLUMNS, MISSION_LIST_COLUMNS,
+                    "launch_date", "mission_id", True, where, params)
+
+@app.route('/api/v1/missions/<int:mission_id>')
+@versions.conditional(*MISSION_DETAIL_TABLES)
+def api_mission_detail(mission_id):
+    fields = jsonapi.requested_fields(MISSION_COLUMNS + MISSION_RELATED)
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+    context = load_mission_detail(cur, mission_id)
+    cur.close()
+    conn.close()
+    if context['mission'] is None:
+        raise jsonapi.ApiError(404, "mission not found")
+
+    data = dict(context['mission'],
+                agencies=context['agencies'],
+                spacecraft=context['crafts'],
+                payloads=context['payloads'],
+                events=context['events'],
+                launchsites=context['launchsites'])
+    return jsonapi.json_response({"data": jsonapi.pick(data, fields)})
+
+@app.route('/api/v1/stats')
+@versions.conditional(*STATS_TABLES)
+def api_stats():
+    fields = jsonapi.requested_fields([name for name, _, _, _ in MISSION_STATS_QUERIES])
+    return jsonapi.json_response({"data": jsonapi.pick(stats_snapshot.get(), fields)})
+
+@app.route('/api/v1/stats/range')
+@versions.conditional(*rollups.SOURCE_TABLES)
+def api_stats_range():
+    start = request.args.get('from')
+    end = request.args.get('to')
+    try:
+        first, last = rollups.parse_range(start, end)
+    except ValueError as err:
+        raise jsonapi.ApiError(400, str(err))
+    fields = jsonapi.requested_fields(rollups.RANGE_FIELDS)
+
+    conn = connect_db()
+    stats = rollups.range_stats(conn, first, last)
+    conn.close()
+    return jsonapi.json_response({
+        "data": jsonapi.pick(stats, fields),
+        "range": {"from": first if start else None, "to": last if end else None},
+    })
+
+@app.route('/api/v1/export/missions')
+def api_export_missions():
+    # streamed straight from the database; see exporter.py
+    fmt = request.args.get('format', 'csv')
+    gzip = request.args.get('compress') == 'gzip'
+    if fmt not in exporter.FORMATS:
+        raise jsonapi.ApiError(400, f"format must be one of: {', '.join(exporter.FORMATS)}")
+    try:
+        chunks = exporter.export_missions(db.read_pool(), fmt, gzip)
+    except ValueError as err:
+        raise jsonapi.ApiError(400, str(err))
+    except db.PoolTimeout:
+        raise jsonapi.ApiError(503, "database busy, try again shortly")
+    filename = exporter.filename(fmt, gzip)
+    return Response(chunks, mimetype="application/gzip" if gzip else exporter.FORMATS[fmt], headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        # keep proxies from buffering the whole export before passing it on
+        "X-Accel-Buffering": "no",
+    })
+
+@app.route('/api/v1/<kind>')
+@versions.conditional(api_tables)
+def api_entities(kind):
+    if kind not in API_ENTITIES:
+        abort(404)
+    table, columns, sort_col, id_col, desc = API_ENTITIES[kind][:5]
+    return api_list(table, columns, columns, sort_col, id_col, desc)
+
+@app.route('/api/v1/<kind>/<int:entity_id>')
+@versions.conditional(api_tables)
+def api_profile(kind, entity_id):
+    if kind not in API_ENTITIES:
+        abort(404)
+    _, columns, _, _, _, cache_kind, loader, key, extra = API_ENTITIES[kind]
+    fields = jsonapi.requested_fields(columns + extra)
+    context = cached_profile(cache_kind, entity_id, loader)
+    # a new dict: the cached context is shared with other requests
+    data = dict(context[key])
+    for name in extra:
+        data[name] = context[name]
+    return jsonapi.json_response({"data": jsonapi.pick(data, fields)})
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,363 @@
+import asyncio
+import io
+import os
+import re
+import time
+
+import aiomysql
+from asgiref.wsgi import WsgiToAsgi
+from flask import render_template, session
+from werkzeug.exceptions import HTTPException
+
+import db
+import instrumentation
+import versions
+from app import (
+    ASTRONAUT_PROFILE_QUERIES, MISSION_DETAIL_QUERY, MISSION_DETAIL_TABLES, PROFILE_TABLES,
+    STATS_TABLES, app, mission_detail_context, mission_stats_context, profile_lookup,
+    shape_rows, store_profile
+)
+
+# Async serving mode: `uvicorn asgi:application`.
+#
+# The routes named in ASYNC_ROUTES run on the event loop with aiomysql and
+# send their independent queries at the same time, each on its own pooled
+# connection. They build their pages with the sync views' context builders
+# and answer with the same ETag/Last-Modified validators (and 304s), read
+# over aiomysql too. Each request reads from one server, picked as db.py
+# does: a healthy replica (DB_REPLICA_HOSTS) unless the session is pinned to
+# the primary after a write, the primary otherwise; profile cache fills
+# always come from the primary. Everything else (and any route left out of
+# ASYNC_ROUTES) is handed to the regular Flask app, which runs in asgiref's
+# thread pool, so URLs, templates, sessions and caches are the same in both
+# modes and a deployment can move over one route at a time.
+#
+# mission_stats is not in the default list: a stats snapshot refresh goes
+# through the blocking pool (and the columnar engine's reload), so when
+# enabled it runs on a worker thread and does not scale with the event loop.
+
+ASYNC_ROUTE_NAMES = [
+    name.strip()
+    for name in (os.getenv("ASYNC_ROUTES") or "mission_detail,astronaut_profile").split(",")
+    if name.strip()
+]
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE") or 20)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT") or 5)
+# short, as for the sync replica pools: a busy replica is skipped for the next one
+REPLICA_POOL_TIMEOUT = float(os.getenv("DB_REPLICA_POOL_TIMEOUT") or 1)
+
+wsgi_fallback = WsgiToAsgi(app)
+
+_pools = {}  # "primary" or replica name -> aiomysql pool
+_pool_lock = asyncio.Lock()
+
+
+class PageResponse(Exception):
+    # short-circuits a handler with a finished (status, headers, body)
+
+    def __init__(self, status, headers=(), body=b""):
+        self.status = status
+        self.headers = list(headers)
+        self.body = body
+
+
+async def get_pool(server="primary"):
+    # the server's pool; replicas by their db.py name ("host:port")
+    async with _pool_lock:
+        if server not in _pools:
+            if server == "primary":
+                address = {"host": os.getenv("DB_HOST")}
+            else:
+                connect_args = db.get_replicas().pools[server].connect_args
+                address = {"host": connect_args["host"], "port": connect_args["port"]}
+            _pools[server] = await aiomysql.create_pool(
+                **address,
+                user=os.getenv("DB_USER"),
+                password=os.getenv("DB_PASS"),
+                db=os.getenv("DB_NAME"),
+                minsize=1,
+                maxsize=ASYNC_DB_POOL_SIZE,
+                # read-only pages: no transaction to hold a stale snapshot open
+                autocommit=True,
+                pool_recycle=3600,
+            )
+            print(f">>> Opened async database pool for {server} (max {ASYNC_DB_POOL_SIZE} connections)")
+        return _pools[server]
+
+
+async def close_pool():
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.close()
+        await pool.wait_closed()
+
+
+def pinned_to_primary(environ):
+    # the session committed a write within DB_STICKY_SECONDS (db.py)
+    with app.request_context(environ):
+        return session.get(db.STICKY_KEY, 0) > time.time()
+
+
+async def _replica_problem(replicas, name):
+    # None when a connection to the replica works (and, when due, its lag is
+    # within DB_REPLICA_MAX_LAG), "busy" when its pool has none free
+    pool = await get_pool(name)
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), REPLICA_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        return "busy"
+    try:
+        if replicas.lag_check_due(name):
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute("SHOW REPLICA STATUS")
+                status = await cur.fetchone()
+            replicas.checked(name)
+            return replicas.lag_problem(status)
+        return None
+    finally:
+        pool.release(conn)
+
+
+async def pick_server(environ):
+    # as db.get_db() for a GET: the next healthy replica, or the primary
+    replicas = db.get_replicas()
+    if replicas is None or pinned_to_primary(environ):
+        db.routed.inc("primary")
+        return "primary"
+    for name in replicas.healthy():
+        try:
+            problem = await _replica_problem(replicas, name)
+        except (aiomysql.Error, OSError) as err:
+            problem = f"error {err}"
+        if problem is None:
+            replicas.usable(name)
+            db.routed.inc("replica")
+            return name
+        if problem != "busy":
+            replicas.mark_down(name, problem)
+    db.routed.inc("fallback")
+    return "primary"
+
+
+class QueryStats:
+    # per-request counterpart of instrumentation's g.db_stats, plus the
+    # server the request reads from
+
+    def __init__(self):
+        self.server = "primary"
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+async def fetch(stats, sql, params, shape, primary=False):
+    # primary=True as for db.get_db(): rows that outlive the request
+    pool = await get_pool("primary" if primary else stats.server)
+    started = time.perf_counter()
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), DB_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PageResponse(503, [(b"content-type", b"text/plain")],
+                           b"Database busy, try again shortly")
+    try:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(sql, params)
+            rows = await cur.fetchall()
+    finally:
+        pool.release(conn)
+    elapsed = time.perf_counter() - started
+    stats.queries += 1
+    stats.db_time += elapsed
+    stats.rows += len(rows)
+    if elapsed * 1000 >= instrumentation.SLOW_QUERY_MS:
+        instrumentation.slow_queries.inc("async")
+    return shape_rows(list(rows), shape)
+
+
+async def counters(stats, primary=False):
+    # versions.current() for the request's server, read over aiomysql
+    server = "primary" if primary else stats.server
+    fresh, state = versions.cached(server)
+    if fresh:
+        return state
+    try:
+        rows = await fetch(stats, versions.POLL_QUERY, None, "all", primary)
+    except aiomysql.Error as err:
+        if err.args[0] != versions.ER_NO_SUCH_TABLE:
+            raise
+        return versions.remember(server, None)
+    return versions.remember(server, [tuple(row.values()) for row in rows])
+
+
+def wsgi_environ(scope):
+    # just enough of a WSGI environ for Flask to build request, session and url_for
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": io.StringIO(),
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[key] = value
+        else:
+            key = "HTTP_" + key
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def logged_in(environ):
+    with app.request_context(environ):
+        return "user_id" in session
+
+
+def _call_in_request(environ, fn, args):
+    with app.request_context(environ):
+        try:
+            return fn(*args)
+        except HTTPException as err:
+            # e.g. abort(503) from an exhausted pool
+            raise PageResponse(err.code, [(b"content-type", b"text/plain")],
+                               (err.description or "").encode("utf-8"))
+
+
+async def in_request(environ, fn, *args):
+    # fn(*args) under a Flask request context on a worker thread, for app
+    # code that uses the blocking connection pool
+    return await asyncio.to_thread(_call_in_request, environ, fn, args)
+
+
+async def mission_detail(environ, stats, mission_id):
+    rows = await fetch(stats, MISSION_DETAIL_QUERY, (mission_id,), "one")
+    return 200, "mission_detail.html", mission_detail_context(rows)
+
+
+async def astronaut_profile(environ, stats, astronaut_id):
+    state = await counters(stats, primary=True)
+    version, context = profile_lookup("astronaut", astronaut_id, state)
+    if context is None:
+        results = await asyncio.gather(*(
+            fetch(stats, sql, (astronaut_id,), shape, primary=True)
+            for _, shape, sql in ASTRONAUT_PROFILE_QUERIES
+        ))
+        context = {name: result for (name, _, _), result in zip(ASTRONAUT_PROFILE_QUERIES, results)}
+        if context["astronaut"] is None:
+            return 404, "404.html", {}
+        store_profile("astronaut", astronaut_id, context, version)
+    return 200, "astronaut_profile.html", context
+
+
+async def mission_stats(environ, stats):
+    # the sync route's snapshot, from whichever STATS_ENGINE it uses; a
+    # refresh goes through the blocking pool, so it runs off the loop (not
+    # in the default ASYNC_ROUTES for that reason)
+    return 200, "mission_stats.html", await in_request(environ, mission_stats_context)
+
+
+# name -> (url rule as reported in metrics, path pattern, handler, tables behind the ETag,
+#          whether it needs a signed-in user, as app.login_required)
+ASYNC_ROUTES = {
+    "mission_detail": ("/missions/<int:mission_id>", re.compile(r"/missions/(\d+)"), mission_detail,
+                       MISSION_DETAIL_TABLES, True),
+    "astronaut_profile": ("/astronaut/<int:astronaut_id>", re.compile(r"/astronaut/(\d+)"), astronaut_profile,
+                          PROFILE_TABLES["astronaut"], True),
+    "mission_stats": ("/mission_stats", re.compile(r"/mission_stats"), mission_stats, STATS_TABLES, False),
+}
+
+unknown = set(ASYNC_ROUTE_NAMES) - set(ASYNC_ROUTES)
+if unknown:
+    raise RuntimeError(f"ASYNC_ROUTES names unknown routes: {', '.join(sorted(unknown))}")
+
+
+def match(scope):
+    if scope["method"] not in ("GET", "HEAD"):
+        return None
+    for name in ASYNC_ROUTE_NAMES:
+        rule, pattern, handler, tables, login = ASYNC_ROUTES[name]
+        found = pattern.fullmatch(scope["path"])
+        if found:
+            return rule, handler, tables, login, [int(arg) for arg in found.groups()]
+    return None
+
+
+async def serve(scope, send, rule, handler, tables, login, args):
+    started = time.perf_counter()
+    stats = QueryStats()
+    environ = wsgi_environ(scope)
+    render_time = 0.0
+    try:
+        # before the validators, so an anonymous request never gets a 304
+        if login and not logged_in(environ):
+            raise PageResponse(302, [(b"location", b"/login")])
+        stats.server = await pick_server(environ)
+        state = await counters(stats)
+        # as versions.conditional: a matching validator skips the handler
+        with app.request_context(environ):
+            etag, last_modified, not_modified = versions.evaluate(tables, state)
+        if not_modified:
+            status, template, context = 304, None, {}
+        else:
+            status, template, context = await handler(environ, stats, *args)
+        render_started = time.perf_counter()
+        with app.request_context(environ):
+            response = app.response_class(
+                render_template(template, **context) if template else "", status=status
+            )
+            if etag is not None and status in (200, 304):
+                versions.finish(response, etag, last_modified)
+        render_time = time.perf_counter() - render_started
+        body = response.get_data()
+        headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in response.headers.items()
+            if name.lower() != "content-length"
+        ]
+    except PageResponse as page:
+        status, headers, body = page.status, page.headers, page.body
+
+    # same format as instrumentation's header, so benchmarks/run.py reads both
+    headers.append((b"server-timing", (
+        f"db;dur={stats.db_time * 1000:.1f};desc=\"{stats.queries} queries\", "
+        f"render;dur={render_time * 1000:.1f}"
+    ).encode("latin-1")))
+    headers.append((b"content-length", str(len(body)).encode("latin-1")))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    instrumentation.request_duration.observe(rule, time.perf_counter() - started)
+    # queries overlap, so summed db time can exceed the wall time spent waiting
+    instrumentation.db_time.observe(rule, stats.db_time)
+    instrumentation.db_queries.observe(rule, stats.queries)
+    instrumentation.db_rows.observe(rule, stats.rows)
+    instrumentation.render_time.observe(rule, render_time)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await get_pool()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] == "http":
+        found = match(scope)
+        if found:
+            return await serve(scope, send, *found)
+    return await wsgi_fallback(scope, receive, send)
@@ -0,0 +1,254 @@
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory
+
+# Static asset pipeline. `flask assets-build` copies static/ into
+# static/dist/ under content-hashed names (style.css -> style.3f9c0e1a.css)
+# and writes static/dist/manifest.json:
+#
+# - url(/static/...) references inside stylesheets are rewritten to the
+#   hashed files, so a changed image also changes the stylesheet's name;
+# - JPEG/PNG images get AVIF and WebP copies, plus smaller ones for narrow
+#   screens (ASSET_IMAGE_WIDTHS), and stylesheet backgrounds that use them
+#   offer all of them through image-set() and a max-width media query;
+# - text assets get .gz and, when the brotli package is installed, .br
+#   siblings compressed once at build time instead of per response.
+#
+# At runtime url_for('static', filename=...) returns the hashed name when
+# the manifest lists the file, and /static/dist/ is served with a one-year
+# immutable Cache-Control and the best precompressed sibling the client
+# accepts. Without a manifest (no build yet) everything is served as
+# before, straight from static/.
+
+DIST = "dist"
+MANIFEST = "manifest.json"
+STATIC_URL = "/static/"
+IMAGE_WIDTHS = [int(w) for w in (os.getenv("ASSET_IMAGE_WIDTHS") or "480").split(",") if w.strip()]
+IMAGE_FORMATS = {"avif": "image/avif", "webp": "image/webp"}
+# Pillow "quality" per format; AVIF reaches the same visual quality far lower
+QUALITY = {"JPEG": 80, "PNG": None, "WEBP": 75, "AVIF": 50}
+RASTER = (".jpg", ".jpeg", ".png")
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)(/static/[^'")]+)\1\s*\)""")
+CSS_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+BACKGROUND = re.compile(r"background(?:-image)?\s*:[^;}]*url\(\s*['\"]?(/static/[^'\")]+)['\"]?\s*\)[^;}]*;?")
+
+_files = {}  # source path -> hashed path, both relative to static/
+_encoded = {}  # hashed path -> precompressed encodings available
+
+
+# build
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _hashed_name(rel, data):
+    base, ext = os.path.splitext(rel)
+    return f"{DIST}/{base}.{_digest(data)}{ext}"
+
+
+def _write(static_dir, rel, data):
+    path = os.path.join(static_dir, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as out:
+        out.write(data)
+
+
+def _sources(static_dir):
+    for root, dirs, names in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [d for d in dirs if d != DIST]
+        for name in sorted(names):
+            yield os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, "/")
+
+
+def _image_variants(static_dir, rel, files):
+    # (width, format) -> hashed path, for the original width and each
+    # smaller one in IMAGE_WIDTHS
+    from PIL import Image
+
+    variants = {}
+    base, ext = os.path.splitext(rel)
+    original = ext.lstrip(".").lower()
+    with Image.open(os.path.join(static_dir, rel)) as image:
+        image.load()
+        widths = sorted({w for w in IMAGE_WIDTHS if w < image.width} | {image.width})
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            fallback_size = None
+            for fmt in [original] + list(IMAGE_FORMATS):
+                if fmt == original and width == image.width:
+                    variants[(width, fmt)] = files[rel]
+                    fallback_size = os.path.getsize(os.path.join(static_dir, rel))
+                    continue
+                save_as = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "avif": "AVIF", "webp": "WEBP"}[fmt]
+                frame = resized
+                if save_as == "JPEG" and frame.mode not in ("RGB", "L"):
+                    frame = frame.convert("RGB")
+                out = io.BytesIO()
+                frame.save(out, save_as, **({"quality": QUALITY[save_as]} if QUALITY[save_as] else {}))
+                data = out.getvalue()
+                if fmt == original:
+                    fallback_size = len(data)
+                elif len(data) >= fallback_size:
+                    # no smaller than the fallback: not worth a variant
+                    continue
+                name = f"{base}-{width}w.{fmt}"
+                path = _hashed_name(name, data)
+                _write(static_dir, path, data)
+                files[name] = path
+                variants[(width, fmt)] = path
+    return variants
+
+
+def _image_set(variants, width, fallback_fmt):
+    # modern formats first; browsers without image-set() keep the plain url()
+    options = [f'url({STATIC_URL}{variants[(width, fmt)]}) type("{mime}")'
+               for fmt, mime in IMAGE_FORMATS.items() if (width, fmt) in variants]
+    fallback = mimetypes.types_map.get("." + fallback_fmt, "image/jpeg")
+    options.append(f'url({STATIC_URL}{variants[(width, fallback_fmt)]}) type("{fallback}")')
+    return f"image-set({', '.join(options)})"
+
+
+def _rewrite_css(css, files, images):
+    def hashed_url(match):
+        rel = match.group(2)[len(STATIC_URL):]
+        if rel.startswith(DIST + "/"):
+            return match.group(0)
+        if rel not in files:
+            print(f">>> assets: {match.group(2)} not found, left as is")
+            return match.group(0)
+        return f"url({STATIC_URL}{files[rel]})"
+
+    overrides = []
+
+    def rule(match):
+        selector, body = match.group(1), match.group(2)
+        extra = []
+        for background in BACKGROUND.finditer(body):
+            rel = background.group(1)[len(STATIC_URL):]
+            if rel not in images:
+                continue
+            variants = images[rel]
+            fmt = os.path.splitext(rel)[1].lstrip(".").lower()
+            widths = sorted({width for width, _ in variants})
+            extra.append(f"background-image: {_image_set(variants, widths[-1], fmt)};")
+            for width in widths[:-1]:
+                overrides.append(f"@media (max-width: {width}px) {{\n  {selector.strip()} {{ "
+                                 f"background-image: {_image_set(variants, width, fmt)}; }}\n}}")
+        if not extra:
+            return match.group(0)
+        body = body.rstrip()
+        if body and not body.endswith(";"):
+            body += ";"
+        return f"{selector}{{{body}\n  {' '.join(extra)}\n}}"
+
+    css = CSS_RULE.sub(rule, css)
+    css = CSS_URL.sub(hashed_url, css)
+    if overrides:
+        css = css.rstrip("\n") + "\n\n" + "\n".join(overrides) + "\n"
+    return css
+
+
+def _precompress(static_dir, path, data):
+    encodings = []
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(packed) < len(data):
+        _write(static_dir, path + ".gz", packed)
+        encodings.append("gzip")
+    try:
+        import brotli
+    except ImportError:
+        return encodings
+    packed = brotli.compress(data, quality=11)
+    if len(packed) < len(data):
+        _write(static_dir, path + ".br", packed)
+        encodings.insert(0, "br")
+    return encodings
+
+
+def build(static_dir):
+    # rebuilds static/dist/ from scratch; returns a summary dict
+    dist = os.path.join(static_dir, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+
+    files, images, encoded = {}, {}, {}
+    sources = list(_sources(static_dir))
+    # stylesheets last: they refer to the hashed names of everything else
+    for rel in sorted(sources, key=lambda rel: rel.endswith(".css")):
+        with open(os.path.join(static_dir, rel), "rb") as source:
+            data = source.read()
+        if rel.endswith(".css"):
+            data = _rewrite_css(data.decode("utf-8"), files, images).encode("utf-8")
+        path = _hashed_name(rel, data)
+        _write(static_dir, path, data)
+        files[rel] = path
+        if rel.lower().endswith(RASTER):
+            images[rel] = _image_variants(static_dir, rel, files)
+
+    for rel, path in files.items():
+        if path.endswith(COMPRESSIBLE):
+            with open(os.path.join(static_dir, path), "rb") as built:
+                encodings = _precompress(static_dir, path, built.read())
+            if encodings:
+                encoded[path] = encodings
+
+    with open(os.path.join(dist, MANIFEST), "w", encoding="utf-8") as out:
+        json.dump({"files": files, "encoded": encoded}, out, indent=2, sort_keys=True)
+    return {"files": len(files), "images": len(images), "precompressed": len(encoded)}
+
+
+# runtime
+
+def load(static_dir):
+    global _files, _encoded
+    try:
+        with open(os.path.join(static_dir, DIST, MANIFEST), encoding="utf-8") as manifest:
+            data = json.load(manifest)
+    except FileNotFoundError:
+        data = {}
+    _files = data.get("files", {})
+    _encoded = data.get("encoded", {})
+    return len(_files)
+
+
+def _hashed_url(endpoint, values):
+    if endpoint == "static":
+        hashed = _files.get(values.get("filename"))
+        if hashed:
+            values["filename"] = hashed
+
+
+def send_static(filename):
+    if not filename.startswith(DIST + "/"):
+        return current_app.send_static_file(filename)
+    available = _encoded.get(filename, ())
+    encoding = next((e for e in available if request.accept_encodings[e]), None)
+    suffix = {"br": ".br", "gzip": ".gz"}.get(encoding, "")
+    response = send_from_directory(current_app.static_folder, filename + suffix,
+                                   mimetype=mimetypes.guess_type(filename)[0])
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if available:
+        response.vary.add("Accept-Encoding")
+    # the name changes with the content, so it never needs revalidating
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
+def init_app(app):
+    load(app.static_folder)
+    app.url_defaults(_hashed_url)
+    app.view_functions["static"] = send_static
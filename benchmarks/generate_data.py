@@ -0,0 +1,257 @@
+# Deterministic synthetic data for load testing. The same --seed and scale
+# options always produce the same rows, so benchmark baselines taken on one
+# machine can be compared with runs on another.
+#
+#   python benchmarks/generate_data.py --truncate --missions 100000 \
+#       --astronauts 20000 --crew-per-mission 12 --bookmarks-per-user 50
+#
+# Uses the DB_* settings from .env and expects the schema (and migrations)
+# to be in place. --truncate wipes every MissionDex table first; without it
+# rows are appended after the current maximum ids.
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+from dotenv import load_dotenv
+from werkzeug.security import generate_password_hash
+
+BENCH_PASSWORD = "benchmark"
+
+WORDS = (
+    "orbit lunar landing docking telemetry rover habitat crew capsule booster "
+    "payload satellite propulsion thermal shield cryogenic ascent descent relay "
+    "station module probe survey sample return comet asteroid solar array "
+    "antenna gyroscope navigation guidance reentry splashdown parachute heavy "
+    "launch vehicle fairing engine ignition abort rendezvous transfer insertion "
+    "gravity assist flyby radiation experiment spectrometer camera imaging"
+).split()
+COUNTRIES = ["USA", "Russia", "China", "India", "Japan", "France", "Germany",
+             "Italy", "Canada", "UK", "Brazil", "Israel", "South Korea", "UAE"]
+DESTINATIONS = ["Moon", "Mars", "LEO", "GEO", "ISS", "Venus", "Jupiter",
+                "Saturn", "Asteroid Belt", "Sun", "L2", "Mercury"]
+MISSION_TYPES = ["Lunar", "Orbital", "Mars", "Crewed", "Cargo", "Science", "Deep Space"]
+# weighted like a real catalogue: mostly finished missions
+STATUSES = ["Completed"] * 6 + ["Failed"] * 1 + ["Ongoing"] * 1 + ["Planned"] * 2
+EVENT_CATEGORIES = ["Launch", "Docking", "Landing", "Anomaly", "EVA", "Flyby", "Separation"]
+ROLES = ["Commander", "Pilot", "Mission Specialist", "Flight Engineer", "Payload Specialist"]
+RANKS = ["Captain", "Colonel", "Commander", "Major", "Dr.", "Lieutenant"]
+SPECIALITIES = ["Pilot", "Engineer", "Geologist", "Physician", "Biologist", "Physicist"]
+
+TABLES = ["bookmarks", "missioncrew", "mission_agencies", "mission_spacecraft",
+          "mission_payloads", "mission_events", "mission_launchsites", "missions",
+          "astronauts", "agencies", "spacecraft", "payloads", "events",
+          "launchsites", "users"]
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def random_date(rng, start_year, end_year):
+    start = date(start_year, 1, 1)
+    return start + timedelta(days=rng.randrange((date(end_year, 12, 31) - start).days))
+
+
+def fanout(rng, average):
+    # uniform 0..2*average, so the mean is `average`
+    return rng.randint(0, 2 * average) if average > 0 else 0
+
+
+class Writer:
+    # batched multi-row inserts, one transaction per chunk
+
+    def __init__(self, conn, chunk_size):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.chunk_size = chunk_size
+        self.total = 0
+
+    def next_id(self, table, id_col):
+        self.cur.execute(f"SELECT COALESCE(MAX({id_col}), 0) + 1 FROM {table}")
+        return self.cur.fetchone()[0]
+
+    def insert(self, table, columns, rows):
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+               f"VALUES ({', '.join(['%s'] * len(columns))})")
+        started = time.monotonic()
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.chunk_size:
+                self.cur.executemany(sql, batch)
+                self.conn.commit()
+                count += len(batch)
+                batch = []
+        if batch:
+            self.cur.executemany(sql, batch)
+            self.conn.commit()
+            count += len(batch)
+        elapsed = time.monotonic() - started
+        self.total += count
+        print(f">>> {table:<20} {count:>10} rows  {count / elapsed if elapsed else 0:>10.0f} rows/s")
+
+
+def generate(conn, args):
+    rng = random.Random(args.seed)
+    writer = Writer(conn, args.chunk_size)
+    cur = writer.cur
+
+    if args.truncate:
+        cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for table in TABLES:
+            cur.execute(f"TRUNCATE TABLE {table}")
+        cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+        conn.commit()
+
+    first = {
+        "agency": writer.next_id("agencies", "agency_id"),
+        "astronaut": writer.next_id("astronauts", "astronaut_id"),
+        "spacecraft": writer.next_id("spacecraft", "spacecraft_id"),
+        "payload": writer.next_id("payloads", "payload_id"),
+        "event": writer.next_id("events", "event_id"),
+        "launchsite": writer.next_id("launchsites", "launchsite_id"),
+        "mission": writer.next_id("missions", "mission_id"),
+        "user": writer.next_id("users", "user_id"),
+    }
+
+    writer.insert("agencies", ["agency_id", "name", "country", "founded_year", "headquarters", "type"], (
+        (first["agency"] + i, f"Agency {first['agency'] + i}", rng.choice(COUNTRIES),
+         rng.randint(1950, 2020), f"{rng.choice(WORDS).capitalize()} City",
+         rng.choice(["Government", "Commercial", "International"]))
+        for i in range(args.agencies)))
+
+    writer.insert("astronauts", ["astronaut_id", "full_name", "rank", "nationality",
+                                 "total_flight_hr", "speciality", "active_status"], (
+        (first["astronaut"] + i, f"Astronaut {first['astronaut'] + i}", rng.choice(RANKS),
+         rng.choice(COUNTRIES), rng.randint(0, 20000), rng.choice(SPECIALITIES),
+         rng.random() < 0.4)
+        for i in range(args.astronauts)))
+
+    writer.insert("spacecraft", ["spacecraft_id", "name", "type", "manufacturer", "first_flight", "capacity"], (
+        (first["spacecraft"] + i, f"Spacecraft {first['spacecraft'] + i}",
+         rng.choice(["Capsule", "Shuttle", "Lander", "Probe", "Station"]),
+         f"{rng.choice(WORDS).capitalize()} Aerospace", random_date(rng, 1960, 2025),
+         rng.randint(0, 8))
+        for i in range(args.spacecraft)))
+
+    writer.insert("payloads", ["payload_id", "name", "type", "weight_kg", "manufacturer", "description"], (
+        (first["payload"] + i, f"Payload {first['payload'] + i}",
+         rng.choice(["Satellite", "Rover", "Instrument", "Cargo", "Experiment"]),
+         round(rng.uniform(1, 20000), 2), f"{rng.choice(WORDS).capitalize()} Systems",
+         sentence(rng, 20))
+        for i in range(args.payloads)))
+
+    writer.insert("events", ["event_id", "name", "category", "date", "location", "description"], (
+        (first["event"] + i, f"{rng.choice(EVENT_CATEGORIES)} {first['event'] + i}",
+         rng.choice(EVENT_CATEGORIES), random_date(rng, 1960, 2030),
+         rng.choice(DESTINATIONS), sentence(rng, 20))
+        for i in range(args.events)))
+
+    writer.insert("launchsites", ["launchsite_id", "name", "country", "latitude", "longitude",
+                                  "established_year", "status", "description"], (
+        (first["launchsite"] + i, f"Launch Site {first['launchsite'] + i}", rng.choice(COUNTRIES),
+         round(rng.uniform(-60, 60), 6), round(rng.uniform(-180, 180), 6),
+         rng.randint(1945, 2020), rng.choice(["Active", "Inactive"]), sentence(rng, 16))
+        for i in range(args.launchsites)))
+
+    writer.insert("missions", ["mission_id", "mission_name", "mission_type", "destination",
+                               "launch_date", "duration", "status", "description"], (
+        (first["mission"] + i, f"Mission {first['mission'] + i}", rng.choice(MISSION_TYPES),
+         rng.choice(DESTINATIONS), random_date(rng, 1960, 2030), rng.randint(1, 900),
+         rng.choice(STATUSES), sentence(rng, 30))
+        for i in range(args.missions)))
+
+    mission_ids = range(first["mission"], first["mission"] + args.missions)
+
+    def links(count, average, minimum=0):
+        # (mission_id, entity_id) pairs, distinct per mission
+        if count == 0:
+            return
+        for mission_id in mission_ids:
+            k = min(count, max(minimum, fanout(rng, average)))
+            for offset in rng.sample(range(count), k):
+                yield mission_id, offset
+
+    writer.insert("missioncrew", ["mission_id", "astronaut_id", "role"], (
+        (m, first["astronaut"] + o, rng.choice(ROLES))
+        for m, o in links(args.astronauts, args.crew_per_mission, minimum=1)))
+    for table, column, key, count, average in (
+        ("mission_agencies", "agency_id", "agency", args.agencies, args.agencies_per_mission),
+        ("mission_spacecraft", "spacecraft_id", "spacecraft", args.spacecraft, args.spacecraft_per_mission),
+        ("mission_payloads", "payload_id", "payload", args.payloads, args.payloads_per_mission),
+        ("mission_events", "event_id", "event", args.events, args.events_per_mission),
+        ("mission_launchsites", "launchsite_id", "launchsite", args.launchsites, 1),
+    ):
+        writer.insert(table, ["mission_id", column], (
+            (m, first[key] + o) for m, o in links(count, average)))
+
+    # hashing is deliberately slow, so every benchmark user shares one hash
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    writer.insert("users", ["user_id", "username", "password_hash", "role"], (
+        (first["user"] + i, f"bench_user_{first['user'] + i}", password_hash,
+         "admin" if i == 0 else "user")
+        for i in range(args.users)))
+
+    def bookmarks():
+        for i in range(args.users):
+            k = min(args.missions, fanout(rng, args.bookmarks_per_user))
+            for offset in rng.sample(range(args.missions), k):
+                yield first["user"] + i, first["mission"] + offset
+
+    writer.insert("bookmarks", ["user_id", "mission_id"], bookmarks())
+
+    # conditional GETs must not answer 304 for pages built from the old data
+    try:
+        cur.execute("UPDATE table_versions SET version = version + 1, changed_at = NOW(6)")
+        conn.commit()
+    except mysql.connector.Error as err:
+        print(f">>> table_versions not bumped ({err.msg}); run flask db-migrate")
+
+    # fresh statistics so EXPLAIN (flask db-explain) sees the real sizes
+    cur.execute("ANALYZE TABLE " + ", ".join(TABLES))
+    cur.fetchall()
+    cur.close()
+    return writer.total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate MissionDex with synthetic data")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="empty every table first")
+    parser.add_argument("--missions", type=int, default=10000)
+    parser.add_argument("--astronauts", type=int, default=2000)
+    parser.add_argument("--agencies", type=int, default=50)
+    parser.add_argument("--spacecraft", type=int, default=300)
+    parser.add_argument("--payloads", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--launchsites", type=int, default=40)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--crew-per-mission", type=int, default=4)
+    parser.add_argument("--agencies-per-mission", type=int, default=2)
+    parser.add_argument("--spacecraft-per-mission", type=int, default=1)
+    parser.add_argument("--payloads-per-mission", type=int, default=3)
+    parser.add_argument("--events-per-mission", type=int, default=5)
+    parser.add_argument("--bookmarks-per-user", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows per INSERT batch")
+    args = parser.parse_args()
+
+    load_dotenv()
+    conn = mysql.connector.connect(
+        host=os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASS"),
+        database=os.getenv("DB_NAME")
+    )
+    started = time.monotonic()
+    total = generate(conn, args)
+    conn.close()
+    print(f">>> {total} rows in {time.monotonic() - started:.1f}s "
+          f"(benchmark users log in with password '{BENCH_PASSWORD}')")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Compare per-request latency of the old six-query mission_detail loader
+# with the single round-trip load_mission_detail() used by the app.
+#
+#   python benchmarks/mission_detail.py --missions 200 --rounds 5
+#
+# Uses the DB_* settings from .env. Run it against a database whose
+# junction tables have realistic fan-out (and ideally over a real network
+# hop rather than localhost, which is where the round trips add up).
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import mysql.connector
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import load_mission_detail  # noqa: E402
+
+
+def load_mission_detail_legacy(cur, mission_id):
+    cur.execute("SELECT * FROM missions WHERE mission_id = %s", (mission_id,))
+    mission = cur.fetchone()
+    cur.execute("""
+        SELECT a.agency_id, a.name, a.country
+        FROM mission_agencies ma
+        JOIN agencies a ON ma.agency_id = a.agency_id
+        WHERE ma.mission_id = %s
+    """, (mission_id,))
+    agencies = cur.fetchall()
+    cur.execute("""
+        SELECT s.spacecraft_id, s.name, s.type
+        FROM mission_spacecraft ms
+        JOIN spacecraft s ON ms.spacecraft_id = s.spacecraft_id
+        WHERE ms.mission_id = %s
+    """, (mission_id,))
+    crafts = cur.fetchall()
+    cur.execute("""
+        SELECT p.payload_id, p.name, p.type, p.weight_kg
+        FROM mission_payloads mp
+        JOIN payloads p ON mp.payload_id = p.payload_id
+        WHERE mp.mission_id = %s
+    """, (mission_id,))
+    payloads = cur.fetchall()
+    cur.execute("""
+      SELECT e.event_id, e.name, e.category, e.date
+      FROM mission_events me
+      JOIN events e ON me.event_id=e.event_id
+      WHERE me.mission_id=%s
+      ORDER BY e.date DESC
+    """, (mission_id,))
+    events = cur.fetchall()
+    cur.execute("""
+      SELECT ls.launchsite_id, ls.name, ls.country
+      FROM mission_launchsites ml
+      JOIN launchsites ls ON ml.launchsite_id=ls.launchsite_id
+      WHERE ml.mission_id=%s
+    """, (mission_id,))
+    launchsites = cur.fetchall()
+    return dict(mission=mission, agencies=agencies, crafts=crafts,
+                payloads=payloads, events=events, launchsites=launchsites)
+
+
+def pick_missions(cur, limit):
+    # the busiest missions are the ones where round trips hurt the most
+    cur.execute("""
+        SELECT m.mission_id,
+               (SELECT COUNT(*) FROM mission_agencies x WHERE x.mission_id = m.mission_id)
+             + (SELECT COUNT(*) FROM mission_spacecraft x WHERE x.mission_id = m.mission_id)
+             + (SELECT COUNT(*) FROM mission_payloads x WHERE x.mission_id = m.mission_id)
+             + (SELECT COUNT(*) FROM mission_events x WHERE x.mission_id = m.mission_id)
+             + (SELECT COUNT(*) FROM mission_launchsites x WHERE x.mission_id = m.mission_id)
+               AS links
+        FROM missions m
+        ORDER BY links DESC
+        LIMIT %s
+    """, (limit,))
+    return [row["mission_id"] for row in cur.fetchall()]
+
+
+def time_loader(cur, loader, mission_ids, rounds):
+    samples = []
+    for _ in range(rounds):
+        for mission_id in mission_ids:
+            started = time.perf_counter()
+            loader(cur, mission_id)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+    print(f"{name:<10} n={len(samples):<6} mean={statistics.mean(samples):8.3f}ms "
+          f"p50={statistics.median(samples):8.3f}ms p95={p95:8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the mission_detail loaders")
+    parser.add_argument("--missions", type=int, default=100,
+                        help="number of missions to load per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    conn = mysql.connector.connect(
+        host=os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASS"),
+        database=os.getenv("DB_NAME")
+    )
+    cur = conn.cursor(dictionary=True)
+    mission_ids = pick_missions(cur, args.missions)
+    if not mission_ids:
+        sys.exit("no missions to benchmark")
+
+    # sanity check: both loaders must produce the same related entities
+    for mission_id in mission_ids[:10]:
+        old = load_mission_detail_legacy(cur, mission_id)
+        new = load_mission_detail(cur, mission_id)
+        for key in ("agencies", "crafts", "payloads", "events", "launchsites"):
+            if len(old[key]) != len(new[key]):
+                sys.exit(f"mission {mission_id}: {key} differ ({len(old[key])} vs {len(new[key])})")
+
+    time_loader(cur, load_mission_detail, mission_ids[:10], 1)  # warm up
+    summarize("before", time_loader(cur, load_mission_detail_legacy, mission_ids, args.rounds))
+    summarize("after", time_loader(cur, load_mission_detail, mission_ids, args.rounds))
+
+    cur.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
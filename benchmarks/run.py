@@ -0,0 +1,259 @@
+# Route-level benchmark: drives every read route either in-process through
+# the Flask test client (default) or over HTTP against a running server,
+# and reports p50/p95/p99 latency, queries per request and throughput.
+#
+#   python benchmarks/run.py --requests 200 --save benchmarks/baselines/10k.json
+#   python benchmarks/run.py --requests 200 --compare benchmarks/baselines/10k.json
+#   python benchmarks/run.py --base-url http://127.0.0.1:8000 --concurrency 8
+#
+# Entity ids are drawn from the configured database with a fixed seed, so
+# two runs against the same generated data hit the same pages. Queries per
+# request come from the Server-Timing header the app adds to every response.
+# Set ENTITY_CACHE_SIZE=0 to measure the profile pages without the cache.
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+
+import mysql.connector
+from dotenv import load_dotenv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (name, path template, table whose ids fill {id})
+ROUTES = [
+    ("missions", "/missions", None),
+    ("missions_filtered", "/missions?status=Completed", None),
+    ("mission_detail", "/missions/{id}", ("missions", "mission_id")),
+    ("mission_stats", "/mission_stats", None),
+    ("astronauts", "/astronauts", None),
+    ("astronaut_profile", "/astronaut/{id}", ("astronauts", "astronaut_id")),
+    ("agencies", "/agencies", None),
+    ("agency_profile", "/agency/{id}", ("agencies", "agency_id")),
+    ("spacecraft", "/spacecraft", None),
+    ("spacecraft_profile", "/spacecraft/{id}", ("spacecraft", "spacecraft_id")),
+    ("payloads", "/payloads", None),
+    ("payload_profile", "/payload/{id}", ("payloads", "payload_id")),
+    ("events", "/events", None),
+    ("event_profile", "/event/{id}", ("events", "event_id")),
+    ("launchsites", "/launchsites", None),
+    ("launchsite_profile", "/launchsite/{id}", ("launchsites", "launchsite_id")),
+    ("dashboard", "/dashboard", None),
+    ("search", "/search?q=lunar", None),
+]
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def sample_ids(rng, count):
+    conn = mysql.connector.connect(
+        host=os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASS"),
+        database=os.getenv("DB_NAME")
+    )
+    cur = conn.cursor()
+    ids = {}
+    for _, _, source in ROUTES:
+        if source is None or source in ids:
+            continue
+        table, id_col = source
+        cur.execute(f"SELECT MIN({id_col}), MAX({id_col}) FROM {table}")
+        low, high = cur.fetchone()
+        ids[source] = [rng.randint(low, high) for _ in range(count)] if low is not None else []
+    cur.execute("SELECT user_id, username FROM users WHERE username LIKE 'bench\\_user\\_%' ORDER BY user_id LIMIT 1")
+    user = cur.fetchone()
+    cur.close()
+    conn.close()
+    return ids, user
+
+
+class TestClientDriver:
+
+    def __init__(self, user):
+        import app as app_module
+        self.app = app_module.app
+        self.user = user
+
+    def session(self):
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = self.user[0] if self.user else 1
+            sess["username"] = self.user[1] if self.user else "bench"
+            sess["role"] = "admin"
+
+        def get(path):
+            response = client.get(path)
+            return response.status_code, response.headers.get("Server-Timing", "")
+        return get
+
+
+class HttpDriver:
+
+    def __init__(self, base_url, user, password):
+        self.base_url = base_url.rstrip("/")
+        self.user = user
+        self.password = password
+
+    def session(self):
+        jar = http.cookiejar.CookieJar()
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+        if self.user:
+            form = urllib.parse.urlencode({"username": self.user[1], "password": self.password}).encode()
+            opener.open(self.base_url + "/login", form).read()
+
+        def get(path):
+            try:
+                with opener.open(self.base_url + path) as response:
+                    response.read()
+                    return response.status, response.headers.get("Server-Timing", "")
+            except urllib.error.HTTPError as err:
+                return err.code, ""
+        return get
+
+
+def bench_route(driver, paths, concurrency):
+    # every worker thread gets its own session and takes paths off a shared list
+    latencies, queries, errors = [], [], 0
+    lock = threading.Lock()
+    todo = list(paths)
+
+    def worker():
+        nonlocal errors
+        get = driver.session()
+        while True:
+            with lock:
+                if not todo:
+                    return
+                path = todo.pop()
+            started = time.perf_counter()
+            status, timing = get(path)
+            elapsed = (time.perf_counter() - started) * 1000
+            match = QUERIES_RE.search(timing)
+            with lock:
+                latencies.append(elapsed)
+                if match:
+                    queries.append(int(match.group(1)))
+                if status >= 400:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.mean(latencies), 3) if latencies else 0.0,
+        "queries_per_request": round(statistics.mean(queries), 2) if queries else None,
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+    }
+
+
+def compare(results, baseline, tolerance):
+    # a route regresses if p95 grows beyond the tolerance or it issues more
+    # queries per request than it used to
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("routes", {}).get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if (before.get("queries_per_request") is not None
+                and current["queries_per_request"] is not None
+                and current["queries_per_request"] > before["queries_per_request"]):
+            regressions.append(f"{name}: queries/request {before['queries_per_request']} "
+                               f"-> {current['queries_per_request']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MissionDex routes")
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per route")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--routes", help="comma-separated subset of route names")
+    parser.add_argument("--base-url", help="benchmark a running server instead of the test client")
+    parser.add_argument("--password", default="benchmark", help="password of the bench_user_* accounts")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", metavar="FILE", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="fail on regressions against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    rng = random.Random(args.seed)
+    ids, user = sample_ids(rng, args.requests + args.warmup)
+    driver = HttpDriver(args.base_url, user, args.password) if args.base_url else TestClientDriver(user)
+    selected = set(args.routes.split(",")) if args.routes else None
+
+    results = {}
+    print(f"{'route':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'q/req':>7} {'req/s':>8} {'errors':>6}")
+    for name, template, source in ROUTES:
+        if selected and name not in selected:
+            continue
+        count = args.requests + args.warmup
+        if source is None:
+            paths = [template] * count
+        elif ids.get(source):
+            paths = [template.format(id=i) for i in ids[source]]
+        else:
+            continue
+        bench_route(driver, paths[:args.warmup], 1)
+        result = results[name] = bench_route(driver, paths[args.warmup:], args.concurrency)
+        qpr = result["queries_per_request"]
+        print(f"{name:<20} {result['p50_ms']:>7.2f}ms {result['p95_ms']:>7.2f}ms "
+              f"{result['p99_ms']:>7.2f}ms {qpr if qpr is not None else '-':>7} "
+              f"{result['rps']:>8.1f} {result['errors']:>6}")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "mode": "http" if args.base_url else "test_client",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "routes": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f">>> baseline written to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"✗ {line}")
+        if regressions:
+            sys.exit(1)
+        print(">>> no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from array import array
+from bisect import bisect_left
+
+import versions
+from cache import LRUCache
+
+
+class BookmarkSet:
+    # A user's bookmarked mission ids as a sorted array of C ints: 4 bytes
+    # per bookmark, where a Python set of ints costs well over 50. Instances
+    # are never modified, so requests can share one.
+
+    __slots__ = ("ids",)
+
+    def __init__(self, ids=()):
+        self.ids = array("i", sorted(set(ids)))
+
+    def __contains__(self, mission_id):
+        i = bisect_left(self.ids, mission_id)
+        return i < len(self.ids) and self.ids[i] == mission_id
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def with_id(self, mission_id):
+        return BookmarkSet(list(self.ids) + [mission_id])
+
+    def without_id(self, mission_id):
+        return BookmarkSet(i for i in self.ids if i != mission_id)
+
+
+def counter(user_id):
+    # the user's own change counter: another user's bookmark leaves this
+    # user's cached set and page ETags alone
+    return versions.user_counter("bookmarks", user_id)
+
+
+class BookmarkCache:
+    # user_id -> BookmarkSet, loaded with one query on first use and kept in
+    # step write-through by add()/remove(). Entries are filed under the
+    # user's bookmarks counter they were loaded at and count as a miss once
+    # it moves, so a bookmark made through another worker process never
+    # leaves this one serving the old set under the new ETag.
+
+    def __init__(self, maxsize, ttl):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, conn, user_id):
+        return self._load(conn, user_id)[1]
+
+    def _load(self, conn, user_id):
+        # (version, BookmarkSet); the counter comes from the request's
+        # server, like the page's ETag and the rows below: read before them
+        version = versions.data_version(counter(user_id))
+        entry = self._cache.get(user_id, valid=lambda cached: cached[0] == version)
+        if entry is None:
+            cur = conn.cursor()
+            cur.execute("SELECT mission_id FROM bookmarks WHERE user_id = %s", (user_id,))
+            entry = (version, BookmarkSet(row[0] for row in cur.fetchall()))
+            cur.close()
+            self._cache.set(user_id, entry)
+        return entry
+
+    def _bump(self, cur, user_id):
+        # inside the write's transaction: (counter before, after) the write
+        versions.bump(cur, counter(user_id))
+        return versions.bumped(cur, counter(user_id))
+
+    def add(self, conn, user_id, mission_id):
+        version, marks = self._load(conn, user_id)
+        if mission_id in marks:
+            return False
+        cur = conn.cursor()
+        # the unique key on (user_id, mission_id) from migration 0003 makes
+        # a double submit a no-op; IGNORE also skips unknown mission ids
+        cur.execute("INSERT IGNORE INTO bookmarks (user_id, mission_id) VALUES (%s, %s)",
+                    (user_id, mission_id))
+        added = cur.rowcount > 0
+        if added:
+            before, after = self._bump(cur, user_id)
+        conn.commit()
+        cur.close()
+        if added and before == version:
+            self._cache.set(user_id, (after, marks.with_id(mission_id)))
+        else:
+            # already bookmarked, or the set changed, through another
+            # worker; or no such mission: reload
+            self._cache.invalidate(user_id)
+        return added
+
+    def remove(self, conn, user_id, mission_id):
+        cur = conn.cursor()
+        cur.execute("DELETE FROM bookmarks WHERE user_id = %s AND mission_id = %s",
+                    (user_id, mission_id))
+        removed = cur.rowcount > 0
+        if removed:
+            before, after = self._bump(cur, user_id)
+        conn.commit()
+        cur.close()
+        entry = self._cache.get(user_id)
+        if removed and entry is not None and entry[0] == before:
+            self._cache.set(user_id, (after, entry[1].without_id(mission_id)))
+        else:
+            self._cache.invalidate(user_id)
+        return removed
+
+    def stats(self):
+        return self._cache.stats()
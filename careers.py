@@ -0,0 +1,99 @@
+import mysql.connector
+
+# Per-astronaut career summary (migration 0006): missions flown, how many
+# completed, their total duration, the most recent mission and the
+# spacecraft flown, one row per astronaut with at least one mission. The
+# profile page, the astronaut list and "Most Active Astronauts" read it
+# instead of aggregating missioncrew x missions x spacecraft per view.
+#
+# Like the rollups, write paths keep it exact by recomputing the rows they
+# can have changed inside their own transaction: crew links change their
+# astronaut's row, spacecraft links and mission edits (status, duration,
+# launch date) change the rows of everyone on those missions.
+
+TABLE = "astronaut_careers"
+
+ER_NO_SUCH_TABLE = 1146
+
+SUMMARY = f"""
+    INSERT INTO {TABLE}
+      (astronaut_id, missions, completed, total_duration, last_mission_id, spacecraft)
+    SELECT mc.astronaut_id,
+           COUNT(*),
+           SUM(m.status = 'Completed'),
+           SUM(m.duration),
+           (SELECT lc.mission_id
+              FROM missioncrew lc
+              JOIN missions lm ON lm.mission_id = lc.mission_id
+             WHERE lc.astronaut_id = mc.astronaut_id
+             ORDER BY lm.launch_date DESC, lm.mission_id DESC
+             LIMIT 1),
+           (SELECT GROUP_CONCAT(DISTINCT s.name ORDER BY s.name SEPARATOR ', ')
+              FROM missioncrew sc
+              JOIN mission_spacecraft ms ON ms.mission_id = sc.mission_id
+              JOIN spacecraft s ON s.spacecraft_id = ms.spacecraft_id
+             WHERE sc.astronaut_id = mc.astronaut_id)
+    FROM missioncrew mc
+    JOIN missions m ON m.mission_id = mc.mission_id
+"""
+
+
+def _in(values):
+    return ",".join(["%s"] * len(values))
+
+
+def _guarded(update):
+    # Until migration 0006 is applied, writes carry on without the summary.
+    # Call these on the write's cursor before it commits.
+    def wrapper(cur, *args):
+        try:
+            update(cur, *args)
+        except mysql.connector.Error as err:
+            if err.errno != ER_NO_SUCH_TABLE:
+                raise
+    wrapper.__name__ = update.__name__
+    return wrapper
+
+
+@_guarded
+def astronauts_changed(cur, astronaut_ids):
+    astronaut_ids = sorted({i for i in astronaut_ids if i is not None})
+    if not astronaut_ids:
+        return
+    cur.execute(f"DELETE FROM {TABLE} WHERE astronaut_id IN ({_in(astronaut_ids)})",
+                tuple(astronaut_ids))
+    cur.execute(f"{SUMMARY} WHERE mc.astronaut_id IN ({_in(astronaut_ids)}) GROUP BY mc.astronaut_id",
+                tuple(astronaut_ids))
+
+
+@_guarded
+def missions_changed(cur, mission_ids):
+    # missions added, or their status, duration, launch date or spacecraft
+    # changed; like rollups.missions_changed, call it from every mission
+    # write (a new mission has no crew yet, so that costs one SELECT)
+    mission_ids = sorted(set(mission_ids))
+    if not mission_ids:
+        return
+    cur.execute(f"SELECT DISTINCT astronaut_id FROM missioncrew WHERE mission_id IN ({_in(mission_ids)})",
+                tuple(mission_ids))
+    astronauts_changed(cur, [row[0] for row in cur.fetchall()])
+
+
+def links_changed(cur, dimension, pairs):
+    # (mission_id, entity_id) pairs added to or removed from a junction
+    # table; same arguments as rollups.links_changed
+    if dimension == "astronaut":
+        astronauts_changed(cur, [entity_id for _, entity_id in pairs])
+    elif dimension == "spacecraft":
+        missions_changed(cur, [mission_id for mission_id, _ in pairs])
+
+
+def rebuild(conn):
+    # recompute every row from scratch (`flask careers-rebuild`)
+    cur = conn.cursor()
+    cur.execute(f"DELETE FROM {TABLE}")
+    cur.execute(f"{SUMMARY} GROUP BY mc.astronaut_id")
+    rows = cur.rowcount
+    conn.commit()
+    cur.close()
+    return rows
@@ -0,0 +1,222 @@
+import glob
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import instrumentation
+
+# Server-side charts for /mission_stats, served as PNG or SVG from
+# /charts/<name>.<format>.
+#
+# Plotting is CPU-bound and holds the GIL, so it runs in a small pool of
+# separate processes (CHART_WORKERS, default 2) rather than on a request
+# thread; a request thread only waits for the bytes. The pool is bounded
+# the same way as the password hasher: past CHART_QUEUE waiting renders the
+# caller gets ChartBusy (503) at once.
+#
+# Rendered images are written to CHART_CACHE_DIR under a name derived from
+# the change counters of the tables the chart reads (versions.py), so every
+# worker on the host serves an unchanged chart as plain file bytes and a
+# write simply makes the next request render under a new name.
+
+CACHE_DIR = os.getenv("CHART_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "missiondex-charts")
+CHART_WORKERS = int(os.getenv("CHART_WORKERS") or 2)
+CHART_QUEUE = int(os.getenv("CHART_QUEUE") or 8)
+CHART_RENDER_TIMEOUT = float(os.getenv("CHART_RENDER_TIMEOUT") or 30)
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+render_duration = instrumentation.Histogram(
+    "missiondex_chart_render_seconds", "Time to render a chart, including the wait for a worker process.",
+    [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10], label="chart")
+chart_requests = instrumentation.Counter(
+    "missiondex_chart_requests_total", "Chart requests by outcome (hit, render, shared, busy).",
+    label="outcome")
+instrumentation.METRICS.extend([render_duration, chart_requests])
+
+# site colours (static/style.css)
+BACKGROUND = "#1a2b4c"
+FOREGROUND = "#00ffff"
+TEXT = "#cccccc"
+
+
+class ChartBusy(Exception):
+    pass
+
+
+# plotting; runs in the worker processes
+
+def _style(fig, ax, title):
+    fig.set_facecolor(BACKGROUND)
+    ax.set_facecolor(BACKGROUND)
+    ax.set_title(title, color=FOREGROUND)
+    ax.tick_params(colors=TEXT)
+    for spine in ax.spines.values():
+        spine.set_color(TEXT)
+    ax.grid(axis="x", color=TEXT, alpha=0.2)
+
+
+def _spacecraft_success(fig, ax, data):
+    # data: [(spacecraft name, success rate %)]
+    names = [name for name, _ in data]
+    ax.barh(names, [rate for _, rate in data], color=FOREGROUND)
+    ax.invert_yaxis()
+    ax.set_xlim(0, 100)
+    ax.set_xlabel("Success rate (%)", color=TEXT)
+    _style(fig, ax, "Spacecraft success rate")
+
+
+def _launchsites(fig, ax, data):
+    # data: [(launch site name, launches)], busiest first
+    names = [name for name, _ in data]
+    ax.barh(names, [count for _, count in data], color=FOREGROUND)
+    ax.invert_yaxis()
+    ax.set_xlabel("Missions launched", color=TEXT)
+    _style(fig, ax, "Launches per site")
+
+
+def _agency_monthly(fig, ax, data):
+    # data: [(agency name, "YYYY-MM", missions)], ordered by agency then month
+    months = sorted({month for _, month, _ in data})
+    position = {month: i for i, month in enumerate(months)}
+    series = {}
+    for agency, month, count in data:
+        series.setdefault(agency, ([], []))
+        series[agency][0].append(position[month])
+        series[agency][1].append(count)
+    for agency, (xs, ys) in series.items():
+        ax.plot(xs, ys, marker="o", markersize=3, label=agency)
+    step = max(1, len(months) // 12)
+    ax.set_xticks(range(0, len(months), step))
+    ax.set_xticklabels(months[::step], rotation=45, ha="right")
+    ax.set_ylabel("Missions", color=TEXT)
+    if series:
+        ax.legend(fontsize="small", facecolor=BACKGROUND, labelcolor=TEXT, edgecolor=TEXT)
+    _style(fig, ax, "Missions per agency per month")
+    ax.grid(axis="y", color=TEXT, alpha=0.2)
+
+
+PLOTTERS = {
+    "spacecraft-success": _spacecraft_success,
+    "launchsites": _launchsites,
+    "agency-monthly": _agency_monthly,
+}
+
+
+def render(name, fmt, data):
+    # matplotlib's object API (no pyplot): no global figure state, and the
+    # import cost is paid once per worker process
+    from matplotlib.figure import Figure
+
+    # bar charts grow with their number of bars
+    height = 4.5 if name == "agency-monthly" else min(12, 1.5 + 0.35 * len(data))
+    fig = Figure(figsize=(8, height))
+    ax = fig.subplots()
+    PLOTTERS[name](fig, ax, data)
+    out = io.BytesIO()
+    # fixed metadata so identical data gives identical bytes
+    metadata = {"Date": None} if fmt == "svg" else {"Software": None}
+    fig.savefig(out, format=fmt, bbox_inches="tight", dpi=100, metadata=metadata)
+    return out.getvalue()
+
+
+# request side
+
+class ChartRenderer:
+
+    def __init__(self, workers, queue_limit, timeout, cache_dir):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self._executor = None
+        self._pid = None
+        # reentrant: a Future that is already done runs its callback at once
+        self._lock = threading.RLock()
+        self._pending = {}  # cache file -> Future, so one render serves concurrent requests
+
+    def _pool(self):
+        # child processes are not inherited across fork(); each gunicorn
+        # worker starts its own. "spawn" keeps them free of the parent's
+        # threads and open connections (and works on Windows).
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context("spawn"))
+                    self._pid = os.getpid()
+                    self._pending = {}
+        return self._executor
+
+    def path(self, name, fmt, version):
+        digest = hashlib.sha1(version.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{name}-{digest}.{fmt}")
+
+    def cached(self, name, fmt, version):
+        try:
+            with open(self.path(name, fmt, version), "rb") as image:
+                chart_requests.inc("hit")
+                return image.read()
+        except FileNotFoundError:
+            return None
+
+    def render(self, name, fmt, version, data):
+        # `data` is computed by the caller from the same state as `version`
+        path = self.path(name, fmt, version)
+        pool = self._pool()
+        with self._lock:
+            future = self._pending.get(path)
+            owner = future is None
+            if owner:
+                if len(self._pending) >= self.workers + self.queue_limit:
+                    chart_requests.inc("busy")
+                    raise ChartBusy(f"{len(self._pending)} charts already rendering")
+                future = self._pending[path] = pool.submit(render, name, fmt, data)
+                future.add_done_callback(lambda _: self._done(path))
+        started = time.perf_counter()
+        try:
+            image = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            chart_requests.inc("busy")
+            raise ChartBusy(f"chart took longer than {self.timeout}s")
+        if not owner:
+            # waited for the same render another request started
+            chart_requests.inc("shared")
+            return image
+        render_duration.observe(name, time.perf_counter() - started)
+        chart_requests.inc("render")
+        self._store(path, name, fmt, image)
+        return image
+
+    def _done(self, path):
+        with self._lock:
+            self._pending.pop(path, None)
+
+    def _store(self, path, name, fmt, image):
+        # write-then-rename, so other workers never read half a file; older
+        # versions of the same chart are dropped
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if os.path.exists(path):
+            return
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as out:
+            out.write(image)
+        os.replace(tmp, path)
+        for old in glob.glob(os.path.join(self.cache_dir, f"{name}-*.{fmt}")):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._pending)
+
+
+renderer = ChartRenderer(CHART_WORKERS, CHART_QUEUE, CHART_RENDER_TIMEOUT, CACHE_DIR)
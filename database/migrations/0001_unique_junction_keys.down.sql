@@ -0,0 +1,5 @@
+ALTER TABLE mission_agencies DROP KEY uq_mission_agency;
+ALTER TABLE mission_spacecraft DROP KEY uq_mission_spacecraft;
+ALTER TABLE mission_payloads DROP KEY uq_mission_payload;
+ALTER TABLE mission_events DROP KEY uq_mission_event;
+ALTER TABLE mission_launchsites DROP KEY uq_mission_launchsite;
@@ -0,0 +1,36 @@
+-- Give every mission <-> entity junction table a unique key on the pair,
+-- so links can be written idempotently (INSERT IGNORE) without a
+-- SELECT-then-INSERT race. missioncrew already has PRIMARY KEY
+-- (mission_id, astronaut_id).
+--
+-- Existing duplicate links are removed first, keeping the oldest row.
+
+DELETE a FROM mission_agencies a
+  JOIN mission_agencies b
+    ON a.mission_id = b.mission_id AND a.agency_id = b.agency_id AND a.id > b.id;
+ALTER TABLE mission_agencies
+  ADD UNIQUE KEY uq_mission_agency (mission_id, agency_id);
+
+DELETE a FROM mission_spacecraft a
+  JOIN mission_spacecraft b
+    ON a.mission_id = b.mission_id AND a.spacecraft_id = b.spacecraft_id AND a.id > b.id;
+ALTER TABLE mission_spacecraft
+  ADD UNIQUE KEY uq_mission_spacecraft (mission_id, spacecraft_id);
+
+DELETE a FROM mission_payloads a
+  JOIN mission_payloads b
+    ON a.mission_id = b.mission_id AND a.payload_id = b.payload_id AND a.id > b.id;
+ALTER TABLE mission_payloads
+  ADD UNIQUE KEY uq_mission_payload (mission_id, payload_id);
+
+DELETE a FROM mission_events a
+  JOIN mission_events b
+    ON a.mission_id = b.mission_id AND a.event_id = b.event_id AND a.id > b.id;
+ALTER TABLE mission_events
+  ADD UNIQUE KEY uq_mission_event (mission_id, event_id);
+
+DELETE a FROM mission_launchsites a
+  JOIN mission_launchsites b
+    ON a.mission_id = b.mission_id AND a.launchsite_id = b.launchsite_id AND a.id > b.id;
+ALTER TABLE mission_launchsites
+  ADD UNIQUE KEY uq_mission_launchsite (mission_id, launchsite_id);
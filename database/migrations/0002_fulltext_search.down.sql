@@ -0,0 +1,4 @@
+ALTER TABLE missions DROP KEY ft_missions;
+ALTER TABLE events DROP KEY ft_events;
+ALTER TABLE payloads DROP KEY ft_payloads;
+ALTER TABLE launchsites DROP KEY ft_launchsites;
@@ -0,0 +1,18 @@
+-- Full-text indexes behind /search. InnoDB keeps FULLTEXT indexes up to
+-- date on every committed INSERT/UPDATE, so rows added through the admin
+-- forms, the bulk importer or assign routes are searchable immediately.
+--
+-- Words shorter than innodb_ft_min_token_size (default 3) and InnoDB
+-- stopwords are not indexed.
+
+ALTER TABLE missions
+  ADD FULLTEXT KEY ft_missions (mission_name, description);
+
+ALTER TABLE events
+  ADD FULLTEXT KEY ft_events (name, description);
+
+ALTER TABLE payloads
+  ADD FULLTEXT KEY ft_payloads (name, description);
+
+ALTER TABLE launchsites
+  ADD FULLTEXT KEY ft_launchsites (name, description);
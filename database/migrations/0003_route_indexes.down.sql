@@ -0,0 +1,17 @@
+ALTER TABLE astronauts DROP KEY idx_astronauts_full_name;
+ALTER TABLE launchsites DROP KEY idx_launchsites_name;
+ALTER TABLE payloads DROP KEY idx_payloads_name;
+ALTER TABLE spacecraft DROP KEY idx_spacecraft_name;
+ALTER TABLE agencies DROP KEY idx_agencies_name;
+ALTER TABLE events DROP KEY idx_events_date;
+
+ALTER TABLE bookmarks
+  ADD KEY user_id (user_id),
+  DROP KEY uq_bookmarks_user_mission;
+
+ALTER TABLE missions
+  DROP KEY idx_missions_destination_launch,
+  DROP KEY idx_missions_status_launch,
+  DROP KEY idx_missions_type_launch,
+  DROP KEY idx_missions_launch,
+  ADD KEY idx_mission_type (mission_type);
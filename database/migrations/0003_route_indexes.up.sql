@@ -0,0 +1,34 @@
+-- Indexes for the queries app.py actually runs.
+--
+-- /missions filters on at most one of type/status/destination at a time
+-- in practice and always pages by (launch_date DESC, mission_id DESC).
+-- InnoDB appends the primary key to every secondary index, so each
+-- (filter, launch_date) index also covers the mission_id tie-breaker and
+-- lets the keyset seek read just one page. idx_mission_type is replaced
+-- by its (mission_type, launch_date) extension.
+ALTER TABLE missions
+  DROP KEY idx_mission_type,
+  ADD KEY idx_missions_launch (launch_date),
+  ADD KEY idx_missions_type_launch (mission_type, launch_date),
+  ADD KEY idx_missions_status_launch (status, launch_date),
+  ADD KEY idx_missions_destination_launch (destination, launch_date);
+
+-- one bookmark per user and mission; the unique key also serves the
+-- dashboard lookup and the user_id foreign key, so the old single-column
+-- key goes away. Duplicates are removed first, keeping the oldest row.
+DELETE a FROM bookmarks a
+  JOIN bookmarks b
+    ON a.user_id = b.user_id AND a.mission_id = b.mission_id AND a.bookmark_id > b.bookmark_id;
+ALTER TABLE bookmarks
+  ADD UNIQUE KEY uq_bookmarks_user_mission (user_id, mission_id),
+  DROP KEY user_id;
+
+-- /events pages by (date DESC, event_id DESC)
+ALTER TABLE events ADD KEY idx_events_date (date);
+
+-- the other list views page by name
+ALTER TABLE agencies ADD KEY idx_agencies_name (name);
+ALTER TABLE spacecraft ADD KEY idx_spacecraft_name (name);
+ALTER TABLE payloads ADD KEY idx_payloads_name (name);
+ALTER TABLE launchsites ADD KEY idx_launchsites_name (name);
+ALTER TABLE astronauts ADD KEY idx_astronauts_full_name (full_name);
@@ -0,0 +1 @@
+DROP TABLE table_versions;
@@ -0,0 +1,16 @@
+-- One change counter per table behind the ETag / Last-Modified headers.
+-- Every write path bumps the counters of the tables it touched in the same
+-- transaction (versions.bump), so a counter never moves without the data.
+
+CREATE TABLE table_versions (
+  table_name varchar(64) NOT NULL,
+  version bigint unsigned NOT NULL DEFAULT 0,
+  changed_at timestamp(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (table_name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT INTO table_versions (table_name) VALUES
+  ('missions'), ('astronauts'), ('agencies'), ('spacecraft'), ('payloads'),
+  ('events'), ('launchsites'), ('missioncrew'), ('mission_agencies'),
+  ('mission_spacecraft'), ('mission_payloads'), ('mission_events'),
+  ('mission_launchsites'), ('bookmarks');
@@ -0,0 +1,5 @@
+DROP TABLE rollup_launchsite_month;
+DROP TABLE rollup_astronaut_month;
+DROP TABLE rollup_spacecraft_month;
+DROP TABLE rollup_agency_month;
+DROP TABLE rollup_month;
@@ -0,0 +1,89 @@
+-- Monthly rollups behind /mission_stats/range and /api/v1/stats/range
+-- (rollups.py). One row per calendar month (its first day) and entity:
+-- linked missions launched that month, how many completed, and their total
+-- duration. The write paths recompute the cells they touch in the same
+-- transaction; `flask rollups-rebuild` recomputes everything. Missions
+-- without a launch date are not counted.
+
+CREATE TABLE rollup_month (
+  month date NOT NULL,
+  missions int unsigned NOT NULL,
+  completed int unsigned NOT NULL,
+  duration bigint unsigned NOT NULL,
+  PRIMARY KEY (month)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE rollup_agency_month (
+  month date NOT NULL,
+  entity_id int NOT NULL,
+  missions int unsigned NOT NULL,
+  completed int unsigned NOT NULL,
+  duration bigint unsigned NOT NULL,
+  PRIMARY KEY (month, entity_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE rollup_spacecraft_month (
+  month date NOT NULL,
+  entity_id int NOT NULL,
+  missions int unsigned NOT NULL,
+  completed int unsigned NOT NULL,
+  duration bigint unsigned NOT NULL,
+  PRIMARY KEY (month, entity_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE rollup_astronaut_month (
+  month date NOT NULL,
+  entity_id int NOT NULL,
+  missions int unsigned NOT NULL,
+  completed int unsigned NOT NULL,
+  duration bigint unsigned NOT NULL,
+  PRIMARY KEY (month, entity_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE rollup_launchsite_month (
+  month date NOT NULL,
+  entity_id int NOT NULL,
+  missions int unsigned NOT NULL,
+  completed int unsigned NOT NULL,
+  duration bigint unsigned NOT NULL,
+  PRIMARY KEY (month, entity_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT INTO rollup_month (month, missions, completed, duration)
+SELECT m.launch_date - INTERVAL (DAYOFMONTH(m.launch_date) - 1) DAY,
+       COUNT(*), SUM(m.status = 'Completed'), COALESCE(SUM(m.duration), 0)
+FROM missions m
+WHERE m.launch_date IS NOT NULL
+GROUP BY 1;
+
+INSERT INTO rollup_agency_month (month, entity_id, missions, completed, duration)
+SELECT m.launch_date - INTERVAL (DAYOFMONTH(m.launch_date) - 1) DAY, j.agency_id,
+       COUNT(*), SUM(m.status = 'Completed'), COALESCE(SUM(m.duration), 0)
+FROM mission_agencies j
+JOIN missions m ON m.mission_id = j.mission_id
+WHERE m.launch_date IS NOT NULL AND j.agency_id IS NOT NULL
+GROUP BY 1, 2;
+
+INSERT INTO rollup_spacecraft_month (month, entity_id, missions, completed, duration)
+SELECT m.launch_date - INTERVAL (DAYOFMONTH(m.launch_date) - 1) DAY, j.spacecraft_id,
+       COUNT(*), SUM(m.status = 'Completed'), COALESCE(SUM(m.duration), 0)
+FROM mission_spacecraft j
+JOIN missions m ON m.mission_id = j.mission_id
+WHERE m.launch_date IS NOT NULL AND j.spacecraft_id IS NOT NULL
+GROUP BY 1, 2;
+
+INSERT INTO rollup_astronaut_month (month, entity_id, missions, completed, duration)
+SELECT m.launch_date - INTERVAL (DAYOFMONTH(m.launch_date) - 1) DAY, j.astronaut_id,
+       COUNT(*), SUM(m.status = 'Completed'), COALESCE(SUM(m.duration), 0)
+FROM missioncrew j
+JOIN missions m ON m.mission_id = j.mission_id
+WHERE m.launch_date IS NOT NULL AND j.astronaut_id IS NOT NULL
+GROUP BY 1, 2;
+
+INSERT INTO rollup_launchsite_month (month, entity_id, missions, completed, duration)
+SELECT m.launch_date - INTERVAL (DAYOFMONTH(m.launch_date) - 1) DAY, j.launchsite_id,
+       COUNT(*), SUM(m.status = 'Completed'), COALESCE(SUM(m.duration), 0)
+FROM mission_launchsites j
+JOIN missions m ON m.mission_id = j.mission_id
+WHERE m.launch_date IS NOT NULL AND j.launchsite_id IS NOT NULL
+GROUP BY 1, 2;
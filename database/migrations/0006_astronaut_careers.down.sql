@@ -0,0 +1 @@
+DROP TABLE astronaut_careers;
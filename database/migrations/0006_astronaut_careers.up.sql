@@ -0,0 +1,36 @@
+-- Per-astronaut career summary behind the astronaut profile, the astronaut
+-- list and "Most Active Astronauts" (careers.py). One row per astronaut
+-- with at least one mission. The write paths recompute the rows they touch
+-- in the same transaction; `flask careers-rebuild` recomputes everything.
+
+CREATE TABLE astronaut_careers (
+  astronaut_id int NOT NULL,
+  missions int unsigned NOT NULL,
+  completed int unsigned NOT NULL,
+  total_duration bigint DEFAULT NULL,
+  last_mission_id int DEFAULT NULL,
+  spacecraft text,
+  PRIMARY KEY (astronaut_id),
+  KEY idx_careers_duration (total_duration)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT INTO astronaut_careers
+  (astronaut_id, missions, completed, total_duration, last_mission_id, spacecraft)
+SELECT mc.astronaut_id,
+       COUNT(*),
+       SUM(m.status = 'Completed'),
+       SUM(m.duration),
+       (SELECT lc.mission_id
+          FROM missioncrew lc
+          JOIN missions lm ON lm.mission_id = lc.mission_id
+         WHERE lc.astronaut_id = mc.astronaut_id
+         ORDER BY lm.launch_date DESC, lm.mission_id DESC
+         LIMIT 1),
+       (SELECT GROUP_CONCAT(DISTINCT s.name ORDER BY s.name SEPARATOR ', ')
+          FROM missioncrew sc
+          JOIN mission_spacecraft ms ON ms.mission_id = sc.mission_id
+          JOIN spacecraft s ON s.spacecraft_id = ms.spacecraft_id
+         WHERE sc.astronaut_id = mc.astronaut_id)
+FROM missioncrew mc
+JOIN missions m ON m.mission_id = mc.mission_id
+GROUP BY mc.astronaut_id;
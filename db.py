@@ -0,0 +1,529 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from flask import abort, g, has_request_context, request, session
+
+from instrumentation import METRICS, Counter, InstrumentedCursor
+
+# Read/write splitting. With DB_REPLICA_HOSTS set (host[:port], comma
+# separated), GET/HEAD requests read from the replicas, taken round-robin
+# per request; every other method, and CLI commands, use the primary at
+# DB_HOST. After a request that committed on the primary, the session is
+# pinned to the primary for DB_STICKY_SECONDS, so whoever just wrote sees
+# the change even while the replicas are catching up. A replica that fails to connect or answer, or
+# (with DB_REPLICA_MAX_LAG) falls behind or stops replicating, is skipped
+# for DB_REPLICA_RETRY seconds; with none left, reads go to the primary.
+
+READ_METHODS = ("GET", "HEAD")
+STICKY_SECONDS = float(os.getenv("DB_STICKY_SECONDS") or 5)
+STICKY_KEY = "db_primary_until"
+
+routed = Counter(
+    "missiondex_db_routed_total",
+    "Request connections by server (primary, replica, fallback when no replica was usable).",
+    label="target")
+METRICS.append(routed)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    # Bounded pool of MySQL connections. At most `size` physical connections
+    # exist at once; callers that find the pool exhausted wait up to
+    # `timeout` seconds for one to be released before PoolTimeout is raised.
+
+    def __init__(self, size, timeout, ping_interval, **connect_args):
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.connect_args = connect_args
+        self._idle = deque()  # (connection, released_at)
+        self._lock = threading.Condition()
+        self._open = 0
+        self._in_use = 0
+        self._counters = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "timeouts": 0,
+            "opened": 0,
+            "discarded": 0,
+        }
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.connect_args)
+        print(">>> Opened pooled database connection")
+        return conn
+
+    def _is_alive(self, conn, released_at):
+        # skip the round trip for connections that were in use moments ago
+        if time.monotonic() - released_at < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+        with self._lock:
+            self._open -= 1
+            self._counters["discarded"] += 1
+            self._lock.notify()
+
+    def acquire(self, timeout=None):
+        started = time.monotonic()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = started + timeout
+        waited = False
+        while True:
+            with self._lock:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"no connection available after {timeout}s"
+                        )
+                    waited = True
+                    self._lock.wait(remaining)
+
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                else:
+                    conn, released_at = None, None
+                    self._open += 1
+                self._in_use += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                        self._in_use -= 1
+                        self._lock.notify()
+                    raise
+                with self._lock:
+                    self._counters["opened"] += 1
+            elif not self._is_alive(conn, released_at):
+                with self._lock:
+                    self._in_use -= 1
+                self._discard(conn)
+                continue
+
+            wait_ms = (time.monotonic() - started) * 1000
+            with self._lock:
+                self._counters["checkouts"] += 1
+                if waited:
+                    self._counters["waits"] += 1
+                self._counters["wait_time_ms"] += wait_ms
+                self._counters["max_wait_ms"] = max(self._counters["max_wait_ms"], wait_ms)
+            return conn
+
+    def release(self, conn):
+        # never hand a half-finished transaction to the next request
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except mysql.connector.Error:
+            self.discard(conn)
+            return
+
+        with self._lock:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def discard(self, conn):
+        # for a checked-out connection that is known to be broken
+        with self._lock:
+            self._in_use -= 1
+        self._discard(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(
+                size=self.size,
+                open=self._open,
+                in_use=self._in_use,
+                idle=len(self._idle),
+            )
+        checkouts = stats["checkouts"] or 1
+        stats["avg_wait_ms"] = round(stats["wait_time_ms"] / checkouts, 3)
+        stats["wait_time_ms"] = round(stats["wait_time_ms"], 3)
+        stats["max_wait_ms"] = round(stats["max_wait_ms"], 3)
+        return stats
+
+
+class PooledConnection:
+    # Thin proxy handed to route code. close() gives the connection back to
+    # the pool instead of tearing down the socket, so the existing
+    # `conn.close()` calls in routes keep working unchanged.
+
+    def __init__(self, pool, conn, server="primary"):
+        self._pool = pool
+        self._conn = conn
+        self.server = server
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise mysql.connector.errors.OperationalError("connection already returned to pool")
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self.__getattr__("cursor")(*args, **kwargs))
+
+    def commit(self):
+        self.__getattr__("commit")()
+        if self.server == "primary" and has_request_context():
+            g.db_wrote = True
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+class ReplicaSet:
+    # Read replicas by name ("host:port"), each with its own pool, handed
+    # out round-robin. acquire() skips replicas marked down and returns None
+    # when no replica could give a connection.
+
+    def __init__(self, pools, retry, max_lag=None, check_interval=5):
+        self.pools = pools
+        self.retry = retry
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._names = list(pools)
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._down_until = dict.fromkeys(self._names, 0.0)
+        self._checked_at = dict.fromkeys(self._names)
+        self._problem = dict.fromkeys(self._names)
+
+    def healthy(self, prefer=None):
+        # usable replicas, starting with `prefer` or the one whose turn it is
+        start = next(self._turn) % len(self._names)
+        order = self._names[start:] + self._names[:start]
+        if prefer in self.pools:
+            order.remove(prefer)
+            order.insert(0, prefer)
+        now = time.monotonic()
+        return [name for name in order if self._down_until[name] <= now]
+
+    def mark_down(self, name, problem):
+        print(f">>> Replica {name} skipped for {self.retry:g}s: {problem}")
+        with self._lock:
+            self._down_until[name] = time.monotonic() + self.retry
+            self._problem[name] = problem
+
+    def lag_check_due(self, name):
+        # whether the next checkout of `name` runs SHOW REPLICA STATUS
+        checked_at = self._checked_at[name]
+        return self.max_lag is not None and (
+            checked_at is None or time.monotonic() - checked_at >= self.check_interval)
+
+    def checked(self, name):
+        self._checked_at[name] = time.monotonic()
+
+    def usable(self, name):
+        # a checkout of `name` worked: clear its last problem
+        with self._lock:
+            self._problem[name] = None
+
+    def _lag_problem(self, conn):
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute("SHOW REPLICA STATUS")
+            status = cur.fetchone()
+        finally:
+            cur.close()
+        return self.lag_problem(status)
+
+    def lag_problem(self, status):
+        # None while SHOW REPLICA STATUS says replicating within max_lag seconds
+        if status is None:
+            return "not a replica"
+        lag = status.get("Seconds_Behind_Source")
+        if lag is None:
+            return "replication stopped"
+        if lag > self.max_lag:
+            return f"{lag}s behind the primary"
+        return None
+
+    def _checkout(self, name):
+        pool = self.pools[name]
+        conn = pool.acquire()
+        if not self.lag_check_due(name):
+            return conn
+        try:
+            problem = self._lag_problem(conn)
+        except mysql.connector.Error:
+            pool.discard(conn)
+            raise
+        self.checked(name)
+        if problem:
+            pool.release(conn)
+            self.mark_down(name, problem)
+            return None
+        return conn
+
+    def acquire(self, prefer=None):
+        # (name, pool, connection), or None
+        for name in self.healthy(prefer):
+            try:
+                conn = self._checkout(name)
+            except PoolTimeout:
+                # busy, not broken: try the next one
+                continue
+            except mysql.connector.Error as err:
+                self.mark_down(name, f"error {err.errno}: {err.msg}")
+                continue
+            if conn is not None:
+                self.usable(name)
+                return name, self.pools[name], conn
+        return None
+
+    def close_all(self):
+        for pool in self.pools.values():
+            pool.close_all()
+
+    def stats(self):
+        now = time.monotonic()
+        return [dict(self.pools[name].stats(), name=name,
+                     healthy=self._down_until[name] <= now, problem=self._problem[name])
+                for name in self._names]
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_replicas = None
+_replicas_pid = None
+
+
+def _env_int(name, default):
+    return int(os.getenv(name) or default)
+
+
+def get_pool():
+    # pools must not be shared across fork(), so rebuild lazily per process
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(
+                    size=_env_int("DB_POOL_SIZE", 5),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT") or 10),
+                    ping_interval=float(os.getenv("DB_POOL_PING_INTERVAL") or 30),
+                    host=os.getenv("DB_HOST"),
+                    user=os.getenv("DB_USER"),
+                    password=os.getenv("DB_PASS"),
+                    database=os.getenv("DB_NAME"),
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _replica_hosts():
+    # DB_REPLICA_HOSTS=replica1,replica2:3307 -> [(name, host, port)]
+    hosts = []
+    for entry in (os.getenv("DB_REPLICA_HOSTS") or "").split(","):
+        entry = entry.strip()
+        if entry:
+            host, _, port = entry.partition(":")
+            port = int(port or 3306)
+            hosts.append((f"{host}:{port}", host, port))
+    return hosts
+
+
+def get_replicas():
+    # None when no replicas are configured; rebuilt per process like get_pool()
+    global _replicas, _replicas_pid
+    if _replicas_pid != os.getpid():
+        with _pool_lock:
+            if _replicas_pid != os.getpid():
+                pools = {
+                    name: ConnectionPool(
+                        size=_env_int("DB_REPLICA_POOL_SIZE", _env_int("DB_POOL_SIZE", 5)),
+                        # short: a busy replica is skipped for the next one
+                        timeout=float(os.getenv("DB_REPLICA_POOL_TIMEOUT") or 1),
+                        ping_interval=float(os.getenv("DB_POOL_PING_INTERVAL") or 30),
+                        host=host,
+                        port=port,
+                        user=os.getenv("DB_USER"),
+                        password=os.getenv("DB_PASS"),
+                        database=os.getenv("DB_NAME"),
+                    )
+                    for name, host, port in _replica_hosts()
+                }
+                max_lag = os.getenv("DB_REPLICA_MAX_LAG")
+                _replicas = ReplicaSet(
+                    pools,
+                    retry=float(os.getenv("DB_REPLICA_RETRY") or 30),
+                    max_lag=float(max_lag) if max_lag else None,
+                    check_interval=float(os.getenv("DB_REPLICA_CHECK_INTERVAL") or 5),
+                ) if pools else None
+                _replicas_pid = os.getpid()
+    return _replicas
+
+
+def read_pool():
+    # pool for a long read that manages its own connection (the export):
+    # the next replica not marked down, otherwise the primary's
+    replicas = get_replicas()
+    healthy = replicas.healthy() if replicas is not None else []
+    return replicas.pools[healthy[0]] if healthy else get_pool()
+
+
+def pool_stats():
+    # the primary's pool stats, plus one entry per replica when configured
+    stats = get_pool().stats()
+    replicas = get_replicas()
+    if replicas is not None:
+        stats["replicas"] = replicas.stats()
+    return stats
+
+
+def init_worker(warm=True):
+    # called in each pre-forked worker right after fork: build this process's
+    # own pool and, optionally, open its first connection before traffic arrives
+    pool = get_pool()
+    if warm:
+        try:
+            pool.release(pool.acquire())
+        except (mysql.connector.Error, PoolTimeout) as err:
+            print(f">>> Could not warm database pool in worker {os.getpid()}: {err}")
+    return pool
+
+
+def shutdown_pool():
+    # close this process's idle connections; used when a worker exits
+    global _pool, _replicas, _replicas_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.close_all()
+        _pool = None
+    if _replicas is not None and _replicas_pid == os.getpid():
+        _replicas.close_all()
+        _replicas, _replicas_pid = None, None
+
+
+def check_db(timeout=2):
+    # readiness check: can this process get a connection and run a query?
+    # Returns None when healthy, otherwise a short reason.
+    pool = get_pool()
+    try:
+        conn = pool.acquire(timeout=timeout)
+    except PoolTimeout:
+        return "pool exhausted"
+    except mysql.connector.Error as err:
+        return f"connect failed ({err.errno})"
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchall()
+        cur.close()
+    except mysql.connector.Error as err:
+        pool.discard(conn)
+        return f"query failed ({err.errno})"
+    pool.release(conn)
+    return None
+
+
+def _reads_from_primary():
+    # writes, CLI commands, and sessions that wrote in the last STICKY_SECONDS
+    if not has_request_context() or request.method not in READ_METHODS:
+        return True
+    return session.get(STICKY_KEY, 0) > time.time()
+
+
+def _checkout_primary():
+    pool = get_pool()
+    try:
+        conn = PooledConnection(pool, pool.acquire())
+    except PoolTimeout as err:
+        print(f">>> Database pool exhausted: {err}")
+        abort(503)
+    routed.inc("primary")
+    return conn
+
+
+def server(primary=False):
+    # the server get_db(primary) reads from: "primary", the replica's name, or
+    # None when a replica would be picked but none is checked out yet
+    conn = g.get("db_conns", {}).get("read")
+    if primary or get_replicas() is None or _reads_from_primary():
+        return "primary"
+    return conn.server if conn is not None and conn._conn is not None else None
+
+
+def get_db(primary=False):
+    # One connection per request, checked out on first use: a replica for
+    # reads when replicas are configured, otherwise the primary. Pass
+    # primary=True for reads whose result outlives the request in a
+    # process-wide cache, so a lagging replica never refills one with rows
+    # from before a write.
+    conns = g.setdefault("db_conns", {})
+    role = "primary" if server(primary) == "primary" else "read"
+    conn = conns.get(role)
+    if conn is not None and conn._conn is not None:
+        return conn
+
+    live_primary = conns.get("primary")
+    if live_primary is not None and live_primary._conn is None:
+        live_primary = None
+    conn = None
+    if role == "read":
+        # back to the same replica if the route closed its connection and
+        # asks again, so the whole request sees one server's data
+        picked = get_replicas().acquire(prefer=g.get("db_replica"))
+        if picked is not None:
+            name, pool, raw = picked
+            conn = PooledConnection(pool, raw, server=name)
+            g.db_replica = name
+            routed.inc("replica")
+        else:
+            routed.inc("fallback")
+    if conn is None:
+        # never hold two primary connections for one request
+        conn = live_primary if live_primary is not None else _checkout_primary()
+        conns["primary"] = conn
+    conns[role] = conn
+    return conn
+
+
+def release_db(exc=None):
+    for conn in g.pop("db_conns", {}).values():
+        conn.close()
+
+
+def _stick_after_write(response):
+    # pin the session to the primary while the replicas catch up; only
+    # requests that committed, not every POST (a failed login, a rejected form)
+    if g.pop("db_wrote", False) and get_replicas() is not None:
+        session[STICKY_KEY] = time.time() + STICKY_SECONDS
+    return response
+
+
+def init_app(app):
+    app.after_request(_stick_after_write)
+    app.teardown_appcontext(release_db)
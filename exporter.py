@@ -0,0 +1,215 @@
+import csv
+import io
+import os
+import zlib
+
+import orjson
+
+import instrumentation
+import jsonapi
+
+# Full mission catalogue export (/api/v1/export/missions, `flask
+# export-missions`): one row per mission with the names of its agencies,
+# spacecraft, crew, payloads and launch sites, as CSV, JSONL or Parquet.
+#
+# Rows come off an unbuffered cursor EXPORT_BATCH at a time and each batch
+# is encoded (and gzipped) before the next is read, so memory stays flat
+# however many missions there are. The related names are aggregated per
+# mission by MySQL in the same statement; no second query per row.
+
+EXPORT_BATCH = int(os.getenv("EXPORT_BATCH") or 1000)
+# a slow client stalls the server's send of an unbuffered result; give it
+# longer than the 60s default before MySQL drops the connection
+EXPORT_NET_WRITE_TIMEOUT = int(os.getenv("EXPORT_NET_WRITE_TIMEOUT") or 600)
+GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL") or 6)
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+COLUMNS = ["mission_id", "mission_name", "mission_type", "destination", "launch_date",
+           "duration", "status", "description", "created_at"]
+# related list column -> (junction table, entity table, entity id, name column)
+RELATED = {
+    "agencies": ("mission_agencies", "agencies", "agency_id", "name"),
+    "spacecraft": ("mission_spacecraft", "spacecraft", "spacecraft_id", "name"),
+    "crew": ("missioncrew", "astronauts", "astronaut_id", "full_name"),
+    "payloads": ("mission_payloads", "payloads", "payload_id", "name"),
+    "launchsites": ("mission_launchsites", "launchsites", "launchsite_id", "name"),
+}
+FIELDS = COLUMNS + list(RELATED)
+
+# joined in CSV cells
+LIST_SEPARATOR = "; "
+
+exported_rows = instrumentation.Counter(
+    "missiondex_export_rows_total", "Missions written by the export, by format.", label="format")
+instrumentation.METRICS.append(exported_rows)
+
+
+def _query():
+    related = ",\n".join(
+        f"(SELECT JSON_ARRAYAGG(e.{name}) FROM {junction} j "
+        f"JOIN {table} e ON e.{entity_id} = j.{entity_id} "
+        f"WHERE j.mission_id = m.mission_id) AS {column}"
+        for column, (junction, table, entity_id, name) in RELATED.items()
+    )
+    return (f"SELECT {', '.join(f'm.{c}' for c in COLUMNS)},\n{related}\n"
+            f"FROM missions m ORDER BY m.mission_id")
+
+
+EXPORT_QUERY = _query()
+
+
+def _batches(cur, batch_size):
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            for column in RELATED:
+                # JSON_ARRAYAGG gives NULL, not [], for a mission with no links
+                row[column] = orjson.loads(row[column]) if row[column] else []
+        yield rows
+
+
+# encoders: batches of row dicts in, bytes out
+
+def _cell(names):
+    # agency and spacecraft names are nullable; a NULL name is left out
+    return LIST_SEPARATOR.join(str(name) for name in names or () if name is not None)
+
+
+def _csv(batches):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(FIELDS)
+    for rows in batches:
+        for row in rows:
+            writer.writerow([_cell(row[f]) if f in RELATED else row[f] for f in FIELDS])
+        yield out.getvalue().encode("utf-8")
+        out.seek(0)
+        out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
+def _jsonl(batches):
+    for rows in batches:
+        yield b"".join(jsonapi.dumps(row) + b"\n" for row in rows)
+
+
+class _Sink:
+    # write-only file for pyarrow that hands back what was written since the
+    # last drain(); tell() keeps counting, the Parquet footer needs offsets
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet(batches):
+    # optional dependency, only needed for this format
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [("mission_id", pa.int32()), ("mission_name", pa.string()), ("mission_type", pa.string()),
+         ("destination", pa.string()), ("launch_date", pa.date32()), ("duration", pa.int32()),
+         ("status", pa.string()), ("description", pa.string()), ("created_at", pa.timestamp("s"))]
+        + [(column, pa.list_(pa.string())) for column in RELATED]
+    )
+    sink = _Sink()
+    # one row group per batch; Parquet compresses each column chunk itself
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in batches:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": _csv, "jsonl": _jsonl, "parquet": _parquet}
+
+
+def _gzip(chunks):
+    # one gzip member over the whole stream, emitted as it fills
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def filename(fmt, gzip=False):
+    return f"missions.{fmt}" + (".gz" if gzip else "")
+
+
+def export_missions(pool, fmt, gzip=False, batch_size=EXPORT_BATCH):
+    # Returns an iterator of bytes. The connection is checked out and the
+    # query started before this returns, so a full pool or a failing query
+    # is raised here rather than after the response has begun.
+    if fmt not in ENCODERS:
+        raise ValueError(f"unknown export format {fmt!r}")
+    if gzip and fmt == "parquet":
+        raise ValueError("parquet files are already compressed; gzip applies to csv and jsonl")
+    chunks = _export(pool, pool.acquire(), fmt, gzip, batch_size)
+    next(chunks)
+    return chunks
+
+
+def _counted(batches, fmt):
+    for rows in batches:
+        exported_rows.inc(fmt, len(rows))
+        yield rows
+
+
+def _export(pool, conn, fmt, gzip, batch_size):
+    finished = False
+    try:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("SET SESSION net_write_timeout = %s", (EXPORT_NET_WRITE_TIMEOUT,))
+        # unbuffered: rows are read off the socket as fetchmany() asks for them
+        cur.execute(EXPORT_QUERY)
+        yield b""
+        chunks = ENCODERS[fmt](_counted(_batches(cur, batch_size), fmt))
+        yield from _gzip(chunks) if gzip else chunks
+        cur.execute("SET SESSION net_write_timeout = DEFAULT")
+        cur.close()
+        finished = True
+    finally:
+        if finished:
+            pool.release(conn)
+        else:
+            # failed or abandoned mid-result (client went away): the rest of
+            # the result is still on the wire, so the connection can't be reused
+            print(">>> Mission export stopped before the end; dropping its connection")
+            pool.discard(conn)
@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from jinja2.runtime import Undefined
+
+from cache import LRUCache
+
+# Rendered-template reuse, at two levels.
+#
+# Fragments: {% fragment "mission-card", m.mission_id, version %} ...
+# {% endfragment %} renders its body once per distinct key and then serves
+# the stored HTML. The key is the fragment name plus whatever the body
+# depends on: an entity id and the data version it was loaded at (the
+# table_versions counters read before the query, or a snapshot's
+# generation), so a write moves the key and the next request re-renders.
+# A key part that is None or undefined (no table_versions yet, a caller
+# that passes no version) renders without caching, as does any template
+# environment that auto-reloads templates (debug mode). Cached bodies must
+# not depend on the user: per-user bits (bookmark buttons, admin links)
+# stay outside the tag.
+#
+# Bytecode: compiled templates are stored in JINJA_CACHE_DIR and shared by
+# every process on the host, so a freshly forked or recycled worker loads
+# them instead of parsing and compiling the sources; precompile() fills
+# the cache and the master's template cache before the workers fork.
+
+CACHE_DIR = os.getenv("JINJA_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "missiondex-jinja")
+
+fragment_cache = LRUCache(
+    maxsize=int(os.getenv("FRAGMENT_CACHE_SIZE") or 5000),
+    ttl=float(os.getenv("FRAGMENT_CACHE_TTL") or 300)
+)
+
+
+class FragmentCache(Extension):
+    tags = {"fragment"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endfragment",), drop_needle=True)
+        call = self.call_method("_render", [nodes.List(key)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        if self.environment.auto_reload or any(part is None or isinstance(part, Undefined) for part in key):
+            return caller()
+        key = tuple(key)
+        html = fragment_cache.get(key)
+        if html is None:
+            html = caller()
+            fragment_cache.set(key, html)
+        return html
+
+
+def precompile(app):
+    # load every template once: compiles into the bytecode cache (or reads
+    # it from there) and leaves the templates in this process's cache
+    env = app.jinja_env
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def init_app(app):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(CACHE_DIR)
+    app.jinja_env.add_extension(FragmentCache)
@@ -0,0 +1,52 @@
+# Production server: `gunicorn -c gunicorn.conf.py app:app`
+#
+# Pre-forked workers, each running a few threads. The app is imported once
+# in the master (preload_app) and shared copy-on-write with the workers;
+# every worker then builds its own MySQL pool after the fork, since
+# sockets must never be shared between processes.
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND") or f"0.0.0.0:{os.getenv('PORT') or 5000}"
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count() * 2 + 1)
+worker_class = "gthread"
+# keep at or below DB_POOL_SIZE, or threads will queue for connections
+threads = int(os.getenv("GUNICORN_THREADS") or 4)
+
+# with preloading every worker also shares the same app.secret_key, even
+# when it falls back to a random one, so sessions survive worker recycling
+preload_app = True
+
+# recycle each worker after this many requests (plus jitter, so they do not
+# all restart at once) to bound memory growth from caches and fragmentation
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS") or 1000)
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER") or 100)
+
+# on SIGTERM workers stop accepting and get this long to finish in-flight
+# requests before they are killed
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT") or 30)
+timeout = int(os.getenv("GUNICORN_TIMEOUT") or 60)
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    # runs in the master after the preloaded app is imported and before the
+    # first fork: compile every template here (or read it from the bytecode
+    # cache) so workers inherit them ready to render
+    import app
+    import fragments
+    server.log.info("%d templates precompiled", fragments.precompile(app.app))
+
+
+def post_fork(server, worker):
+    import db
+    db.init_worker(warm=os.getenv("DB_POOL_WARM", "1") == "1")
+    server.log.info("worker %s: database pool ready", worker.pid)
+
+
+def worker_exit(server, worker):
+    import db
+    db.shutdown_pool()
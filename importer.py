@@ -0,0 +1,428 @@
+import csv
+import io
+import json
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import mysql.connector
+
+import careers
+import rollups
+import versions
+
+
+class RowError(Exception):
+    pass
+
+
+def _text(value):
+    return str(value).strip()
+
+
+def _int(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise RowError(f"not an integer: {value!r}")
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value).strip())
+    except InvalidOperation:
+        raise RowError(f"not a number: {value!r}")
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RowError(f"not a YYYY-MM-DD date: {value!r}")
+
+
+def _bool(value):
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "y", "active"):
+        return True
+    if text in ("0", "false", "no", "n", "inactive"):
+        return False
+    raise RowError(f"not a boolean: {value!r}")
+
+
+# kind -> (table, [(column, converter, required), ...])
+ENTITIES = {
+    "missions": ("missions", [
+        ("mission_name", _text, True),
+        ("mission_type", _text, False),
+        ("destination", _text, False),
+        ("launch_date", _date, False),
+        ("duration", _int, False),
+        ("status", _text, False),
+        ("description", _text, False),
+    ]),
+    "astronauts": ("astronauts", [
+        ("full_name", _text, True),
+        ("rank", _text, False),
+        ("nationality", _text, False),
+        ("speciality", _text, False),
+        ("total_flight_hr", _int, False),
+        ("active_status", _bool, False),
+    ]),
+    "agencies": ("agencies", [
+        ("name", _text, True),
+        ("country", _text, False),
+        ("founded_year", _int, False),
+        ("headquarters", _text, False),
+        ("type", _text, False),
+    ]),
+    "spacecraft": ("spacecraft", [
+        ("name", _text, True),
+        ("type", _text, False),
+        ("manufacturer", _text, False),
+        ("first_flight", _date, False),
+        ("capacity", _int, False),
+    ]),
+    "payloads": ("payloads", [
+        ("name", _text, True),
+        ("type", _text, False),
+        ("weight_kg", _decimal, False),
+        ("manufacturer", _text, False),
+        ("description", _text, False),
+    ]),
+    "events": ("events", [
+        ("name", _text, True),
+        ("category", _text, False),
+        ("date", _date, False),
+        ("location", _text, False),
+        ("description", _text, False),
+    ]),
+    "launchsites": ("launchsites", [
+        ("name", _text, True),
+        ("country", _text, False),
+        ("latitude", _decimal, False),
+        ("longitude", _decimal, False),
+        ("established_year", _int, False),
+        ("status", _text, False),
+        ("description", _text, False),
+    ]),
+}
+
+# referenced entity -> (table, id column, name column)
+REFERENCES = {
+    "mission": ("missions", "mission_id", "mission_name"),
+    "astronaut": ("astronauts", "astronaut_id", "full_name"),
+    "agency": ("agencies", "agency_id", "name"),
+    "spacecraft": ("spacecraft", "spacecraft_id", "name"),
+    "payload": ("payloads", "payload_id", "name"),
+    "event": ("events", "event_id", "name"),
+    "launchsite": ("launchsites", "launchsite_id", "name"),
+}
+
+# kind -> (junction table, referenced entity, extra columns)
+LINKS = {
+    "crew": ("missioncrew", "astronaut", [("role", _text, False)]),
+    "mission_agencies": ("mission_agencies", "agency", []),
+    "mission_spacecraft": ("mission_spacecraft", "spacecraft", []),
+    "mission_payloads": ("mission_payloads", "payload", []),
+    "mission_events": ("mission_events", "event", []),
+    "mission_launchsites": ("mission_launchsites", "launchsite", []),
+}
+
+KINDS = list(ENTITIES) + list(LINKS)
+MAX_REPORTED_ERRORS = 200
+
+
+class ImportReport:
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []  # (line, message), capped at MAX_REPORTED_ERRORS
+        self.chunks = 0
+        # why the file could not be read to the end, e.g. it is not UTF-8
+        self.stopped = None
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.kind}: {self.rows} rows read, {self.inserted} inserted, "
+                f"{self.skipped} already present, {self.error_count} errors "
+                f"in {self.elapsed:.2f}s ({self.rows_per_sec:.0f} rows/s, {self.chunks} chunks)")
+
+
+def detect_format(filename):
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def read_rows(stream, fmt):
+    # yields (line number, dict) one row at a time; never reads ahead
+    if fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as err:
+                yield line_no, RowError(f"invalid JSON: {err}")
+                continue
+            if not isinstance(row, dict):
+                yield line_no, RowError("expected a JSON object")
+                continue
+            yield line_no, row
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def _convert(row, columns):
+    values = []
+    for column, converter, required in columns:
+        raw = row.get(column)
+        if raw is None or str(raw).strip() == "":
+            if required:
+                raise RowError(f"missing {column}")
+            values.append(None)
+        else:
+            values.append(converter(raw))
+    return values
+
+
+def _chunks(rows, size):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _lookup(cur, ref, ids, names):
+    # (ids that exist, name -> id, ambiguous names) for one chunk, in one
+    # query; names that match several rows are ambiguous
+    table, id_col, name_col = REFERENCES[ref]
+    where, params = [], []
+    if ids:
+        where.append(f"{id_col} IN ({','.join(['%s'] * len(ids))})")
+        params.extend(ids)
+    if names:
+        where.append(f"{name_col} IN ({','.join(['%s'] * len(names))})")
+        params.extend(names)
+    if not where:
+        return set(), {}, set()
+    cur.execute(f"SELECT {id_col}, {name_col} FROM {table} WHERE {' OR '.join(where)}", tuple(params))
+    known, by_name, ambiguous = set(), {}, set()
+    for row_id, name in cur.fetchall():
+        known.add(row_id)
+        if name not in names:
+            continue
+        if name in by_name:
+            ambiguous.add(name)
+        by_name[name] = row_id
+    return known, by_name, ambiguous
+
+
+def _reference(row, ref):
+    # a row may name the entity by id ("agency_id") or by name ("agency")
+    _, id_col, _ = REFERENCES[ref]
+    if str(row.get(id_col) or "").strip():
+        return _int(row[id_col]), None
+    name = str(row.get(ref) or "").strip()
+    if not name:
+        raise RowError(f"missing {ref} or {id_col}")
+    return None, name
+
+
+def _write(conn, cur, table, sql, params, changed):
+    # one transaction; None once committed, else the error it rolled back on
+    try:
+        cur.executemany(sql, params)
+        if changed:
+            changed(cur, params)
+        versions.bump(cur, table)
+        conn.commit()
+    except mysql.connector.Error as err:
+        conn.rollback()
+        return err
+    return None
+
+
+def _write_chunk(conn, cur, report, lines, table, sql, params, changed=None):
+    # `changed(cur, params)` updates whatever is derived from the rows (the
+    # monthly rollups, the career summaries) inside the same transaction.
+    # A chunk the database rejects is retried row by row, so the rest of
+    # it still goes in and each error is reported against its own line.
+    err = _write(conn, cur, table, sql, params, changed)
+    if err is None:
+        report.inserted += len(params)
+        return
+    if len(params) == 1:
+        report.error(lines[0], str(err))
+        return
+    for line, values in zip(lines, params):
+        err = _write(conn, cur, table, sql, [values], changed)
+        if err is None:
+            report.inserted += 1
+        else:
+            report.error(line, str(err))
+
+
+def _import_entities(conn, cur, kind, rows, chunk_size, report):
+    table, columns = ENTITIES[kind]
+    names = ", ".join(column for column, _, _ in columns)
+    placeholders = ", ".join(["%s"] * len(columns))
+    # executemany() folds this into one multi-row INSERT per chunk
+    sql = f"INSERT INTO {table} ({names}) VALUES ({placeholders})"
+
+    for chunk in _chunks(rows, chunk_size):
+        report.chunks += 1
+        lines, params = [], []
+        for line_no, row in chunk:
+            report.rows += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                params.append(_convert(row, columns))
+                lines.append(line_no)
+            except RowError as err:
+                report.error(line_no, str(err))
+        if not params:
+            continue
+        changed = None
+        if kind == "missions":
+            # new missions have no links yet: only their months' totals move
+            launch = names.split(", ").index("launch_date")
+            changed = lambda cur, params: rollups.months_changed(
+                cur, [values[launch] for values in params])
+        _write_chunk(conn, cur, report, lines, table, sql, params, changed)
+
+
+def _import_links(conn, cur, kind, rows, chunk_size, report):
+    table, ref, extra = LINKS[kind]
+    _, ref_id_col, _ = REFERENCES[ref]
+    extra_names = [column for column, _, _ in extra]
+    columns = ["mission_id", ref_id_col] + extra_names
+    sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+
+    for chunk in _chunks(rows, chunk_size):
+        report.chunks += 1
+        parsed = []
+        for line_no, row in chunk:
+            report.rows += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                parsed.append((line_no, _reference(row, "mission"),
+                               _reference(row, ref), _convert(row, extra)))
+            except RowError as err:
+                report.error(line_no, str(err))
+
+        # check every id and resolve every name in the chunk with one query
+        # per entity type
+        known_missions, mission_ids, mission_dupes = _lookup(
+            cur, "mission", {m[0] for _, m, _, _ in parsed if m[1] is None},
+            {m[1] for _, m, _, _ in parsed if m[1]})
+        known_refs, ref_ids, ref_dupes = _lookup(
+            cur, ref, {r[0] for _, _, r, _ in parsed if r[1] is None},
+            {r[1] for _, _, r, _ in parsed if r[1]})
+
+        links = []
+        for line_no, (mission_id, mission_name), (ref_id, ref_name), values in parsed:
+            if mission_name is None and mission_id not in known_missions:
+                report.error(line_no, f"unknown mission_id: {mission_id}")
+                continue
+            if ref_name is None and ref_id not in known_refs:
+                report.error(line_no, f"unknown {ref_id_col}: {ref_id}")
+                continue
+            if mission_name is not None:
+                if mission_name in mission_dupes:
+                    report.error(line_no, f"mission name is ambiguous: {mission_name!r}")
+                    continue
+                mission_id = mission_ids.get(mission_name)
+                if mission_id is None:
+                    report.error(line_no, f"unknown mission: {mission_name!r}")
+                    continue
+            if ref_name is not None:
+                if ref_name in ref_dupes:
+                    report.error(line_no, f"{ref} name is ambiguous: {ref_name!r}")
+                    continue
+                ref_id = ref_ids.get(ref_name)
+                if ref_id is None:
+                    report.error(line_no, f"unknown {ref}: {ref_name!r}")
+                    continue
+            links.append((line_no, mission_id, ref_id, values))
+        if not links:
+            continue
+
+        # drop pairs that already exist, in the database or earlier in the chunk
+        pair_mission_ids = sorted({mission_id for _, mission_id, _, _ in links})
+        cur.execute(
+            f"SELECT mission_id, {ref_id_col} FROM {table} "
+            f"WHERE mission_id IN ({','.join(['%s'] * len(pair_mission_ids))})",
+            tuple(pair_mission_ids)
+        )
+        existing = set(cur.fetchall())
+        lines, params = [], []
+        for line_no, mission_id, ref_id, values in links:
+            if (mission_id, ref_id) in existing:
+                report.skipped += 1
+                continue
+            existing.add((mission_id, ref_id))
+            lines.append(line_no)
+            params.append([mission_id, ref_id] + values)
+        if params:
+
+            def changed(cur, params):
+                pairs = [(values[0], values[1]) for values in params]
+                rollups.links_changed(cur, ref, pairs)
+                careers.links_changed(cur, ref, pairs)
+
+            _write_chunk(conn, cur, report, lines, table, sql, params, changed)
+
+
+def import_stream(conn, kind, stream, fmt="csv", chunk_size=500):
+    # Streams `stream` (a text file object) into the database in chunks of
+    # `chunk_size` rows, one transaction per chunk. Bad rows are reported
+    # and skipped; they never abort the rest of the import.
+    if kind not in KINDS:
+        raise ValueError(f"unknown import kind {kind!r}; expected one of {', '.join(KINDS)}")
+    report = ImportReport(kind)
+    rows = read_rows(stream, fmt)
+    cur = conn.cursor()
+    try:
+        if kind in ENTITIES:
+            _import_entities(conn, cur, kind, rows, chunk_size, report)
+        else:
+            _import_links(conn, cur, kind, rows, chunk_size, report)
+    except UnicodeDecodeError:
+        # the chunks before the bad bytes are already committed
+        report.stopped = (f"the file is not valid UTF-8; stopped reading it after "
+                          f"{report.rows} rows ({report.inserted} inserted)")
+    finally:
+        cur.close()
+        report.elapsed = time.monotonic() - report.started
+    return report
+
+
+def text_stream(binary):
+    # uploaded files arrive as bytes; decode lazily rather than read() them
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request, template_rendered, before_render_template
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS") or 200)
+
+slow_query_log = logging.getLogger("missiondex.slow_query")
+if os.getenv("SLOW_QUERY_LOG"):
+    _handler = logging.FileHandler(os.getenv("SLOW_QUERY_LOG"), encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    slow_query_log.addHandler(_handler)
+    slow_query_log.setLevel(logging.WARNING)
+    slow_query_log.propagate = False
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    # Prometheus-style cumulative histogram with a single label (`route`
+    # unless another name is given).
+
+    def __init__(self, name, help_text, buckets, label="route"):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = sorted(buckets)
+        self._series = {}  # route -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, route, value):
+        with self._lock:
+            series = self._series.get(route)
+            if series is None:
+                series = self._series[route] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((route, list(series)) for route, series in self._series.items())
+        for route, series in items:
+            label = f'{self.label}="{_escape(route)}"'
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, help_text, label="route"):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, route, amount=1):
+        with self._lock:
+            self._values[route] = self._values.get(route, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for route, value in items:
+            lines.append(f'{self.name}{{{self.label}="{_escape(route)}"}} {value}')
+        return lines
+
+
+SECONDS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+request_duration = Histogram(
+    "missiondex_request_duration_seconds", "Wall time per request.", SECONDS)
+db_time = Histogram(
+    "missiondex_db_time_seconds", "Time spent in cursor execute/fetch per request.", SECONDS)
+db_queries = Histogram(
+    "missiondex_db_queries_per_request", "Statements executed per request.",
+    [0, 1, 2, 3, 5, 10, 20, 50, 100])
+db_rows = Histogram(
+    "missiondex_db_rows_per_request", "Rows fetched per request.",
+    [0, 1, 10, 50, 100, 500, 1000, 5000, 10000])
+render_time = Histogram(
+    "missiondex_template_render_seconds", "Jinja render time per request.", SECONDS)
+slow_queries = Counter(
+    "missiondex_slow_queries_total", f"Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms).")
+
+METRICS = [request_duration, db_time, db_queries, db_rows, render_time, slow_queries]
+
+
+def current_route():
+    if not has_request_context():
+        return "cli"
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _request_stats():
+    stats = g.get("db_stats")
+    if stats is None:
+        stats = g.db_stats = {"queries": 0, "db_time": 0.0, "rows": 0, "render_time": 0.0}
+    return stats
+
+
+def _log_slow(sql, elapsed):
+    route = current_route()
+    slow_queries.inc(route)
+    slow_query_log.warning(json.dumps({
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "route": route,
+        "method": request.method if has_request_context() else None,
+        "duration_ms": round(elapsed * 1000, 3),
+        # parameters are left out on purpose: they can carry user data
+        "sql": " ".join(str(sql).split()),
+    }))
+
+
+class InstrumentedCursor:
+    # Wraps a mysql.connector cursor, timing every statement and counting
+    # the rows fetched into the current request's stats.
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _timed(self, sql, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            stats = _request_stats()
+            stats["db_time"] += elapsed
+            if sql is not None:
+                stats["queries"] += 1
+                if elapsed * 1000 >= SLOW_QUERY_MS:
+                    _log_slow(sql, elapsed)
+
+    def execute(self, sql, params=(), *args, **kwargs):
+        return self._timed(sql, self._cursor.execute, sql, params, *args, **kwargs)
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        return self._timed(sql, self._cursor.executemany, sql, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._timed(None, self._cursor.fetchone)
+        if row is not None:
+            _request_stats()["rows"] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._timed(None, self._cursor.fetchmany, *args, **kwargs)
+        _request_stats()["rows"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(None, self._cursor.fetchall)
+        _request_stats()["rows"] += len(rows)
+        return rows
+
+
+def _before_render(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    started = g.pop("render_started", None)
+    if started is not None:
+        _request_stats()["render_time"] += time.perf_counter() - started
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    route = current_route()
+    stats = _request_stats()
+    request_duration.observe(route, time.perf_counter() - started)
+    db_time.observe(route, stats["db_time"])
+    db_queries.observe(route, stats["queries"])
+    db_rows.observe(route, stats["rows"])
+    render_time.observe(route, stats["render_time"])
+    response.headers["Server-Timing"] = (
+        f"db;dur={stats['db_time'] * 1000:.1f};desc=\"{stats['queries']} queries\", "
+        f"render;dur={stats['render_time'] * 1000:.1f}"
+    )
+    return response
+
+
+def render_metrics(extra_gauges=(), extra_counters=()):
+    # extras are (name, help, value) read from elsewhere (pools, caches);
+    # counter names end in _total, like the Counter metrics above
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for kind, extras in (("gauge", extra_gauges), ("counter", extra_counters)):
+        for name, help_text, value in extras:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
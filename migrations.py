@@ -0,0 +1,148 @@
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database", "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.(up|down)\.sql$")
+LOCK_NAME = "missiondex_schema_migrations"
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+
+    def __init__(self, version, name):
+        self.version = version
+        self.name = name
+        self.up_path = None
+        self.down_path = None
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def discover(directory=MIGRATIONS_DIR):
+    # 0003_route_indexes.up.sql / 0003_route_indexes.down.sql -> Migration(3)
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        migration = migrations.setdefault(version, Migration(version, name))
+        if migration.name != name:
+            raise MigrationError(f"version {version} is used by both {migration.name} and {name}")
+        setattr(migration, f"{direction}_path", os.path.join(directory, filename))
+    for migration in migrations.values():
+        if migration.up_path is None:
+            raise MigrationError(f"{migration} has no .up.sql script")
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def split_statements(sql):
+    # scripts are plain DDL/DML: drop comment lines, split on trailing ';'
+    lines = [line for line in sql.splitlines() if not line.lstrip().startswith("--")]
+    statements = re.split(r";\s*(?:\n|$)", "\n".join(lines))
+    return [s.strip() for s in statements if s.strip()]
+
+
+def _run_script(cur, path):
+    with open(path, encoding="utf-8") as script:
+        for statement in split_statements(script.read()):
+            cur.execute(statement)
+
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version int NOT NULL,
+          name varchar(255) NOT NULL,
+          applied_at timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (version)
+        )
+    """)
+
+
+def applied_versions(conn):
+    cur = conn.cursor()
+    _ensure_table(cur)
+    cur.execute("SELECT version FROM schema_migrations ORDER BY version")
+    versions = [row[0] for row in cur.fetchall()]
+    cur.close()
+    return versions
+
+
+class _Lock:
+    # MySQL named lock, so two deploys cannot migrate the same schema at once
+
+    def __init__(self, conn, timeout=30):
+        self.cur = conn.cursor()
+        self.timeout = timeout
+
+    def __enter__(self):
+        self.cur.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, self.timeout))
+        if self.cur.fetchone()[0] != 1:
+            raise MigrationError("another migration run holds the lock")
+        return self
+
+    def __exit__(self, *exc):
+        self.cur.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        self.cur.fetchone()
+        self.cur.close()
+
+
+def upgrade(conn, target=None, directory=MIGRATIONS_DIR):
+    # Applies every pending migration up to `target` (default: latest).
+    # MySQL commits DDL implicitly, so each migration is recorded right
+    # after its script finishes; a failure leaves earlier ones applied.
+    migrations = discover(directory)
+    done = []
+    with _Lock(conn):
+        applied = set(applied_versions(conn))
+        cur = conn.cursor()
+        for migration in migrations:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+            print(f">>> Applying {migration}")
+            try:
+                _run_script(cur, migration.up_path)
+            except Exception as err:
+                conn.rollback()
+                raise MigrationError(f"{migration} failed: {err}") from err
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (migration.version, migration.name))
+            conn.commit()
+            done.append(migration)
+        cur.close()
+    return done
+
+
+def downgrade(conn, target, directory=MIGRATIONS_DIR):
+    # Reverts applied migrations newer than `target`, newest first.
+    migrations = {m.version: m for m in discover(directory)}
+    done = []
+    with _Lock(conn):
+        cur = conn.cursor()
+        for version in reversed(applied_versions(conn)):
+            if version <= target:
+                break
+            migration = migrations.get(version)
+            if migration is None or migration.down_path is None:
+                raise MigrationError(f"version {version} cannot be reverted: no .down.sql script")
+            print(f">>> Reverting {migration}")
+            try:
+                _run_script(cur, migration.down_path)
+            except Exception as err:
+                conn.rollback()
+                raise MigrationError(f"{migration} revert failed: {err}") from err
+            cur.execute("DELETE FROM schema_migrations WHERE version = %s", (version,))
+            conn.commit()
+            done.append(migration)
+        cur.close()
+    return done
+
+
+def status(conn, directory=MIGRATIONS_DIR):
+    applied = set(applied_versions(conn))
+    return [(migration, migration.version in applied) for migration in discover(directory)]
@@ -0,0 +1,118 @@
+import base64
+import json
+import os
+
+from flask import request, url_for
+
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE") or 24)
+MAX_PAGE_SIZE = 100
+
+
+class Page:
+
+    def __init__(self, items, next_cursor, prev_cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+
+    def _url(self, **cursor):
+        # keep the current filters (type/status/destination on /missions)
+        args = request.args.to_dict()
+        args.pop("after", None)
+        args.pop("before", None)
+        args.update(cursor)
+        return url_for(request.endpoint, **request.view_args, **args)
+
+    @property
+    def next_url(self):
+        return self._url(after=self.next_cursor) if self.next_cursor else None
+
+    @property
+    def prev_url(self):
+        return self._url(before=self.prev_cursor) if self.prev_cursor else None
+
+
+def encode_cursor(row, sort_col, id_col):
+    raw = json.dumps([row[sort_col], row[id_col]], default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    # (value, row_id), or None for anything that is not a cursor we made;
+    # the value goes into the seek clause, so only scalars get through
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        value, row_id = json.loads(raw)
+        if value is not None and not isinstance(value, (str, int, float)):
+            return None
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _seek_clause(sort_col, id_col, desc, value, row_id):
+    # "comes after (value, row_id)" in ORDER BY sort_col, id_col.
+    # MySQL sorts NULL lowest: first in ASC order, last in DESC order.
+    if desc:
+        if value is None:
+            return f"({sort_col} IS NULL AND {id_col} < %s)", [row_id]
+        return (f"({sort_col} < %s OR {sort_col} IS NULL"
+                f" OR ({sort_col} = %s AND {id_col} < %s))"), [value, value, row_id]
+    if value is None:
+        return f"({sort_col} IS NOT NULL OR {id_col} > %s)", [row_id]
+    return f"({sort_col} > %s OR ({sort_col} = %s AND {id_col} > %s))", [value, value, row_id]
+
+
+def page_size():
+    try:
+        size = int(request.args.get("per_page", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        size = DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def paginate(cur, select, where, params, sort_col, id_col, desc=False):
+    # Keyset pagination: rather than OFFSET, each page seeks past the last
+    # row of the previous one, so deep pages cost the same as the first.
+    # `select` is the query up to (not including) WHERE and `where` a list
+    # of extra conditions. sort_col/id_col are the result column names;
+    # qualify them in the query if they would otherwise be ambiguous.
+    per_page = page_size()
+    after = decode_cursor(request.args["after"]) if request.args.get("after") else None
+    before = decode_cursor(request.args["before"]) if request.args.get("before") else None
+
+    where = list(where)
+    params = list(params)
+    backwards = before is not None and after is None
+    cursor = before if backwards else after
+    scan_desc = desc != backwards
+    if cursor is not None:
+        clause, clause_params = _seek_clause(sort_col, id_col, scan_desc, *cursor)
+        where.append(clause)
+        params.extend(clause_params)
+
+    query = select
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    direction = "DESC" if scan_desc else "ASC"
+    query += f" ORDER BY {sort_col} {direction}, {id_col} {direction} LIMIT %s"
+    params.append(per_page + 1)
+
+    cur.execute(query, tuple(params))
+    rows = cur.fetchall()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        sort_key, id_key = sort_col.split(".")[-1], id_col.split(".")[-1]
+        if has_more or backwards:
+            next_cursor = encode_cursor(last, sort_key, id_key)
+        if (has_more and backwards) or (not backwards and cursor is not None):
+            prev_cursor = encode_cursor(first, sort_key, id_key)
+
+    return Page(rows, next_cursor, prev_cursor, per_page)
@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import instrumentation
+
+# Password hashing is deliberately slow (scrypt by default), so it runs on a
+# small per-process thread pool instead of the request thread: hashlib
+# releases the GIL while hashing, and the pool size caps how many cores a
+# burst of logins can take from every other route. At most QUEUE requests
+# wait behind the running ones; beyond that the caller gets HashBusy (503)
+# at once instead of piling up.
+#
+# Failed logins are also limited per username and per client IP with an
+# in-memory sliding window, checked before any hashing happens.
+
+HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD") or "scrypt:32768:8:1"
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or 2)
+HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE") or 16)
+HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT") or 10)
+
+LOGIN_WINDOW = float(os.getenv("LOGIN_WINDOW") or 300)
+LOGIN_MAX_FAILURES_PER_USER = int(os.getenv("LOGIN_MAX_FAILURES_PER_USER") or 5)
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP") or 20)
+
+hash_duration = instrumentation.Histogram(
+    "missiondex_password_hash_seconds", "Time spent hashing a password.",
+    [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5], label="op")
+hash_queue_wait = instrumentation.Histogram(
+    "missiondex_password_hash_queue_seconds", "Time a hash waited for a free hashing thread.",
+    [0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5], label="op")
+hash_rejected = instrumentation.Counter(
+    "missiondex_password_hash_rejected_total", "Hashes refused because the queue was full or timed out.",
+    label="op")
+login_throttled = instrumentation.Counter(
+    "missiondex_login_throttled_total", "Login attempts refused by the failure limits.",
+    label="scope")
+instrumentation.METRICS.extend([hash_duration, hash_queue_wait, hash_rejected, login_throttled])
+
+
+class HashBusy(Exception):
+    pass
+
+
+class HashExecutor:
+
+    def __init__(self, workers, queue_limit, timeout):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _pool(self):
+        # threads do not survive fork(); build the pool in each worker
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="pwhash")
+                    self._pid = os.getpid()
+                    self._in_flight = 0
+        return self._executor
+
+    def _done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def run(self, op, fn, *args):
+        pool = self._pool()
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                hash_rejected.inc(op)
+                raise HashBusy(f"{self._in_flight} password hashes already in progress")
+            self._in_flight += 1
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            hash_queue_wait.observe(op, started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                hash_duration.observe(op, time.perf_counter() - started)
+
+        future = pool.submit(job)
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # the hash still finishes in the background and frees its slot
+            hash_rejected.inc(op)
+            raise HashBusy(f"password hash took longer than {self.timeout}s")
+
+    def queue_depth(self):
+        with self._lock:
+            return max(0, self._in_flight - self.workers)
+
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+
+class SlidingWindow:
+    # At most `limit` events per key within the last `window` seconds. Keeps
+    # one deque of timestamps per key and forgets the least recently used
+    # keys beyond max_keys, so a spray of usernames cannot grow it forever.
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        hits = self._hits.get(key)
+        if hits is None:
+            return None
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+            return None
+        return hits
+
+    def retry_after(self, key):
+        # seconds until `key` may try again; 0 when it is under the limit
+        now = time.monotonic()
+        with self._lock:
+            hits = self._recent(key, now)
+            if hits is None or len(hits) < self.limit:
+                return 0
+            return max(1, int(hits[-self.limit] + self.window - now) + 1)
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            hits = self._recent(key, now)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            hits.append(now)
+            self._hits.move_to_end(key)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+hasher = HashExecutor(HASH_WORKERS, HASH_QUEUE, HASH_TIMEOUT)
+user_failures = SlidingWindow(LOGIN_MAX_FAILURES_PER_USER, LOGIN_WINDOW)
+ip_failures = SlidingWindow(LOGIN_MAX_FAILURES_PER_IP, LOGIN_WINDOW)
+
+
+def generate(password):
+    return hasher.run("generate", generate_password_hash, password, HASH_METHOD)
+
+
+def check(password_hash, password):
+    return hasher.run("check", check_password_hash, password_hash, password)
+
+
+def _method_of(password_hash):
+    # werkzeug hashes look like "scrypt:32768:8:1$salt$hash"
+    return password_hash.split("$", 1)[0]
+
+
+def stored_method(method):
+    # a method as werkzeug writes it into hashes, defaults filled in
+    # ("scrypt" -> "scrypt:32768:8:1"), taken from one real hash
+    return _method_of(generate_password_hash("", method))
+
+
+STORED_METHOD = stored_method(HASH_METHOD)
+
+
+def needs_rehash(password_hash):
+    return _method_of(password_hash) != STORED_METHOD
+
+
+def throttled(username, ip):
+    # seconds the client has to wait, or 0
+    wait = user_failures.retry_after((username or "").lower())
+    if wait:
+        login_throttled.inc("user")
+        return wait
+    wait = ip_failures.retry_after(ip)
+    if wait:
+        login_throttled.inc("ip")
+    return wait
+
+
+def login_failed(username, ip):
+    user_failures.hit((username or "").lower())
+    ip_failures.hit(ip)
+
+
+def login_succeeded(username):
+    user_failures.reset((username or "").lower())
@@ -0,0 +1,258 @@
+import re
+from datetime import date
+
+import mysql.connector
+
+# Monthly rollups (migration 0005) for date-scoped statistics. Each table
+# holds one row per (calendar month, entity) with the number of linked
+# missions launched that month, how many of them completed and their total
+# duration, plus rollup_month with the same figures over all missions. A
+# from/to query then reads (months x active entities) rows through the
+# (month, entity_id) primary key instead of scanning every mission.
+#
+# Write paths keep the rollups exact by recomputing just the cells they can
+# have touched, inside their own transaction: the months of the affected
+# missions, crossed with the entities linked to them. Missions without a
+# launch date belong to no month and are left out.
+
+# dimension -> (rollup table, junction table, entity id column)
+DIMENSIONS = {
+    "agency": ("rollup_agency_month", "mission_agencies", "agency_id"),
+    "spacecraft": ("rollup_spacecraft_month", "mission_spacecraft", "spacecraft_id"),
+    "astronaut": ("rollup_astronaut_month", "missioncrew", "astronaut_id"),
+    "launchsite": ("rollup_launchsite_month", "mission_launchsites", "launchsite_id"),
+}
+TOTALS = "rollup_month"
+
+# tables the rollups are derived from, for conditional GET
+SOURCE_TABLES = ("missions",) + tuple(junction for _, junction, _ in DIMENSIONS.values())
+
+ER_NO_SUCH_TABLE = 1146
+MONTH_START = "(m.launch_date - INTERVAL (DAYOFMONTH(m.launch_date) - 1) DAY)"
+FIGURES = "COUNT(*), SUM(m.status = 'Completed'), COALESCE(SUM(m.duration), 0)"
+MONTH_PARAM = re.compile(r"^(\d{4})(?:-(\d{1,2}))?(?:-\d{1,2})?$")
+
+
+def _in(values):
+    return ",".join(["%s"] * len(values))
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _month_ranges(months):
+    # "m.launch_date falls in one of these months", as index-friendly ranges
+    sql = " OR ".join(["(m.launch_date >= %s AND m.launch_date < %s)"] * len(months))
+    params = [bound for month in months for bound in (month, _next_month(month))]
+    return f"({sql})", params
+
+
+def _refresh_totals(cur, months):
+    ranges, params = _month_ranges(months)
+    cur.execute(f"DELETE FROM {TOTALS} WHERE month IN ({_in(months)})", tuple(months))
+    cur.execute(
+        f"INSERT INTO {TOTALS} (month, missions, completed, duration) "
+        f"SELECT {MONTH_START}, {FIGURES} FROM missions m WHERE {ranges} GROUP BY 1",
+        tuple(params)
+    )
+
+
+def _refresh_cells(cur, dimension, entity_ids, months):
+    table, junction, column = DIMENSIONS[dimension]
+    ranges, params = _month_ranges(months)
+    cur.execute(
+        f"DELETE FROM {table} WHERE month IN ({_in(months)}) AND entity_id IN ({_in(entity_ids)})",
+        tuple(months) + tuple(entity_ids)
+    )
+    cur.execute(
+        f"INSERT INTO {table} (month, entity_id, missions, completed, duration) "
+        f"SELECT {MONTH_START}, j.{column}, {FIGURES} "
+        f"FROM {junction} j JOIN missions m ON m.mission_id = j.mission_id "
+        f"WHERE j.{column} IN ({_in(entity_ids)}) AND {ranges} GROUP BY 1, 2",
+        tuple(entity_ids) + tuple(params)
+    )
+
+
+def _months_of(cur, mission_ids):
+    cur.execute(
+        f"SELECT DISTINCT {MONTH_START} FROM missions m "
+        f"WHERE m.mission_id IN ({_in(mission_ids)}) AND m.launch_date IS NOT NULL",
+        tuple(mission_ids)
+    )
+    return sorted(row[0] for row in cur.fetchall())
+
+
+def _guarded(update):
+    # Until migration 0005 is applied, writes carry on without rollups.
+    # Call these on the write's cursor before it commits.
+    def wrapper(cur, *args):
+        try:
+            update(cur, *args)
+        except mysql.connector.Error as err:
+            if err.errno != ER_NO_SUCH_TABLE:
+                raise
+    wrapper.__name__ = update.__name__
+    return wrapper
+
+
+@_guarded
+def missions_changed(cur, mission_ids):
+    # missions added (or their date/status/duration changed): their months'
+    # totals, and every cell of the entities linked to them in those months
+    mission_ids = sorted(set(mission_ids))
+    if not mission_ids:
+        return
+    months = _months_of(cur, mission_ids)
+    if not months:
+        return
+    _refresh_totals(cur, months)
+    for dimension, (_, junction, column) in DIMENSIONS.items():
+        cur.execute(
+            f"SELECT DISTINCT {column} FROM {junction} WHERE mission_id IN ({_in(mission_ids)})",
+            tuple(mission_ids)
+        )
+        entity_ids = sorted(row[0] for row in cur.fetchall() if row[0] is not None)
+        if entity_ids:
+            _refresh_cells(cur, dimension, entity_ids, months)
+
+
+@_guarded
+def months_changed(cur, months):
+    # missions added whose ids are not at hand (bulk import): they have no
+    # links yet, so only the totals of their months move
+    months = sorted({date(m.year, m.month, 1) for m in months if m is not None})
+    if months:
+        _refresh_totals(cur, months)
+
+
+@_guarded
+def links_changed(cur, dimension, pairs):
+    # (mission_id, entity_id) pairs added to or removed from a junction table
+    if dimension not in DIMENSIONS:
+        return
+    pairs = list(pairs)
+    if not pairs:
+        return
+    months = _months_of(cur, sorted({mission_id for mission_id, _ in pairs}))
+    if months:
+        _refresh_cells(cur, dimension, sorted({entity_id for _, entity_id in pairs}), months)
+
+
+def rebuild(conn):
+    # recompute every rollup from scratch (`flask rollups-rebuild`)
+    cur = conn.cursor()
+    cur.execute(f"DELETE FROM {TOTALS}")
+    cur.execute(
+        f"INSERT INTO {TOTALS} (month, missions, completed, duration) "
+        f"SELECT {MONTH_START}, {FIGURES} FROM missions m "
+        f"WHERE m.launch_date IS NOT NULL GROUP BY 1"
+    )
+    counts = {TOTALS: cur.rowcount}
+    for table, junction, column in DIMENSIONS.values():
+        cur.execute(f"DELETE FROM {table}")
+        cur.execute(
+            f"INSERT INTO {table} (month, entity_id, missions, completed, duration) "
+            f"SELECT {MONTH_START}, j.{column}, {FIGURES} "
+            f"FROM {junction} j JOIN missions m ON m.mission_id = j.mission_id "
+            f"WHERE m.launch_date IS NOT NULL AND j.{column} IS NOT NULL GROUP BY 1, 2"
+        )
+        counts[table] = cur.rowcount
+    conn.commit()
+    cur.close()
+    return counts
+
+
+# reading
+
+# keys of range_stats(), for ?fields= on the API
+RANGE_FIELDS = ["missions", "completed", "success_rate", "months", "agencies", "agency_monthly",
+                "spacecraft", "top_astronauts", "astronauts_by_duration", "launchsites"]
+
+
+def parse_month(value, end=False):
+    # "2023", "2023-05" or "2023-05-17" -> first day of that month; a bare
+    # year means January, or December for the end of a range
+    match = MONTH_PARAM.match((value or "").strip())
+    if not match:
+        raise ValueError(f"expected YYYY or YYYY-MM, got {value!r}")
+    year = int(match.group(1))
+    month = int(match.group(2) or (12 if end else 1))
+    if not 1 <= month <= 12 or year < 1:
+        raise ValueError(f"no such month: {value!r}")
+    return date(year, month, 1)
+
+
+def parse_range(start, end):
+    # (first month, last month), both inclusive; open ends cover everything
+    first = parse_month(start) if start else date(1, 1, 1)
+    last = parse_month(end, end=True) if end else date(9999, 12, 1)
+    if first > last:
+        raise ValueError("'from' is after 'to'")
+    return first, last
+
+
+def _rate(completed, missions):
+    return round(completed / missions * 100, 2) if missions else None
+
+
+def agency_monthly(cur, first, last):
+    # missions per agency per month, for the range page and the chart
+    cur.execute("""
+        SELECT a.name AS agency, r.month, r.missions AS mission_count
+        FROM rollup_agency_month r
+        JOIN agencies a ON a.agency_id = r.entity_id
+        WHERE r.month BETWEEN %s AND %s
+        ORDER BY r.entity_id, r.month
+    """, (first, last))
+    return cur.fetchall()
+
+
+def range_stats(conn, first, last):
+    cur = conn.cursor(dictionary=True)
+    bounds = (first, last)
+
+    cur.execute(f"""
+        SELECT month, missions, completed, duration
+        FROM {TOTALS}
+        WHERE month BETWEEN %s AND %s
+        ORDER BY month
+    """, bounds)
+    months = cur.fetchall()
+    for row in months:
+        row["success_rate"] = _rate(row["completed"], row["missions"])
+
+    def per_entity(dimension, entity_table, entity_id, name_col, order, limit=None):
+        table = DIMENSIONS[dimension][0]
+        cur.execute(f"""
+            SELECT r.entity_id AS id, e.{name_col} AS name,
+                   CAST(SUM(r.missions) AS UNSIGNED) AS missions,
+                   CAST(SUM(r.completed) AS UNSIGNED) AS completed,
+                   CAST(SUM(r.duration) AS UNSIGNED) AS duration
+            FROM {table} r
+            JOIN {entity_table} e ON e.{entity_id} = r.entity_id
+            WHERE r.month BETWEEN %s AND %s
+            GROUP BY r.entity_id, e.{name_col}
+            ORDER BY {order}, r.entity_id
+            {"LIMIT %d" % limit if limit else ""}
+        """, bounds)
+        rows = cur.fetchall()
+        for row in rows:
+            row["success_rate"] = _rate(row["completed"], row["missions"])
+        return rows
+
+    stats = dict(
+        months=months,
+        missions=sum(row["missions"] for row in months),
+        completed=sum(row["completed"] for row in months),
+        agencies=per_entity("agency", "agencies", "agency_id", "name", "missions DESC"),
+        agency_monthly=agency_monthly(cur, first, last),
+        spacecraft=per_entity("spacecraft", "spacecraft", "spacecraft_id", "name", "missions DESC"),
+        top_astronauts=per_entity("astronaut", "astronauts", "astronaut_id", "full_name", "missions DESC", 5),
+        astronauts_by_duration=per_entity("astronaut", "astronauts", "astronaut_id", "full_name",
+                                          "duration DESC", 10),
+        launchsites=per_entity("launchsite", "launchsites", "launchsite_id", "name", "missions DESC"),
+    )
+    stats["success_rate"] = _rate(stats["completed"], stats["missions"])
+    cur.close()
+    return stats
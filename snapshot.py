@@ -0,0 +1,73 @@
+import threading
+import time
+
+
+class Snapshot:
+    # Holds the last computed value of an expensive loader and recomputes it
+    # only after invalidate() (or once max_age seconds have passed, so other
+    # worker processes that never saw the write still converge). With `key`,
+    # a callable naming the data the value is computed from (the tables'
+    # change counters), a value computed under another key is stale too.
+    #
+    # Refreshes are single-flight: the first caller to find the snapshot
+    # stale recomputes it while concurrent callers keep getting the previous
+    # value, or wait for the refresh if there is no previous value yet or
+    # the key has moved (the previous value no longer matches the data).
+
+    def __init__(self, loader, max_age=None, key=None):
+        self.loader = loader
+        self.max_age = max_age
+        self.key = key
+        self._value = None
+        self._stamped = (None, 0)
+        self._computed_at = None
+        self._computed_key = None
+        self._computed_version = -1
+        self._version = 0
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+
+    def invalidate(self):
+        self._version += 1
+
+    def _is_fresh(self, key):
+        if self._computed_at is None or self._computed_version != self._version:
+            return False
+        if key != self._computed_key:
+            return False
+        if self.max_age is not None and time.monotonic() - self._computed_at > self.max_age:
+            return False
+        return True
+
+    def get(self):
+        # read before loading, so a write that lands mid-load leaves the
+        # snapshot stale
+        key = self.key() if self.key is not None else None
+        if self._is_fresh(key):
+            return self._value
+
+        wait = self._computed_at is None or key != self._computed_key
+        if not self._refresh_lock.acquire(blocking=wait):
+            # someone else is already refreshing; serve the previous result
+            return self._value
+        try:
+            if self._is_fresh(key):
+                return self._value
+            version = self._version
+            value = self.loader()
+            self._value = value
+            self._computed_key = key
+            self._computed_version = version
+            self._computed_at = time.monotonic()
+            self.refreshes += 1
+            self._stamped = (value, self.refreshes)
+            return value
+        finally:
+            self._refresh_lock.release()
+
+    def stamped(self):
+        # (value, generation) as get() would return it; the generation
+        # changes whenever the value is replaced, so output rendered from
+        # the value can be cached under it
+        self.get()
+        return self._stamped
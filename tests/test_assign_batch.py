@@ -0,0 +1,34 @@
+import pytest
+
+import app as missiondex
+
+
+@pytest.fixture
+def admin():
+    client = missiondex.app.test_client()
+    with client.session_transaction() as session:
+        session["role"] = "admin"
+    return client
+
+
+@pytest.mark.parametrize("kind, link", [
+    ("agency", [1]),
+    ("agency", [1, 2, 3]),
+    ("agency", "12"),
+    ("agency", [True, 2]),
+    ("agency", [1, "2"]),
+    ("agency", [1.0, 2]),
+    ("astronaut", [1, 2, 3]),
+    ("astronaut", [1, 2, "pilot", "extra"]),
+])
+def test_malformed_links_are_rejected(admin, kind, link):
+    response = admin.post("/admin/assign_batch", json={"kind": kind, "links": [link]})
+    assert response.status_code == 400
+    assert "invalid link" in response.get_json()["error"]
+
+
+def test_links_become_tuples():
+    assert missiondex.batch_link("agency", [1, 2]) == (1, 2)
+    assert missiondex.batch_link("astronaut", [1, 2]) == (1, 2, None)
+    assert missiondex.batch_link("astronaut", [1, 2, None]) == (1, 2, None)
+    assert missiondex.batch_link("astronaut", [1, 2, "pilot"]) == (1, 2, "pilot")
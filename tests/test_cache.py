@@ -0,0 +1,21 @@
+from cache import LRUCache
+
+
+def test_rejected_entry_is_a_miss():
+    cache = LRUCache(maxsize=4, ttl=60)
+    cache.set("astronaut", {"data_version": "missions=1"})
+    assert cache.get("astronaut", valid=lambda c: c["data_version"] == "missions=1") is not None
+    assert cache.get("astronaut", valid=lambda c: c["data_version"] == "missions=2") is None
+    assert cache.get("astronaut") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 1)
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
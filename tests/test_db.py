@@ -0,0 +1,55 @@
+from flask import Flask, session
+
+import db
+
+
+class FakeRaw:
+
+    def commit(self):
+        pass
+
+
+class FakePool:
+
+    def release(self, conn):
+        pass
+
+
+def make_app(monkeypatch):
+    monkeypatch.setattr(db, "get_replicas", lambda: object())
+    app = Flask(__name__)
+    app.secret_key = "test"
+    db.init_app(app)
+
+    @app.route("/write", methods=["POST"])
+    def write():
+        db.PooledConnection(FakePool(), FakeRaw()).commit()
+        return "written"
+
+    @app.route("/rejected", methods=["POST"])
+    def rejected():
+        return "bad form", 400
+
+    @app.route("/replica-commit", methods=["POST"])
+    def replica_commit():
+        db.PooledConnection(FakePool(), FakeRaw(), server="replica1:3306").commit()
+        return "ok"
+
+    @app.route("/sticky")
+    def sticky():
+        return str(db.STICKY_KEY in session)
+
+    return app.test_client()
+
+
+def test_commit_on_primary_pins_the_session(monkeypatch):
+    client = make_app(monkeypatch)
+    client.post("/write")
+    assert client.get("/sticky").data == b"True"
+
+
+def test_post_without_a_commit_does_not_pin(monkeypatch):
+    client = make_app(monkeypatch)
+    client.post("/rejected")
+    client.post("/replica-commit")
+    assert client.get("/sticky").data == b"False"
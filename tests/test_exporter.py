@@ -0,0 +1,72 @@
+import csv
+import io
+
+import exporter
+
+
+class FakeCursor:
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakePool:
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.released = self.discarded = 0
+
+    def acquire(self):
+        return self
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.rows)
+
+    def release(self, conn):
+        self.released += 1
+
+    def discard(self, conn):
+        self.discarded += 1
+
+
+def mission(mission_id, **related):
+    row = {column: None for column in exporter.COLUMNS}
+    row.update(mission_id=mission_id, mission_name=f"Mission {mission_id}")
+    # JSON_ARRAYAGG output, or NULL for a mission without links
+    for column in exporter.RELATED:
+        row[column] = related.get(column)
+    return row
+
+
+def export_csv(rows, batch_size=1):
+    pool = FakePool(rows)
+    data = b"".join(exporter.export_missions(pool, "csv", batch_size=batch_size))
+    return list(csv.DictReader(io.StringIO(data.decode("utf-8")))), pool
+
+
+def test_csv_skips_null_names():
+    rows, pool = export_csv([
+        mission(1, agencies='["NASA", null, "ESA"]', spacecraft="[null]", crew='["Ride"]'),
+    ])
+    assert rows[0]["agencies"] == "NASA; ESA"
+    assert rows[0]["spacecraft"] == ""
+    assert rows[0]["crew"] == "Ride"
+    assert pool.released == 1
+
+
+def test_csv_mission_without_links():
+    rows, pool = export_csv([mission(1), mission(2, payloads='["Hubble"]')])
+    assert [row["mission_id"] for row in rows] == ["1", "2"]
+    assert all(rows[0][column] == "" for column in exporter.RELATED)
+    assert rows[1]["payloads"] == "Hubble"
+    assert pool.discarded == 0
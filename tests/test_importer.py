@@ -0,0 +1,64 @@
+import io
+
+import mysql.connector
+
+import importer
+
+
+class FakeConn:
+    # commits rows unless one is named "bad", which the database rejects
+
+    def __init__(self):
+        self.pending, self.rows, self.transactions = [], [], 0
+        self.result = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        # no mission or agency exists
+        self.result = []
+
+    def executemany(self, sql, params):
+        if any("bad" in values for values in params):
+            raise mysql.connector.Error(msg="Data too long", errno=1406)
+        self.pending.extend(params)
+
+    def fetchall(self):
+        return self.result
+
+    def commit(self):
+        self.rows.extend(self.pending)
+        self.pending = []
+        self.transactions += 1
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+def test_rejected_chunk_is_retried_row_by_row():
+    conn = FakeConn()
+    stream = io.StringIO("name,country\nESA,EU\nbad,XX\nJAXA,JP\n")
+    report = importer.import_stream(conn, "agencies", stream)
+    assert [values[0] for values in conn.rows] == ["ESA", "JAXA"]
+    assert report.inserted == 2
+    # the header is line 1: the bad row is reported against its own line
+    assert [line for line, _ in report.errors] == [3]
+
+
+def test_unknown_ids_are_reported_per_line():
+    conn = FakeConn()
+    stream = io.StringIO("mission_id,agency_id\n1,2\n")
+    report = importer.import_stream(conn, "mission_agencies", stream)
+    assert report.inserted == 0
+    assert report.errors == [(2, "unknown mission_id: 1")]
+
+
+def test_invalid_utf8_stops_the_import():
+    conn = FakeConn()
+    stream = importer.text_stream(io.BytesIO(b"name\nESA\n\xff\xfe\n"))
+    report = importer.import_stream(conn, "agencies", stream)
+    assert "not valid UTF-8" in report.stopped
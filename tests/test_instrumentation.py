@@ -0,0 +1,10 @@
+import instrumentation
+
+
+def test_extra_counters_and_gauges_are_typed():
+    text = instrumentation.render_metrics(
+        [("missiondex_test_in_use", "In use.", 2)],
+        [("missiondex_test_hits_total", "Hits.", 7)],
+    )
+    assert "# TYPE missiondex_test_in_use gauge\nmissiondex_test_in_use 2\n" in text
+    assert "# TYPE missiondex_test_hits_total counter\nmissiondex_test_hits_total 7\n" in text
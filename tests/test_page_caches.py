@@ -0,0 +1,120 @@
+import pytest
+
+import app as missiondex
+import bookmarks
+import versions
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    state = {table: (1, 1700000000.0) for table in missiondex.STATS_TABLES}
+    state[bookmarks.counter(5)] = state[bookmarks.counter(6)] = (1, 1700000000.0)
+    monkeypatch.setattr(versions, "current", lambda primary=False: state)
+    # per-user counters come from the same dict instead of their own query
+    monkeypatch.setattr(versions, "_counter", lambda state, table, primary: state.get(table, (0, None)))
+    return state
+
+
+def test_profile_loaded_under_old_counters_is_a_miss(counters):
+    missiondex.entity_cache.clear()
+    loads = []
+
+    def loader(agency_id):
+        loads.append(agency_id)
+        return {"agency": {"agency_id": agency_id, "name": f"load {len(loads)}"}, "missions": []}
+
+    with missiondex.app.test_request_context("/agency/7"):
+        first = missiondex.cached_profile("agency", 7, loader)
+        assert missiondex.cached_profile("agency", 7, loader) is first
+        # a write through another worker: only the counters move here
+        counters["mission_agencies"] = (2, 1700000001.0)
+        second = missiondex.cached_profile("agency", 7, loader)
+    assert loads == [7, 7]
+    assert second["agency"]["name"] == "load 2"
+    assert second["data_version"] != first["data_version"]
+
+
+class FakeConn:
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.queries = 0
+        self.rowcount = 1
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        self.queries += 1
+
+    def fetchall(self):
+        return [(mission_id,) for mission_id in self.ids]
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_bookmarks_reload_when_the_counter_moves(counters):
+    cache = bookmarks.BookmarkCache(maxsize=10, ttl=60)
+    conn = FakeConn([3, 1])
+    with missiondex.app.test_request_context("/dashboard"):
+        assert list(cache.get(conn, 5)) == [1, 3]
+        conn.ids = [1, 2, 3]
+        assert list(cache.get(conn, 5)) == [1, 3]
+        # another user's bookmark leaves this user's entry alone
+        counters[bookmarks.counter(6)] = (2, 1700000001.0)
+        assert list(cache.get(conn, 5)) == [1, 3]
+        counters[bookmarks.counter(5)] = (2, 1700000001.0)
+        assert list(cache.get(conn, 5)) == [1, 2, 3]
+    assert conn.queries == 2
+
+
+def test_bookmark_writes_update_the_entry_in_place(counters, monkeypatch):
+    def bumped(cur, name):
+        version = counters[name][0]
+        counters[name] = (version + 1, 1700000001.0)
+        return f"{name}={version}", f"{name}={version + 1}"
+
+    monkeypatch.setattr(versions, "bump", lambda cur, *tables: None)
+    monkeypatch.setattr(versions, "bumped", bumped)
+    cache = bookmarks.BookmarkCache(maxsize=10, ttl=60)
+    conn = FakeConn([3])
+    with missiondex.app.test_request_context("/bookmark/4", method="POST"):
+        assert list(cache.get(conn, 5)) == [3]
+        assert cache.add(conn, 5, 4)
+        assert list(cache.get(conn, 5)) == [3, 4]
+        assert cache.remove(conn, 5, 3)
+        assert list(cache.get(conn, 5)) == [4]
+    # one load, then only the INSERT and the DELETE
+    assert conn.queries == 3
+
+
+def test_bookmark_write_over_a_stale_entry_reloads(counters, monkeypatch):
+    def bumped(cur, name):
+        counters[name] = (3, 1700000001.0)
+        return f"{name}=2", f"{name}=3"
+
+    monkeypatch.setattr(versions, "bump", lambda cur, *tables: None)
+    monkeypatch.setattr(versions, "bumped", bumped)
+    cache = bookmarks.BookmarkCache(maxsize=10, ttl=60)
+    conn = FakeConn([3])
+    with missiondex.app.test_request_context("/bookmark/4", method="POST"):
+        assert list(cache.get(conn, 5)) == [3]
+        # another worker added mission 2 before this write: counter 1 -> 2
+        conn.ids = [2, 3, 4]
+        assert cache.add(conn, 5, 4)
+        assert list(cache.get(conn, 5)) == [2, 3, 4]
+
+
+@pytest.mark.parametrize("path", ["/dashboard", "/missions/1", "/astronaut/1"])
+def test_login_redirect_comes_before_not_modified(monkeypatch, path):
+    # every validator matches: only the login check can stop a 304
+    monkeypatch.setattr(versions, "evaluate", lambda tables, state=False: ("tag", None, True))
+    client = missiondex.app.test_client()
+    assert client.get(path, headers={"If-None-Match": 'W/"tag"'}).status_code == 302
+    with client.session_transaction() as session:
+        session["user_id"] = 5
+    assert client.get(path, headers={"If-None-Match": 'W/"tag"'}).status_code == 304
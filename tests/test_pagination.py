@@ -0,0 +1,71 @@
+import base64
+import datetime
+import json
+
+from flask import Flask
+
+import pagination
+from pagination import decode_cursor, encode_cursor
+
+
+def token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+class FakeCursor:
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, sql, params):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_round_trip():
+    row = {"launch_date": datetime.date(1969, 7, 16), "mission_id": 11}
+    assert decode_cursor(encode_cursor(row, "launch_date", "mission_id")) == ("1969-07-16", 11)
+    row = {"name": None, "agency_id": 3}
+    assert decode_cursor(encode_cursor(row, "name", "agency_id")) == (None, 3)
+
+
+def test_malformed_tokens():
+    assert decode_cursor("not base64!") is None
+    assert decode_cursor(token("just a string")) is None
+    assert decode_cursor(token(["a", "b", "c"])) is None
+    assert decode_cursor(token(["Apollo", "eleven"])) is None
+    assert decode_cursor(token(["Apollo", None])) is None
+
+
+def test_non_scalar_values_are_rejected():
+    assert decode_cursor(token([["x", "y"], 1])) is None
+    assert decode_cursor(token([{"x": 1}, 1])) is None
+    assert decode_cursor(token([2.5, 1])) == (2.5, 1)
+
+
+def test_forged_cursor_falls_back_to_the_first_page():
+    app = Flask(__name__)
+    app.add_url_rule("/missions", "missions", lambda: "")
+    cur = FakeCursor([{"launch_date": "2020-01-01", "mission_id": 1}])
+    with app.test_request_context("/missions?after=" + token([["x"], 5])):
+        page = pagination.paginate(cur, "SELECT * FROM missions", [], [],
+                                   "launch_date", "mission_id", desc=True)
+    sql, params = cur.executed[0]
+    assert "WHERE" not in sql
+    assert params == (pagination.DEFAULT_PAGE_SIZE + 1,)
+    assert page.prev_cursor is None
+
+
+def test_after_cursor_seeks_past_the_row():
+    app = Flask(__name__)
+    app.add_url_rule("/agencies", "agencies", lambda: "")
+    cur = FakeCursor([])
+    with app.test_request_context("/agencies?per_page=5&after=" + token(["NASA", 4])):
+        pagination.paginate(cur, "SELECT * FROM agencies", [], [], "name", "agency_id")
+    sql, params = cur.executed[0]
+    assert "(name > %s OR (name = %s AND agency_id > %s))" in sql
+    assert sql.endswith("ORDER BY name ASC, agency_id ASC LIMIT %s")
+    assert params == ("NASA", "NASA", 4, 6)
@@ -0,0 +1,20 @@
+from werkzeug.security import generate_password_hash
+
+import passwords
+
+
+def test_current_method_is_not_rehashed():
+    assert not passwords.needs_rehash(generate_password_hash("secret", passwords.HASH_METHOD))
+
+
+def test_other_parameters_are_rehashed():
+    assert passwords.needs_rehash(generate_password_hash("secret", "scrypt:16384:8:1"))
+    assert passwords.needs_rehash(generate_password_hash("secret", "pbkdf2:sha256:1000"))
+
+
+def test_short_method_name_matches_its_defaults(monkeypatch):
+    # PASSWORD_HASH_METHOD=scrypt must not rehash on every login
+    assert passwords.stored_method("scrypt") == "scrypt:32768:8:1"
+    monkeypatch.setattr(passwords, "STORED_METHOD", passwords.stored_method("scrypt"))
+    assert not passwords.needs_rehash(generate_password_hash("secret", "scrypt"))
+    assert not passwords.needs_rehash(generate_password_hash("secret", "scrypt:32768:8:1"))
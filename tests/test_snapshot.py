@@ -0,0 +1,25 @@
+from snapshot import Snapshot
+
+
+def test_reloads_when_the_key_moves():
+    key = ["missions=1"]
+    loads = []
+
+    def loader():
+        loads.append(key[0])
+        return len(loads)
+
+    snapshot = Snapshot(loader, key=lambda: key[0])
+    assert snapshot.get() == 1
+    assert snapshot.get() == 1
+    key[0] = "missions=2"
+    assert snapshot.stamped() == (2, 2)
+    assert loads == ["missions=1", "missions=2"]
+
+
+def test_invalidate_reloads():
+    snapshot = Snapshot(object)
+    first = snapshot.get()
+    assert snapshot.get() is first
+    snapshot.invalidate()
+    assert snapshot.get() is not first
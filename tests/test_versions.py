@@ -0,0 +1,96 @@
+import pytest
+from flask import Flask, session
+
+import versions
+
+CHANGED_AT = 1700000000.0
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    # table -> (version, changed_at), as versions.current() reads them
+    state = {"missions": (1, CHANGED_AT), "agencies": (4, CHANGED_AT - 60)}
+    monkeypatch.setattr(versions, "current", lambda primary=False: state)
+    return state
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    calls = []
+
+    @app.route("/missions")
+    @versions.conditional("missions", "agencies")
+    def missions():
+        calls.append("missions")
+        return "page"
+
+    @app.route("/missions/<int:mission_id>")
+    @versions.conditional("missions")
+    def mission(mission_id):
+        calls.append(mission_id)
+        return "not here", 404
+
+    @app.route("/login")
+    def login():
+        session["user_id"] = 7
+        return "ok"
+
+    test_client = app.test_client()
+    test_client.calls = calls
+    return test_client
+
+
+def test_first_response_carries_validators(client, counters):
+    response = client.get("/missions")
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('W/"')
+    assert response.last_modified.timestamp() == CHANGED_AT
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    assert "Cookie" in response.vary
+
+
+def test_matching_etag_is_not_modified_without_running_the_view(client, counters):
+    etag = client.get("/missions").headers["ETag"]
+    response = client.get("/missions", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert client.calls == ["missions"]
+
+
+def test_counter_change_moves_the_etag(client, counters):
+    etag = client.get("/missions").headers["ETag"]
+    counters["agencies"] = (5, CHANGED_AT)
+    response = client.get("/missions", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_if_modified_since(client, counters):
+    last_modified = client.get("/missions").headers["Last-Modified"]
+    assert client.get("/missions", headers={"If-Modified-Since": last_modified}).status_code == 304
+    counters["missions"] = (2, CHANGED_AT + 1)
+    assert client.get("/missions", headers={"If-Modified-Since": last_modified}).status_code == 200
+
+
+def test_etag_differs_per_user(client, counters):
+    anonymous = client.get("/missions").headers["ETag"]
+    client.get("/login")
+    response = client.get("/missions", headers={"If-None-Match": anonymous})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != anonymous
+
+
+def test_errors_get_no_validators(client, counters):
+    response = client.get("/missions/3")
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+
+
+def test_no_counters_serves_plain_pages(client, monkeypatch):
+    monkeypatch.setattr(versions, "current", lambda primary=False: None)
+    response = client.get("/missions", headers={"If-None-Match": '"anything"'})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
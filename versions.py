@@ -0,0 +1,259 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import mysql.connector
+from flask import g, has_request_context, make_response, request, session
+
+import db
+from cache import LRUCache
+
+# Conditional GET support. Each table has a change counter in
+# table_versions (migration 0004) that write paths bump inside their own
+# transaction. Views wrapped in @conditional(tables...) get an ETag built
+# from the counters of the tables they read and a Last-Modified from the
+# newest change among them, and a matching If-None-Match/If-Modified-Since
+# is answered with 304 before the view runs: no page queries, no template.
+#
+# Counters are read once per TABLE_VERSIONS_POLL seconds per process (one
+# small query), so a write made through another worker shows up within that
+# interval; writes made through this process show up immediately. With
+# read replicas (db.py) they are kept per database server and read over the
+# request's own connection, so a page's validators and fragment keys always
+# describe the server its data came from.
+#
+# Per-user counters (user_counter(): "bookmarks:<user_id>") live in the same
+# table but stay out of that poll, which would otherwise grow with the user
+# count: each is read on its own, by primary key, and kept just as long.
+
+POLL_INTERVAL = float(os.getenv("TABLE_VERSIONS_POLL") or 1)
+# part of every ETag, so a deploy (new templates) never matches old tags;
+# with preload_app all workers share the master's value
+BUILD = os.getenv("APP_VERSION") or str(int(time.time()))
+
+ER_NO_SUCH_TABLE = 1146
+
+_versions = {}  # server -> {table: (version, changed_at as unix seconds)}
+_loaded_at = {}  # server -> monotonic time of the last read
+_lock = threading.Lock()
+# (server, counter) -> (version, changed_at) for per-user counters
+_user_counters = LRUCache(maxsize=int(os.getenv("USER_COUNTER_CACHE_SIZE") or 10000), ttl=POLL_INTERVAL)
+
+
+def user_counter(table, user_id):
+    # the counter of one user's rows in `table`, e.g. their bookmarks
+    return f"{table}:{user_id}"
+
+
+def bump(cur, *tables):
+    # Call on the write's cursor before it commits, so the counters move in
+    # the same transaction as the data.
+    if not tables:
+        return
+    try:
+        cur.execute(
+            "INSERT INTO table_versions (table_name, version, changed_at) VALUES "
+            + ",".join(["(%s, 1, NOW(6))"] * len(tables))
+            + " ON DUPLICATE KEY UPDATE version = version + 1, changed_at = NOW(6)",
+            tables
+        )
+    except mysql.connector.Error as err:
+        # migration 0004 not applied yet: writes keep working, pages are
+        # just never answered with 304
+        if err.errno != ER_NO_SUCH_TABLE:
+            raise
+        return
+    if has_request_context():
+        g.versions_changed = True
+
+
+def bumped(cur, counter):
+    # (data_version before, after) of a counter just bumped on `cur`, read
+    # inside the write's transaction (the bump holds the row lock), so a
+    # cache updated write-through can tell whether its entry was current;
+    # (None, None) before migration 0004
+    try:
+        cur.execute("SELECT version FROM table_versions WHERE table_name = %s", (counter,))
+        row = cur.fetchone()
+    except mysql.connector.Error as err:
+        if err.errno != ER_NO_SUCH_TABLE:
+            raise
+        return None, None
+    version = row[0] if row else 0
+    return f"{counter}={version - 1}", f"{counter}={version}"
+
+
+def expire():
+    _loaded_at.clear()
+    _user_counters.clear()
+
+
+# every plain counter, for current(); per-user counters are read one by one
+POLL_QUERY = ("SELECT table_name, version, UNIX_TIMESTAMP(changed_at) FROM table_versions"
+              " WHERE table_name NOT LIKE '%:%'")
+
+
+def _fresh(server):
+    loaded_at = _loaded_at.get(server)
+    return loaded_at is not None and time.monotonic() - loaded_at < POLL_INTERVAL
+
+
+def cached(server):
+    # (True, state) while the server's counters are fresh, else (False, None);
+    # asgi.py reads the counters itself over aiomysql on a miss
+    if _fresh(server):
+        return True, _versions[server]
+    return False, None
+
+
+def remember(server, rows):
+    # store POLL_QUERY's rows for the server (None: table_versions missing)
+    # and return them as current() does
+    state = None if rows is None else {
+        table: (version, float(changed)) for table, version, changed in rows
+    }
+    _versions[server] = state
+    _loaded_at[server] = time.monotonic()
+    return state
+
+
+def _server(primary):
+    server = db.server(primary)
+    if server is None:
+        server = db.get_db(primary).server
+    return server
+
+
+def current(primary=False):
+    # {table: (version, changed_at)}, or None when table_versions is missing;
+    # primary=True as for db.get_db()
+    server = _server(primary)
+    if _fresh(server):
+        return _versions[server]
+    with _lock:
+        if _fresh(server):
+            return _versions[server]
+        cur = db.get_db(primary).cursor()
+        try:
+            cur.execute(POLL_QUERY)
+            rows = cur.fetchall()
+        except mysql.connector.Error as err:
+            if err.errno != ER_NO_SUCH_TABLE:
+                raise
+            rows = None
+        finally:
+            cur.close()
+        return remember(server, rows)
+
+
+def _counter(state, table, primary):
+    if ":" not in table:
+        return state.get(table, (0, None))
+    key = (_server(primary), table)
+    counter = _user_counters.get(key)
+    if counter is None:
+        cur = db.get_db(primary).cursor()
+        try:
+            cur.execute("SELECT version, UNIX_TIMESTAMP(changed_at) FROM table_versions"
+                        " WHERE table_name = %s", (table,))
+            row = cur.fetchone()
+        finally:
+            cur.close()
+        counter = (row[0], float(row[1])) if row else (0, None)
+        _user_counters.set(key, counter)
+    return counter
+
+
+def data_version(*tables, primary=False, state=False):
+    # the tables' counters as one string, for keying cached output rendered
+    # from them (fragments.py); read it before loading the data, from the
+    # same server. None when table_versions is missing. `state` is a
+    # current() result read elsewhere (asgi.py), for plain tables only.
+    if state is False:
+        state = current(primary)
+    if state is None:
+        return None
+    return ",".join(f"{table}={_counter(state, table, primary)[0]}" for table in tables)
+
+
+def validators(tables, state=False):
+    # (etag, last_modified) for the current request, or (None, None);
+    # `state` as for data_version()
+    if state is False:
+        state = current()
+    if state is None:
+        return None, None
+    seen = [_counter(state, table, False) for table in tables]
+    # pages differ per user (nav, admin links, bookmarks), so the tag does too
+    key = "|".join([
+        BUILD,
+        request.full_path,
+        str(session.get("user_id")),
+        str(session.get("role")),
+    ] + [f"{table}={version}" for table, (version, _) in zip(tables, seen)])
+    etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+    changed = [changed_at for _, changed_at in seen if changed_at is not None]
+    last_modified = datetime.fromtimestamp(int(max(changed)), timezone.utc) if changed else None
+    return etag, last_modified
+
+
+def evaluate(tables, state=False):
+    # (etag, last_modified, not_modified) for the current request; etag is
+    # None when there are no counters to build one from
+    etag, last_modified = validators(tables, state)
+    if etag is None:
+        return None, None, False
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and last_modified is not None and last_modified <= since
+    return etag, last_modified, not_modified
+
+
+def finish(response, etag, last_modified):
+    # attach the validators from evaluate() to a 200 or 304 response
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # browsers may keep the page but must revalidate before reuse
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+
+def conditional(*tables):
+    # @conditional("missions", ...) or, for views whose tables depend on the
+    # URL, @conditional(fn) where fn(**view_args) returns the table names
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if len(tables) == 1 and callable(tables[0]):
+                etag, last_modified, not_modified = evaluate(tuple(tables[0](**kwargs)))
+            else:
+                etag, last_modified, not_modified = evaluate(tables)
+            if etag is None:
+                return view(*args, **kwargs)
+
+            if not_modified:
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return finish(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def _expire_after_write(exc=None):
+    # after the view committed: the next request reloads the counters
+    if g.pop("versions_changed", False):
+        expire()
+
+
+def init_app(app):
+    app.teardown_request(_expire_after_write)